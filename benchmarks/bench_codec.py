@@ -0,0 +1,144 @@
+"""
+Time spent encoding update messages and decoding search responses per codec.
+
+Encode and decode time the codec alone on the whole batch of ``--docs``
+documents (10k by default). The add path prepares and encodes them in
+chunks of ``--chunk`` the way ``SolrInterface.add`` does, the search path
+decodes a response with that many documents into a ``SolrResponse``. For
+comparison the stdlib codec also decodes the text of the response (what
+scorched did before codecs) instead of its bytes. orjson is only measured
+if it is installed::
+
+    python benchmarks/bench_codec.py --docs 10000
+"""
+
+from __future__ import print_function
+
+import argparse
+import datetime
+import json
+import random
+import time
+
+import scorched.codec
+import scorched.connection
+import scorched.response
+import scorched.schema
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua"
+).split()
+
+SCHEMA = {
+    "uniqueKey": "id",
+    "fieldTypes": [
+        {"name": "pdate", "class": "solr.DatePointField"},
+        {"name": "plong", "class": "solr.LongPointField"},
+        {"name": "pdouble", "class": "solr.DoublePointField"},
+        {"name": "string", "class": "solr.StrField"},
+    ],
+    "fields": [{"name": "id", "type": "string"}],
+    "dynamicFields": [
+        {"name": "*_dt", "type": "pdate"},
+        {"name": "*_l", "type": "plong"},
+        {"name": "*_d", "type": "pdouble"},
+        {"name": "*_t", "type": "string"},
+        {"name": "*_ss", "type": "string", "multiValued": True},
+    ],
+}
+
+
+def build(n):
+    rnd = random.Random(42)
+    start = datetime.datetime(2014, 3, 11, 10, 49)
+    docs = []
+    for i in range(n):
+        docs.append(
+            {
+                "id": "%s" % i,
+                "created_dt": start + datetime.timedelta(seconds=rnd.randint(0, 10**7)),
+                "title_t": " ".join(rnd.choice(WORDS) for _ in range(8)),
+                "body_t": " ".join(rnd.choice(WORDS) for _ in range(60)),
+                "tags_ss": [rnd.choice(WORDS) for _ in range(4)],
+                "views_l": rnd.randint(0, 10**6),
+                "price_d": rnd.random() * 100,
+            }
+        )
+    return docs
+
+
+def response(docs):
+    return json.dumps(
+        {
+            "responseHeader": {"status": 0, "QTime": 3},
+            "response": {
+                "numFound": len(docs),
+                "start": 0,
+                "docs": [
+                    dict(doc, created_dt=doc["created_dt"].isoformat() + "Z")
+                    for doc in docs
+                ],
+            },
+        }
+    ).encode("utf-8")
+
+
+def best(run, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def add_path(codec, docs, chunk, converters):
+    def run():
+        for doc_chunk in scorched.connection.grouper(docs, chunk):
+            codec.dumps(scorched.connection.prepare_docs(doc_chunk, converters))
+
+    return best(run)
+
+
+def search_path(codec, body, converters, as_text=False):
+    def run():
+        data = body.decode("utf-8") if as_text else body
+        scorched.response.SolrResponse.from_json(
+            data, "id", converters, loads=codec.loads
+        )
+
+    return best(run)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--docs", type=int, default=10000)
+    parser.add_argument("--chunk", type=int, default=100)
+    args = parser.parse_args()
+    docs = build(args.docs)
+    body = response(docs)
+    converters = scorched.schema.FieldConverters(SCHEMA)
+    codecs = [scorched.codec.JSONCodec()]
+    if scorched.codec.orjson is not None:
+        codecs.append(scorched.codec.OrjsonCodec())
+    prepared = scorched.connection.prepare_docs(docs, converters)
+    print(
+        "%-12s %10s %10s %10s %10s"
+        % ("codec", "encode s", "add s", "decode s", "search s")
+    )
+    print(
+        "%-12s %10s %10s %10s %10.4f"
+        % ("json (text)", "-", "-", "-", search_path(codecs[0], body, converters, True))
+    )
+    for codec in codecs:
+        print(
+            "%-12s %10.4f %10.4f %10.4f %10.4f"
+            % (
+                codec.name,
+                best(lambda: codec.dumps(prepared)),
+                add_path(codec, docs, args.chunk, converters),
+                best(lambda: codec.loads(body)),
+                search_path(codec, body, converters),
+            )
+        )
@@ -0,0 +1,93 @@
+"""
+Bytes on the wire and throughput of gzipped update bodies.
+
+Builds the update requests ``SolrInterface.add`` would send for a batch of
+wide documents, once uncompressed and once per gzip level, and reports the
+body size, the time spent serializing and compressing and the resulting
+time to push the batch through a link of ``--mbit`` Mbit/s.
+
+With ``--solr`` the documents are really added to that core (which must
+accept gzipped request bodies) and the wall clock time is reported too::
+
+    python benchmarks/bench_compression.py --docs 20000 --mbit 50
+    python benchmarks/bench_compression.py --solr http://localhost:8983/solr/core0
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import random
+import time
+
+import scorched
+import scorched.connection
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua"
+).split()
+
+
+def build(n, fields=40):
+    rnd = random.Random(42)
+    docs = []
+    for i in range(n):
+        doc = {"id": "%s" % i, "created_dt": "2014-03-11T10:49:00Z"}
+        for f in range(fields):
+            doc["field%d_t" % f] = " ".join(rnd.choice(WORDS) for _ in range(12))
+        doc["price_f"] = rnd.random() * 100
+        docs.append(doc)
+    return docs
+
+
+def offline(docs, chunk, mbit):
+    conn = scorched.connection.SolrConnection(
+        "http://localhost:8983/solr/core0", None, "", -1, 2048
+    )
+    print(
+        "%-6s %12s %8s %10s %12s"
+        % ("level", "bytes", "ratio", "cpu s", "wire s @%s" % mbit)
+    )
+    raw_size = None
+    for level in (None, 1, 6, 9):
+        conn.gzip_level = level
+        size = 0
+        start = time.perf_counter()
+        for doc_chunk in scorched.connection.grouper(docs, chunk):
+            body = json.dumps(doc_chunk)
+            size += len(conn.request_for_update(body)[2]["data"])
+        elapsed = time.perf_counter() - start
+        raw_size = raw_size or size
+        print(
+            "%-6s %12d %8.2f %10.3f %12.2f"
+            % (level, size, raw_size / float(size), elapsed, size * 8 / (mbit * 1e6))
+        )
+
+
+def live(docs, chunk, url):
+    for level in (None, 1, 6):
+        si = scorched.SolrInterface(url, gzip_level=level)
+        start = time.perf_counter()
+        si.add(docs, chunk=chunk)
+        si.commit()
+        elapsed = time.perf_counter() - start
+        print(
+            "level %-5s %d docs in %.2fs (%.0f docs/s)"
+            % (level, len(docs), elapsed, len(docs) / elapsed)
+        )
+        si.delete_all()
+        si.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--chunk", type=int, default=100)
+    parser.add_argument("--mbit", type=float, default=100.0)
+    parser.add_argument("--solr", help="url of a core to add the documents to")
+    args = parser.parse_args()
+    docs = build(args.docs)
+    offline(docs, args.chunk, args.mbit)
+    if args.solr:
+        live(docs, args.chunk, args.solr)
@@ -0,0 +1,66 @@
+"""
+Parses per second of Solr date strings.
+
+Compares the extended ISO parser every date went through before
+(``datetime_from_extended_w3_datestring``) with the canonical fast path
+and its cache (``datetime_from_w3_datestring``). ``--distinct`` controls
+how many different timestamps the ``--dates`` values are drawn from; real
+result sets repeat timestamps heavily::
+
+    python benchmarks/bench_dates.py --dates 200000 --distinct 1000
+"""
+
+from __future__ import print_function
+
+import argparse
+import random
+import time
+
+import scorched.dates
+
+
+def build(n, distinct):
+    rnd = random.Random(42)
+    pool = [
+        "%04d-%02d-%02dT%02d:%02d:%02d.%03dZ"
+        % (
+            rnd.randint(1990, 2030),
+            rnd.randint(1, 12),
+            rnd.randint(1, 28),
+            rnd.randint(0, 23),
+            rnd.randint(0, 59),
+            rnd.randint(0, 59),
+            rnd.randint(0, 999),
+        )
+        for _ in range(distinct)
+    ]
+    return [rnd.choice(pool) for _ in range(n)]
+
+
+def measure(parse, dates):
+    start = time.perf_counter()
+    for s in dates:
+        parse(s)
+    return len(dates) / (time.perf_counter() - start)
+
+
+def uncached(s):
+    return scorched.dates.datetime_from_w3_datestring.__wrapped__(s)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dates", type=int, default=200000)
+    parser.add_argument("--distinct", type=int, default=1000)
+    args = parser.parse_args()
+    dates = build(args.dates, args.distinct)
+    scorched.dates.datetime_from_w3_datestring.cache_clear()
+    for name, parse in [
+        (
+            "extended regex (before)",
+            scorched.dates.datetime_from_extended_w3_datestring,
+        ),
+        ("fast path, no cache", uncached),
+        ("fast path + cache", scorched.dates.datetime_from_w3_datestring),
+    ]:
+        print("%-24s %12.0f parses/s" % (name, measure(parse, dates)))
@@ -0,0 +1,111 @@
+"""
+Parse time and memory of javabin against JSON search responses.
+
+Builds a search response with ``--docs`` documents, encodes it once as
+JSON and once as javabin and reports the body size, the time to build a
+``SolrResponse`` from it and the peak memory allocated while doing so
+(``tracemalloc``).
+
+With ``--solr`` the same query is sent to that core with both response
+formats and the wall clock time of ``execute()`` is reported too::
+
+    python benchmarks/bench_javabin.py --docs 50000
+    python benchmarks/bench_javabin.py --solr http://localhost:8983/solr/core0
+"""
+
+from __future__ import print_function
+
+import argparse
+import datetime
+import json
+import random
+import time
+import tracemalloc
+
+import pytz
+
+import scorched
+import scorched.javabin
+import scorched.response
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua"
+).split()
+
+CREATED = datetime.datetime(2014, 3, 11, 10, 49, tzinfo=pytz.utc)
+
+
+def build(n):
+    rnd = random.Random(42)
+    docs = []
+    for i in range(n):
+        docs.append(
+            {
+                "id": "%s" % i,
+                "created_dt": CREATED,
+                "title_t": " ".join(rnd.choice(WORDS) for _ in range(8)),
+                "cat": [rnd.choice(WORDS) for _ in range(3)],
+                "price_d": rnd.random() * 100,
+                "stock_i": rnd.randint(0, 5000),
+                "inStock_b": rnd.random() > 0.5,
+            }
+        )
+    return {
+        "responseHeader": {"status": 0, "QTime": 12, "params": {"q": "*:*"}},
+        "response": {"numFound": n, "start": 0, "docs": docs},
+    }
+
+
+def measure(parse, data):
+    start = time.perf_counter()
+    parse(data)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    parse(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def offline(doc):
+    as_json = json.dumps(doc, default=lambda dt: "%sZ" % dt.isoformat()[:19])
+    as_javabin = scorched.javabin.dumps(doc)
+    print("%-8s %12s %10s %12s" % ("format", "bytes", "parse s", "peak MiB"))
+    for name, data, parse in [
+        (
+            "json",
+            as_json,
+            lambda d: scorched.response.SolrResponse.from_json(
+                d, "id", ("created_dt",)
+            ),
+        ),
+        (
+            "javabin",
+            as_javabin,
+            lambda d: scorched.response.SolrResponse.from_javabin(d, "id"),
+        ),
+    ]:
+        elapsed, peak = measure(parse, data)
+        print("%-8s %12d %10.3f %12.1f" % (name, len(data), elapsed, peak / 2.0**20))
+
+
+def live(url, rows):
+    for response_format in scorched.connection.RESPONSE_FORMATS:
+        si = scorched.SolrInterface(url, response_format=response_format)
+        start = time.perf_counter()
+        si.query("*:*").paginate(rows=rows).execute()
+        print(
+            "%-8s %d rows in %.3fs"
+            % (response_format, rows, time.perf_counter() - start)
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--solr", help="url of a core to query")
+    args = parser.parse_args()
+    offline(build(args.docs))
+    if args.solr:
+        live(args.solr, args.docs)
@@ -0,0 +1,108 @@
+"""
+Time and memory of eager against lazy search responses.
+
+Builds a JSON search response with ``--docs`` documents (10k by default)
+and facet counts, then reports for both modes the time and the peak memory
+allocated (``tracemalloc``) to decode it and read ``numFound`` and the
+facets, the first ten documents or every document::
+
+    python benchmarks/bench_lazy.py --docs 10000
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+import scorched.dates
+import scorched.response
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua"
+).split()
+
+DATEFIELDS = ("*_dt", "*_dts")
+
+
+def build(n):
+    rnd = random.Random(42)
+    docs = []
+    for i in range(n):
+        docs.append(
+            {
+                "id": "%s" % i,
+                "created_dt": "2014-03-%02dT10:49:%02d.%03dZ"
+                % (rnd.randint(1, 28), rnd.randint(0, 59), rnd.randint(0, 999)),
+                "seen_dts": ["2015-01-01T00:00:00Z", "2016-01-01T00:00:00Z"],
+                "title_t": " ".join(rnd.choice(WORDS) for _ in range(8)),
+                "cat": [rnd.choice(WORDS) for _ in range(3)],
+                "price_d": rnd.random() * 100,
+            }
+        )
+    facets = []
+    for word in WORDS:
+        facets.extend([word, rnd.randint(0, n)])
+    return json.dumps(
+        {
+            "responseHeader": {"status": 0, "QTime": 12, "params": {"q": "*:*"}},
+            "response": {"numFound": n, "start": 0, "docs": docs},
+            "facet_counts": {
+                "facet_queries": {},
+                "facet_fields": {"cat": facets},
+                "facet_ranges": {},
+            },
+        }
+    )
+
+
+def summary(res):
+    return res.result.numFound, res.facet_counts.facet_fields
+
+
+def first_page(res):
+    return [doc["created_dt"] for doc in res.result.docs[:10]]
+
+
+def everything(res):
+    return [dict(doc) for doc in res.result.docs]
+
+
+def measure(data, lazy, read):
+    def run():
+        # every run parses its dates afresh
+        scorched.dates.datetime_from_w3_datestring.cache_clear()
+        read(
+            scorched.response.SolrResponse.from_json(data, "id", DATEFIELDS, lazy=lazy)
+        )
+
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--docs", type=int, default=10000)
+    args = parser.parse_args()
+    data = build(args.docs)
+    print("%-22s %-6s %10s %12s" % ("access", "mode", "s", "peak MiB"))
+    for name, read in [
+        ("numFound + facets", summary),
+        ("first 10 docs", first_page),
+        ("all docs", everything),
+    ]:
+        for lazy in (False, True):
+            elapsed, peak = measure(data, lazy, read)
+            print(
+                "%-22s %-6s %10.4f %12.1f"
+                % (name, "lazy" if lazy else "eager", elapsed, peak / 2.0**20)
+            )
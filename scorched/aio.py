@@ -0,0 +1,613 @@
+from __future__ import unicode_literals
+
+import asyncio
+import time
+
+import scorched.bulk
+import scorched.codec
+import scorched.columns
+import scorched.compat
+import scorched.connection
+import scorched.exc
+import scorched.response
+import scorched.search
+from scorched.compat import str
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+class AsyncSolrConnection(scorched.connection.SolrConnection):
+    def __init__(
+        self,
+        url,
+        http_connection,
+        mode,
+        retry_timeout,
+        max_length_get_url,
+        search_timeout=(),
+        retry_policy=None,
+        gzip_level=None,
+        codec=None,
+    ):
+        """
+        :param url: url to Solr
+        :type url: str
+        :param http_connection: existing httpx.AsyncClient object, or None to
+                                create a new one.
+        :type http_connection: httpx.AsyncClient
+        :param mode: mode (readable, writable) Solr
+        :type mode: str
+        :param retry_timeout: timeout until retry
+        :type retry_timeout: int
+        :param max_length_get_url: max length until switch to post
+        :type max_length_get_url: int
+        :param search_timeout: (optional) How long to wait for the server to
+                               send data before giving up, as a float, or a
+                               (connect timeout, read timeout) tuple.
+        :type search_timeout: float or tuple
+        :param retry_policy: optional -- when to retry failed requests,
+                             replaces ``retry_timeout``
+        :type retry_policy: scorched.retry.RetryPolicy
+        :param gzip_level: optional -- gzip update, delete and extract request
+                           bodies with this compression level (0-9)
+        :type gzip_level: int
+        :param codec: optional -- the codec JSON responses are decoded with,
+                      they are returned as bytes then instead of text
+        :type codec: scorched.codec.JSONCodec
+        """
+        if httpx is None:  # pragma: no cover
+            raise ImportError(
+                "AsyncSolrConnection requires httpx (pip install scorched[async])"
+            )
+        self.owns_http_connection = http_connection is None
+        super(AsyncSolrConnection, self).__init__(
+            url,
+            http_connection or httpx.AsyncClient(),
+            mode,
+            retry_timeout,
+            max_length_get_url,
+            search_timeout=search_timeout,
+            retry_policy=retry_policy,
+            gzip_level=gzip_level,
+            codec=codec,
+        )
+
+    async def request(self, method, url, idempotent=False, **kwargs):
+        """
+        :param method: http method
+        :type method: str
+        :param url: url
+        :type url: str
+        :param idempotent: optional -- can the request be safely sent twice
+        :type idempotent: bool
+        :param kwargs: key word arguments in requests style
+        :type kwargs: dict
+
+        Asynchronous counterpart of :meth:`SolrConnection.request`.
+        """
+        # httpx wants raw bodies as content, requests takes them as data
+        if isinstance(kwargs.get("data"), (str, bytes)):
+            kwargs["content"] = kwargs.pop("data")
+        if isinstance(kwargs.get("timeout"), tuple):
+            connect, read = kwargs["timeout"]
+            kwargs["timeout"] = httpx.Timeout(read, connect=connect)
+        policy = self.retry_policy
+        started = time.monotonic()
+        attempt = 1
+        while True:
+            error = response = None
+            try:
+                response = await self.http_connection.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                error = e
+            if error is None and not policy.is_retryable(response):
+                return response
+            delay = policy.delay_for(attempt, started, idempotent, response)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def get(self, ids, fl=None):
+        """
+        Perform a RealTime Get
+        """
+        method, url, kwargs = self.request_for_get(ids, fl)
+        response = await self.request(method, url, idempotent=True, **kwargs)
+        if response.status_code != 200:
+            raise scorched.exc.SolrError(response)
+        return self.json_body(response)
+
+    async def update(self, update_doc, **kwargs):
+        """
+        :param update_doc: data send to Solr
+        :type update_doc: json data
+        :returns: json -- json string
+
+        Send json to Solr
+        """
+        method, url, request_kwargs = self.request_for_update(update_doc, **kwargs)
+        response = await self.request(method, url, **request_kwargs)
+        if response.status_code != 200:
+            raise scorched.exc.SolrError(response)
+        return self.json_body(response)
+
+    async def select(self, params):
+        """
+        :param params: LuceneQuery converted to a dictionary with search
+                       queries
+        :type params: dict
+        :returns: json -- json string
+
+        We perform here a search on the `select` handler of Solr.
+        """
+        method, url, kwargs = self.request_for_select(params)
+        response = await self.request(method, url, idempotent=True, **kwargs)
+        if response.status_code != 200:
+            raise scorched.exc.SolrError(response)
+        return self.json_body(response)
+
+    async def mlt(self, params, content=None):
+        """
+        :param params: LuceneQuery converted to a dictionary with search
+                       queries
+        :type params: dict
+        :returns: json -- json string
+
+        Perform a MoreLikeThis query using the content specified
+        There may be no content if stream.url is specified in the params.
+        """
+        method, url, kwargs = self.request_for_mlt(params, content=content)
+        response = await self.request(method, url, idempotent=True, **kwargs)
+        if response.status_code != 200:
+            raise scorched.exc.SolrError(response.content)
+        return self.json_body(response)
+
+    async def close(self):
+        """
+        Close the underlying http client if it was created by us.
+        """
+        if self.owns_http_connection:
+            await self.http_connection.aclose()
+
+
+class AsyncSolrInterface(scorched.connection.SolrInterface):
+    """
+    Asyncio flavour of :class:`scorched.connection.SolrInterface`.
+
+    All methods talking to Solr are coroutines. The schema is fetched lazily
+    on the first request that needs it, since constructors can't await.
+    """
+
+    # the schema is loaded explicitly by load_schema(), not on access
+    schema = None
+    _converters = None
+    _datefields = ()
+
+    def __init__(
+        self,
+        url,
+        http_connection=None,
+        mode="",
+        retry_timeout=-1,
+        max_length_get_url=scorched.connection.MAX_LENGTH_GET_URL,
+        search_timeout=(),
+        retry_policy=None,
+        gzip_level=None,
+        codec=None,
+    ):
+        """
+        :param url: url to Solr
+        :type url: str
+        :param http_connection: optional -- already existing connection
+        :type http_connection: httpx.AsyncClient
+        :param mode: optional -- mode (readable, writable) Solr
+        :type mode: str
+        :param retry_timeout: optional -- timeout until retry
+        :type retry_timeout: int
+        :param max_length_get_url: optional -- max length until switch to post
+        :type max_length_get_url: int
+        :param search_timeout: (optional) How long to wait for the server to
+                               send data before giving up, as a float, or a
+                               (connect timeout, read timeout) tuple.
+        :type search_timeout: float or tuple
+        :param retry_policy: optional -- when to retry failed requests,
+                             replaces ``retry_timeout``
+        :type retry_policy: scorched.retry.RetryPolicy
+        :param gzip_level: optional -- gzip update, delete and extract request
+                           bodies with this compression level (0-9)
+        :type gzip_level: int
+        :param codec: optional -- JSON codec of update messages and responses,
+                      see :class:`scorched.connection.SolrInterface`
+        :type codec: str or scorched.codec.JSONCodec
+        """
+        self.codec = scorched.codec.get_codec(codec)
+        self.conn = AsyncSolrConnection(
+            url,
+            http_connection,
+            mode,
+            retry_timeout,
+            max_length_get_url,
+            search_timeout=search_timeout,
+            retry_policy=retry_policy,
+            gzip_level=gzip_level,
+            # responses stay text unless a codec was chosen
+            codec=None if codec is None else self.codec,
+        )
+        self.schema = None
+        self._converters = None
+        self._datefields = []
+        self._schema_task = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self.conn.close()
+
+    async def init_schema(self):
+        response = await self.conn.request(
+            "GET",
+            scorched.compat.urljoin(self.conn.url, self.remote_schema_file),
+            idempotent=True,
+        )
+        if response.status_code != 200:
+            raise EnvironmentError(
+                "Couldn't retrieve schema document - status code %s\n%s"
+                % (response.status_code, response.content)
+            )
+        return response.json()["schema"]
+
+    async def load_schema(self):
+        """
+        :returns: dict -- the Solr schema
+
+        Fetch the schema once; concurrent callers share the same request.
+        """
+        if self.schema is None:
+            if self._schema_task is None:
+                self._schema_task = asyncio.ensure_future(self.init_schema())
+            try:
+                schema = await self._schema_task
+            except Exception:
+                self._schema_task = None
+                raise
+            if self.schema is None:
+                self.schema = schema
+                self._converters = self._extract_converters(schema)
+                self._datefields = self._converters.datefields
+        return self.schema
+
+    async def add(self, docs, chunk=100, **kwargs):
+        """
+        :param docs: documents to be added
+        :type docs: dict
+        :param chunk: optional -- size of chunks in which the add command
+        should be split
+        :type chunk: int
+        :param kwargs: optinal -- additional arguments
+        :type kwargs: dict
+        :returns: list of SolrUpdateResponse  -- A Solr response object.
+
+        Add a document or a list of document to Solr.
+        """
+        await self.load_schema()
+        if hasattr(docs, "items") or not scorched.connection.is_iter(docs):
+            docs = [docs]
+        ret = []
+        for doc_chunk in scorched.connection.grouper(docs, chunk):
+            update_message = self.codec.dumps(self._prepare_docs(doc_chunk))
+            ret.append(await self._send_update_message(update_message, **kwargs))
+        return ret
+
+    async def _send_update_message(self, update_message, **kwargs):
+        return scorched.response.SolrUpdateResponse.from_json(
+            await self.conn.update(update_message, **kwargs), loads=self.codec.loads
+        )
+
+    def batch(self, **kwargs):
+        """
+        :returns: AsyncUpdateBatch
+
+        See :meth:`scorched.connection.SolrInterface.batch`, use the batch
+        with ``async with``.
+        """
+        return AsyncUpdateBatch(self, **kwargs)
+
+    async def delete_by_query(self, query, **kwargs):
+        """
+        :param query: criteria how witch entries should be deleted
+        :type query: LuceneQuery
+        :returns: SolrUpdateResponse  -- A Solr response object.
+
+        Delete entries by a given query
+        """
+        delete_message = self.codec.dumps({"delete": {"query": str(query)}})
+        return await self._send_update_message(delete_message, **kwargs)
+
+    async def delete_by_ids(self, ids, **kwargs):
+        """
+        :param ids: ids of entries that should be deleted
+        :type ids: list
+        :returns: SolrUpdateResponse  -- A Solr response object.
+
+        Delete entries by a given id
+        """
+        delete_message = self.codec.dumps({"delete": ids})
+        return await self._send_update_message(delete_message, **kwargs)
+
+    async def commit(self, waitSearcher=None, expungeDeletes=None, softCommit=None):
+        """
+        :returns: SolrUpdateResponse  -- A Solr response object.
+
+        See :meth:`scorched.connection.SolrInterface.commit`.
+        """
+        return await self._send_update_message(
+            '{"commit": {}}',
+            commit=True,
+            waitSearcher=waitSearcher,
+            expungeDeletes=expungeDeletes,
+            softCommit=softCommit,
+        )
+
+    async def optimize(self, waitSearcher=None, maxSegments=None):
+        """
+        :returns: SolrUpdateResponse  -- A Solr response object.
+
+        See :meth:`scorched.connection.SolrInterface.optimize`.
+        """
+        return await self._send_update_message(
+            '{"optimize": {}}',
+            optimize=True,
+            waitSearcher=waitSearcher,
+            maxSegments=maxSegments,
+        )
+
+    async def rollback(self):
+        """
+        :returns: SolrUpdateResponse  -- A Solr response object.
+
+        See :meth:`scorched.connection.SolrInterface.rollback`.
+        """
+        return await self._send_update_message('{"rollback": {}}')
+
+    async def delete_all(self):
+        """
+        :returns: SolrUpdateResponse  -- A Solr response object.
+
+        Delete everything
+        """
+        return await self.delete_by_query(self.Q(**{"*": "*"}))
+
+    async def get(self, ids, fields=None):
+        """
+        RealTime Get document(s) by id(s)
+
+        :param ids: id(s) of the document(s)
+        :type ids: list, string or int
+        :param fields: optional -- list of fields to return
+        :type fileds: list of strings
+        """
+        await self.load_schema()
+        return scorched.response.SolrResponse.from_get_json(
+            await self.conn.get(ids, fields), self._converters, loads=self.codec.loads
+        )
+
+    async def search(self, **kwargs):
+        """
+        :returns: SolrResponse  -- A Solr response object.
+
+        Search solr
+        """
+        await self.load_schema()
+        params = scorched.search.params_from_dict(**kwargs)
+        return scorched.response.SolrResponse.from_json(
+            await self.conn.select(params),
+            self.schema["uniqueKey"],
+            self._converters,
+            loads=self.codec.loads,
+        )
+
+    def search_stream(self, constructor=None, **kwargs):
+        raise NotImplementedError(
+            "streamed searches are not supported by AsyncSolrInterface"
+        )
+
+    def export(self, constructor=None, **kwargs):
+        raise NotImplementedError("export is not supported by AsyncSolrInterface")
+
+    def stream(self, expr):
+        raise NotImplementedError(
+            "streaming expressions are not supported by AsyncSolrInterface"
+        )
+
+    def query(self, *args, **kwargs):
+        """
+        :returns: AsyncSolrSearch -- A solrsearch.
+
+        Build a Solr query
+        """
+        q = AsyncSolrSearch(self)
+        if len(args) + len(kwargs) > 0:
+            return q.query(*args, **kwargs)
+        else:
+            return q
+
+    async def mlt_search(self, content=None, **kwargs):
+        """
+        :returns: SolrResponse  -- A Solr response object.
+
+        More like this search Solr
+        """
+        await self.load_schema()
+        params = scorched.search.params_from_dict(**kwargs)
+        return scorched.response.SolrResponse.from_json(
+            await self.conn.mlt(params, content=content),
+            self.schema["uniqueKey"],
+            self._converters,
+            loads=self.codec.loads,
+        )
+
+    def mlt_query(
+        self,
+        fields,
+        content=None,
+        content_charset=None,
+        url=None,
+        query_fields=None,
+        **kwargs
+    ):
+        """
+        :returns: AsyncMltSolrSearch
+
+        See :meth:`scorched.connection.SolrInterface.mlt_query`.
+        """
+        q = AsyncMltSolrSearch(
+            self, content=content, content_charset=content_charset, url=url
+        )
+        return q.mlt(fields=fields, query_fields=query_fields, **kwargs)
+
+    async def extract(self, fh, extractOnly=True, extractFormat="text"):
+        """
+        :param fh: binary file (PDF, MSWord, ODF, ...)
+        :type fh: open file handle
+        :returns: SolrExtract
+
+        Extract text and metadatada from binary file.
+        """
+        params = {"wt": "json"}
+        if extractOnly:
+            params["extractOnly"] = "true"
+        params["extractFormat"] = extractFormat
+        method, url, kwargs = self.conn.request_for_extract(fh, params)
+        response = await self.conn.request(method, url, **kwargs)
+        if response.status_code != 200:
+            raise scorched.exc.SolrError(response)
+        return scorched.response.SolrExtract.from_json(response.json())
+
+
+class AsyncSolrSearch(scorched.search.SolrSearch):
+    async def execute(self, constructor=None):
+        ret = await self.interface.search(**self.options())
+        if constructor:
+            ret = self.constructor(ret, constructor)
+        return ret
+
+    async def count(self):
+        if self._count is None:
+            newself = self.clone()
+            r = await newself.paginate(None, 0).execute()
+            if r.groups:
+                total = getattr(r.groups, r.group_field)["ngroups"]
+            else:
+                total = r.result.numFound
+            self._count = total
+        return self._count
+
+    def cursor(self, constructor=None, rows=None):
+        if self.paginator.start is not None:
+            raise ValueError(
+                "cannot use the start parameter and cursors at the same time"
+            )
+        search = self
+        if rows:
+            search = search.paginate(rows=rows)
+        return AsyncSolrCursor(search, constructor)
+
+
+class AsyncSolrCursor(scorched.search.SolrCursor):
+    def __iter__(self):
+        raise TypeError("use 'async for' to iterate over an AsyncSolrCursor")
+
+    async def __aiter__(self):
+        cursor_mark = "*"
+        while True:
+            options = self.search.options()
+            options["cursorMark"] = cursor_mark
+            ret = await self.search.interface.search(**options)
+            if self.constructor:
+                ret = self.search.constructor(ret, self.constructor)
+            for item in ret:
+                yield item
+            if ret.next_cursor_mark == cursor_mark:
+                break
+            cursor_mark = ret.next_cursor_mark
+
+    async def columns(self, fields=None, use_numpy=None):
+        """
+        Asyncio flavour of :meth:`scorched.search.SolrCursor.columns`, use it
+        with ``async for``.
+        """
+        options = self.search.options()
+        if fields is None:
+            fields = scorched.columns.fl_fields(options.get("fl"))
+        cursor_mark = "*"
+        while True:
+            options["cursorMark"] = cursor_mark
+            ret = await self.search.interface.search(**options)
+            if ret.result.docs:
+                yield ret.result.to_columns(fields, use_numpy)
+            if ret.next_cursor_mark == cursor_mark:
+                break
+            cursor_mark = ret.next_cursor_mark
+
+
+class AsyncMltSolrSearch(scorched.search.MltSolrSearch):
+    async def execute(self, constructor=None):
+        ret = await self.interface.mlt_search(content=self.content, **self.options())
+        if constructor:
+            ret = self.constructor(ret, constructor)
+        return ret
+
+
+class AsyncUpdateBatch(scorched.bulk.UpdateBatch):
+    """
+    Asyncio flavour of :class:`scorched.bulk.UpdateBatch`::
+
+        >>> async with si.batch(commitWithin=10000) as batch:
+        ...     batch.add(docs)
+
+    Documents are prepared when the batch is sent, the schema may not be
+    loaded yet when they are added.
+    """
+
+    def __enter__(self):
+        raise TypeError("use 'async with' for the batch of an AsyncSolrInterface")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            await self.send()
+
+    def _prepare_docs(self, docs):
+        return list(docs)
+
+    async def send(self):
+        """
+        :returns: SolrUpdateResponse -- A Solr response object, None if the
+                  batch is empty
+
+        Send the commands and empty the batch.
+        """
+        if not self.commands:
+            return None
+        await self.si.load_schema()
+        commands = []
+        for name, body in self.commands:
+            if name == "add":
+                body = dict(body, doc=self.si._prepare_docs([body["doc"]])[0])
+            commands.append((name, body))
+        message = scorched.bulk.command_message(commands, self.si.codec)
+        ret = await self.si._send_update_message(message, **self.update_kwargs)
+        self.commands = []
+        return ret
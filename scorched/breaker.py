@@ -0,0 +1,104 @@
+from __future__ import unicode_literals
+
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker(object):
+    """
+    Per node circuit breaker.
+
+    The breaker is ``closed`` while the node answers. After
+    ``failure_threshold`` consecutive failures it ``open``\\ s and requests to
+    the node fail fast. Once ``reset_timeout`` seconds have passed it is
+    ``half-open`` and lets a single trial request through: success closes
+    the breaker again, failure opens it for another ``reset_timeout``.
+
+    The instance handed to :class:`scorched.connection.SolrConnection` is a
+    template, every node gets its own :meth:`clone`.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        """
+        :param failure_threshold: optional -- consecutive failures which open
+                                  the breaker
+        :type failure_threshold: int
+        :param reset_timeout: optional -- seconds the breaker stays open
+                              before a trial request is allowed
+        :type reset_timeout: float
+        """
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def clone(self):
+        return self.__class__(self.failure_threshold, self.reset_timeout)
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return OPEN
+
+    def available(self):
+        """
+        :returns: bool -- True if a request would currently be let through
+        """
+        state = self.state
+        if state == CLOSED:
+            return True
+        return state == HALF_OPEN and not self._trial_running
+
+    def allow(self):
+        """
+        :returns: bool -- True if the request may be sent
+
+        Like :meth:`available` but claims the trial request of a half-open
+        breaker, so concurrent callers don't all hit a recovering node.
+        """
+        with self._lock:
+            state = self.state
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or (
+                self.opened_at is None and self.failures >= self.failure_threshold
+            ):
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+            self._trial_running = False
+
+    def stats(self):
+        """
+        :returns: dict -- state and counters for monitoring
+        """
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "times_opened": self.times_opened,
+        }
@@ -0,0 +1,616 @@
+from __future__ import unicode_literals
+
+import queue
+import threading
+import time
+
+import scorched.exc
+import scorched.search
+from scorched.compat import str
+
+ADD = "add"
+DELETE = "delete"
+DELETE_QUERY = "delete_query"
+
+# atomic update operations which can be merged
+MERGEABLE = frozenset(["set", "add", "add-distinct", "remove", "inc"])
+# all atomic update operations Solr knows
+OPERATIONS = MERGEABLE | frozenset(["removeregex"])
+
+
+class UpdateBatch(object):
+    """
+    Update commands sent to Solr in a single request, in the order they were
+    given. Build it with :meth:`scorched.connection.SolrInterface.batch`::
+
+        >>> with si.batch(commitWithin=10000) as batch:
+        ...     batch.delete_by_query(si.Q(stale_b=True))
+        ...     batch.add(fresh_docs)
+
+    Leaving the ``with`` block sends the batch unless an exception was
+    raised. The methods return the batch, so calls can be chained.
+    """
+
+    def __init__(self, si, **kwargs):
+        """
+        :param si: the interface the batch is sent with
+        :type si: scorched.connection.SolrInterface
+        :param kwargs: optional -- additional arguments of the update
+                       request, e.g. ``commitWithin``
+        :type kwargs: dict
+        """
+        self.si = si
+        self.update_kwargs = kwargs
+        self.commands = []
+
+    def __len__(self):
+        return len(self.commands)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.send()
+
+    def add(self, docs, commitWithin=None, overwrite=None):
+        """
+        :param docs: documents to be added
+        :type docs: dict or list of dicts
+        :param commitWithin: optional -- milliseconds within which these
+                             documents are committed
+        :type commitWithin: int
+        :param overwrite: optional -- replace documents with the same unique
+                          key
+        :type overwrite: bool
+        """
+        if hasattr(docs, "items"):
+            docs = [docs]
+        options = options_of(commitWithin=commitWithin, overwrite=overwrite)
+        for doc in self._prepare_docs(docs):
+            command = {"doc": doc}
+            command.update(options)
+            self.commands.append(("add", command))
+        return self
+
+    def _prepare_docs(self, docs):
+        return self.si._prepare_docs(docs)
+
+    def delete_by_ids(self, ids):
+        """
+        :param ids: ids of entries that should be deleted
+        :type ids: list or str
+        """
+        ids = list(ids) if scorched.search.is_iter(ids) else [ids]
+        self.commands.append(("delete", ids))
+        return self
+
+    def delete_by_query(self, query):
+        """
+        :param query: criteria which entries should be deleted
+        :type query: LuceneQuery
+        """
+        self.commands.append(("delete", {"query": str(query)}))
+        return self
+
+    def commit(self, waitSearcher=None, expungeDeletes=None, softCommit=None):
+        """
+        See :meth:`scorched.connection.SolrInterface.commit`.
+        """
+        self.commands.append(
+            (
+                "commit",
+                options_of(
+                    waitSearcher=waitSearcher,
+                    expungeDeletes=expungeDeletes,
+                    softCommit=softCommit,
+                ),
+            )
+        )
+        return self
+
+    def optimize(self, waitSearcher=None, maxSegments=None):
+        """
+        See :meth:`scorched.connection.SolrInterface.optimize`.
+        """
+        self.commands.append(
+            ("optimize", options_of(waitSearcher=waitSearcher, maxSegments=maxSegments))
+        )
+        return self
+
+    def rollback(self):
+        """
+        See :meth:`scorched.connection.SolrInterface.rollback`.
+        """
+        self.commands.append(("rollback", {}))
+        return self
+
+    def message(self):
+        """
+        :returns: bytes -- the commands as one JSON object
+
+        The object repeats keys (one ``"add"`` per document), so it can't be
+        built from a dict.
+        """
+        return command_message(self.commands, self.si.codec)
+
+    def send(self):
+        """
+        :returns: SolrUpdateResponse -- A Solr response object, None if the
+                  batch is empty
+
+        Send the commands and empty the batch.
+        """
+        if not self.commands:
+            return None
+        ret = self.si._send_update_message(self.message(), **self.update_kwargs)
+        self.commands = []
+        return ret
+
+
+def options_of(**options):
+    return dict((k, v) for k, v in options.items() if v is not None)
+
+
+def command_message(commands, codec):
+    """
+    :param commands: ``(name, body)`` pairs, e.g. ``("delete", ["1"])``
+    :type commands: list
+    :param codec: the codec the names and bodies are encoded with
+    :type codec: scorched.codec.JSONCodec
+    :returns: bytes -- a JSON update command object with a key per command
+    """
+    return (
+        b"{"
+        + b",".join(
+            codec.dumps(name) + b":" + codec.dumps(body) for name, body in commands
+        )
+        + b"}"
+    )
+
+
+class BulkIndexer(object):
+    """
+    Buffers adds and deletes for a :class:`scorched.connection.SolrInterface`
+    and sends them in batches from background threads.
+
+    A batch is cut when the buffer holds ``max_docs`` operations or
+    ``max_bytes`` bytes of JSON, or ``max_latency`` seconds after its first
+    operation. At most ``max_pending`` batches wait for a worker; once they
+    are all taken, callers of :meth:`add` and the delete methods block until
+    a worker is free (backpressure).
+
+    Operations are serialized when they are buffered, so invalid documents
+    fail in the calling thread. Failures of batches are collected and raised
+    as :class:`scorched.exc.BulkIndexError` by the next :meth:`flush` or
+    :meth:`close`. Batches are sent one after another by a single worker,
+    so Solr applies the operations in the order they were made. More
+    ``workers`` send batches in parallel, which is faster but lets batches
+    overtake each other: only use them if no operation depends on one in
+    an earlier batch (e.g. every document is added once).
+
+    With ``coalesce`` successive updates of the same unique key in the
+    buffer are merged into one, see :func:`merge_updates`. A delete of the
+    key drops its buffered updates, adds after the delete are sent after
+    it. Deletes by query are a barrier: updates are never merged across
+    them.
+
+    ::
+
+        >>> with BulkIndexer(si, max_docs=1000) as indexer:
+        ...     for doc in docs:
+        ...         indexer.add(doc)
+    """
+
+    def __init__(
+        self,
+        si,
+        max_docs=500,
+        max_bytes=5 * 2**20,
+        max_latency=1.0,
+        workers=1,
+        max_pending=None,
+        coalesce=False,
+        **kwargs
+    ):
+        """
+        :param si: the interface whose connection the batches are sent with
+        :type si: scorched.connection.SolrInterface
+        :param max_docs: optional -- operations per batch
+        :type max_docs: int
+        :param max_bytes: optional -- bytes of JSON per batch
+        :type max_bytes: int
+        :param max_latency: optional -- seconds an operation waits in the
+                            buffer at most, None to only flush by size
+        :type max_latency: float
+        :param workers: optional -- threads sending batches, more than one
+                        gives up the order of batches
+        :type workers: int
+        :param max_pending: optional -- batches waiting for a worker before
+                            callers block, twice the workers by default
+        :type max_pending: int
+        :param coalesce: optional -- merge updates of the same document
+                         while they are buffered
+        :type coalesce: bool
+        :param kwargs: optional -- additional arguments of every update
+                       request, e.g. ``commitWithin``
+        :type kwargs: dict
+        """
+        if max_docs < 1:
+            raise ValueError("max_docs must be at least 1")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if max_pending is None:
+            max_pending = 2 * workers
+        self.si = si
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes
+        self.max_latency = max_latency
+        self.coalesce = coalesce
+        self.update_kwargs = kwargs
+        self.errors = []
+        self._buffer = []
+        self._count = 0
+        self._bytes = 0
+        # unique key -> index in the buffer of its last update (coalesce)
+        self._pending = {}
+        self._first = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._errors_lock = threading.Lock()
+        self._batches = queue.Queue(maxsize=max_pending)
+        self._workers = [
+            threading.Thread(
+                target=self._work, name="scorched-bulk-%d" % i, daemon=True
+            )
+            for i in range(workers)
+        ]
+        self._timer = None
+        if max_latency is not None:
+            self._timer = threading.Thread(
+                target=self._flush_late, name="scorched-bulk-timer", daemon=True
+            )
+            self._timer.start()
+        for thread in self._workers:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, doc):
+        """
+        :param doc: document to be added
+        :type doc: dict
+        """
+        prepared = self.si._prepare_docs([doc])[0]
+        message = self.si.codec.dumps(prepared)
+        if self.coalesce:
+            self._append(ADD, prepared, len(message), doc.get(self._unique_key))
+        else:
+            self._append(ADD, message, len(message))
+
+    def delete_by_ids(self, ids):
+        """
+        :param ids: ids of entries that should be deleted
+        :type ids: list or str
+        """
+        if not scorched.search.is_iter(ids):
+            ids = [ids]
+        for id in ids:
+            self._append(DELETE, id, len(self.si.codec.dumps(id)), id)
+
+    def delete_by_query(self, query):
+        """
+        :param query: criteria which entries should be deleted
+        :type query: LuceneQuery
+        """
+        query = str(query)
+        self._append(DELETE_QUERY, query, len(self.si.codec.dumps(query)))
+
+    def flush(self):
+        """
+        Send the buffered operations and wait until every batch cut so far
+        is sent.
+
+        :raises: scorched.exc.BulkIndexError -- if batches failed since the
+                 last flush
+        """
+        with self._cond:
+            self._check_open()
+            self._cut()
+        self._batches.join()
+        self._raise_errors()
+
+    def close(self):
+        """
+        Flush and stop the background threads. Closing twice does nothing.
+
+        :raises: scorched.exc.BulkIndexError -- if batches failed since the
+                 last flush
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._cut()
+            self._closed = True
+            self._cond.notify_all()
+        for _ in self._workers:
+            self._batches.put(None)
+        for thread in self._workers:
+            thread.join()
+        if self._timer is not None:
+            self._timer.join()
+        self._raise_errors()
+
+    def _check_open(self):
+        if self._closed:
+            raise ValueError("the BulkIndexer is closed")
+
+    @property
+    def _unique_key(self):
+        return self.si.schema["uniqueKey"]
+
+    def _append(self, kind, value, size, key=None):
+        with self._cond:
+            self._check_open()
+            if not self._count:
+                self._first = time.monotonic()
+                self._cond.notify_all()
+            self._bytes += size
+            if self.coalesce and self._coalesce(kind, value, key):
+                return
+            self._buffer.append((kind, value))
+            self._count += 1
+            if self._count >= self.max_docs or self._bytes >= self.max_bytes:
+                self._cut()
+
+    def _coalesce(self, kind, value, key):
+        """Merge an operation into the buffer, True if it needs no entry of
+        its own"""
+        if kind == DELETE_QUERY:
+            self._pending.clear()
+            return False
+        index = self._pending.pop(key, None) if key is not None else None
+        if kind == DELETE:
+            if index is not None:
+                # the delete makes the buffered update pointless
+                self._buffer[index] = None
+                self._count -= 1
+            return False
+        if index is not None:
+            merged = merge_updates(self._buffer[index][1], value, self._unique_key)
+            if merged is not None:
+                self._buffer[index] = (ADD, merged)
+                self._pending[key] = index
+                return True
+        if key is not None:
+            self._pending[key] = len(self._buffer)
+        return False
+
+    def _cut(self):
+        # called with the lock held, so batches are queued in the order they
+        # were cut; a full queue blocks the caller (backpressure)
+        if self._count:
+            batch = self._buffer
+            if self.coalesce:
+                batch = [
+                    (op[0], self.si.codec.dumps(op[1]) if op[0] == ADD else op[1])
+                    for op in batch
+                    if op is not None
+                ]
+            self._buffer, self._count, self._bytes = [], 0, 0
+            self._pending.clear()
+            self._batches.put(batch)
+
+    def _flush_late(self):
+        with self._cond:
+            while not self._closed:
+                timeout = None
+                if self._count:
+                    timeout = self._first + self.max_latency - time.monotonic()
+                    if timeout <= 0:
+                        self._cut()
+                        continue
+                self._cond.wait(timeout)
+
+    def _work(self):
+        while True:
+            batch = self._batches.get()
+            try:
+                if batch is None:
+                    return
+                self._send(batch)
+            except Exception as e:
+                with self._errors_lock:
+                    self.errors.append((batch, e))
+            finally:
+                self._batches.task_done()
+
+    def _send(self, batch):
+        for message in update_messages(batch, self.si.codec):
+            self.si._send_update_message(message, **self.update_kwargs)
+
+    def _raise_errors(self):
+        with self._errors_lock:
+            errors, self.errors = self.errors, []
+        if errors:
+            raise scorched.exc.BulkIndexError(errors)
+
+
+def update_messages(batch, codec):
+    """
+    :param batch: ``(kind, value)`` operations, adds with their document
+                  encoded
+    :type batch: list
+    :param codec: the codec the deletes are encoded with
+    :type codec: scorched.codec.JSONCodec
+    :returns: generator -- an update message per run of operations of the
+              same kind
+    """
+    start = 0
+    while start < len(batch):
+        kind = batch[start][0]
+        end = start + 1
+        while end < len(batch) and batch[end][0] == kind:
+            end += 1
+        values = [value for _, value in batch[start:end]]
+        if kind == ADD:
+            yield b"[" + b",".join(values) + b"]"
+        elif kind == DELETE:
+            yield codec.dumps({"delete": values})
+        else:
+            for query in values:
+                yield codec.dumps({"delete": {"query": query}})
+        start = end
+
+
+def is_atomic_value(value):
+    """
+    :returns: bool -- True if ``value`` is an atomic update of a field, with
+              one or more operations (``{"add": "a", "remove": "b"}``)
+    """
+    return (
+        isinstance(value, dict)
+        and len(value) > 0
+        and all(key in OPERATIONS for key in value)
+    )
+
+
+def atomic_operation(value):
+    """
+    :returns: tuple -- ``(operation, argument)`` if ``value`` is an atomic
+              update of a field with a single operation, else None
+    """
+    if is_atomic_value(value) and len(value) == 1:
+        return next(iter(value.items()))
+    return None
+
+
+def is_atomic(doc, unique_key):
+    return any(
+        is_atomic_value(value) for name, value in doc.items() if name != unique_key
+    )
+
+
+def has_multiple_operations(doc):
+    return any(is_atomic_value(value) and len(value) > 1 for value in doc.values())
+
+
+def as_list(value):
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+def apply_operation(value, operation, argument):
+    """
+    :returns: the value of a field after the atomic update, None if it is
+              removed and :data:`Ellipsis` if it can't be computed here
+    """
+    if operation == "set":
+        return argument
+    if operation == "add":
+        return as_list(value) + as_list(argument) if value is not None else argument
+    if operation == "add-distinct":
+        values = as_list(value) if value is not None else []
+        values.extend(v for v in as_list(argument) if v not in values)
+        return values
+    if operation == "remove":
+        if value is None:
+            return None
+        removed = as_list(argument)
+        values = [v for v in as_list(value) if v not in removed]
+        return values or None
+    if operation == "inc":
+        if value is None:
+            return argument
+        if isinstance(value, (int, float)) and isinstance(argument, (int, float)):
+            return value + argument
+    return Ellipsis
+
+
+def merge_operations(first, second):
+    """
+    :returns: dict -- a single atomic update doing what ``first`` followed by
+              ``second`` does, None if there is none
+    """
+    (op1, arg1), (op2, arg2) = first, second
+    if op1 not in MERGEABLE or op2 not in MERGEABLE:
+        return None
+    if op2 == "set":
+        return {"set": arg2}
+    if op1 == "set":
+        value = apply_operation(arg1, op2, arg2)
+        return None if value is Ellipsis else {"set": value}
+    if op1 == op2 == "inc":
+        value = apply_operation(arg1, "inc", arg2)
+        return None if value is Ellipsis else {"inc": value}
+    if op1 == op2 and op1 in ("add", "remove"):
+        return {op1: as_list(arg1) + as_list(arg2)}
+    if op1 == op2 == "add-distinct":
+        return {op1: apply_operation(arg1, op1, arg2)}
+    return None
+
+
+def merge_updates(first, second, unique_key):
+    """
+    :param first: the earlier document or atomic update
+    :type first: dict
+    :param second: the later document or atomic update of the same key
+    :type second: dict
+    :param unique_key: name of the unique key field
+    :type unique_key: str
+    :returns: dict -- a single update with the effect of both, None if they
+              can't be merged
+
+    A document replaces whatever was before it. Atomic updates (``set``,
+    ``add``, ``add-distinct``, ``remove``, ``inc``) of a document are
+    applied to it, giving a document again. Atomic updates of different
+    fields are combined, of the same field as far as the result doesn't
+    depend on the stored value: ``set`` followed by anything, ``inc``
+    followed by ``inc``, ``add`` by ``add`` and ``remove`` by ``remove``.
+    Updates with a ``_version_`` (optimistic concurrency) or with several
+    operations on one field are never merged.
+    """
+    if "_version_" in first or "_version_" in second:
+        return None
+    if has_multiple_operations(first) or has_multiple_operations(second):
+        return None
+    if not is_atomic(second, unique_key):
+        return dict(second)
+    merged = dict(first)
+    if not is_atomic(first, unique_key):
+        for name, value in second.items():
+            if name == unique_key:
+                continue
+            update = atomic_operation(value)
+            if update is None:
+                return None
+            value = apply_operation(merged.get(name), *update)
+            if value is Ellipsis:
+                return None
+            if value is None:
+                merged.pop(name, None)
+            else:
+                merged[name] = value
+        return merged
+    for name, value in second.items():
+        if name == unique_key:
+            continue
+        update = atomic_operation(value)
+        if update is None:
+            return None
+        if name not in merged:
+            merged[name] = value
+            continue
+        previous = atomic_operation(merged[name])
+        if previous is None:
+            return None
+        value = merge_operations(previous, update)
+        if value is None:
+            return None
+        merged[name] = value
+    return merged
@@ -0,0 +1,107 @@
+from __future__ import unicode_literals
+
+import datetime
+import decimal
+import json
+import numbers
+import uuid
+
+import scorched.dates
+from scorched.compat import str
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+MIDNIGHT = datetime.time(0)
+
+
+def default(value):
+    """
+    Encode the values json can't: dates (also ``scorched.dates.solr_date``)
+    the way Solr expects them, UUIDs, decimals and numbers of other types
+    (e.g. NumPy's) and sets.
+    """
+    if isinstance(value, (datetime.datetime, scorched.dates.solr_date)):
+        return str(scorched.dates.solr_date(value))
+    if isinstance(value, datetime.date):
+        return str(scorched.dates.solr_date(datetime.datetime.combine(value, MIDNIGHT)))
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, (numbers.Real, decimal.Decimal)):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError("Object of type %s is not JSON serializable" % type(value).__name__)
+
+
+class JSONCodec(object):
+    """
+    Encodes update messages to and decodes responses from JSON with the
+    standard library.
+    """
+
+    name = "json"
+
+    def dumps(self, obj):
+        """
+        :returns: bytes -- ``obj`` as UTF-8 encoded JSON
+        """
+        return json.dumps(obj, default=default).encode("utf-8")
+
+    def loads(self, data):
+        """
+        :param data: JSON document
+        :type data: bytes or str
+        """
+        return json.loads(data)
+
+    def __repr__(self):
+        return "<%s>" % self.__class__.__name__
+
+
+class OrjsonCodec(JSONCodec):
+    """
+    Encodes and decodes JSON with orjson (``pip install scorched[orjson]``),
+    several times faster than the standard library.
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("OrjsonCodec needs orjson to be installed")
+
+    def dumps(self, obj):
+        # datetimes go through default() too: Solr only accepts UTC as "Z"
+        return orjson.dumps(
+            obj,
+            default=default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+CODECS = {"json": JSONCodec, "orjson": OrjsonCodec}
+
+
+def get_codec(codec=None):
+    """
+    :param codec: optional -- a codec, the name of one (``json`` or
+                  ``orjson``) or None for the standard library's
+    :type codec: str or JSONCodec
+    :returns: JSONCodec
+    """
+    if codec is None:
+        codec = "json"
+    if isinstance(codec, str):
+        try:
+            return CODECS[codec]()
+        except KeyError:
+            raise ValueError("Unknown codec %r" % (codec,))
+    return codec
@@ -0,0 +1,131 @@
+from __future__ import unicode_literals
+
+import array
+import datetime
+
+import pytz
+
+import scorched.dates
+from scorched.compat import str
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+NoneType = type(None)
+
+
+def to_columns(docs, fields=None, datefields=(), use_numpy=None):
+    """
+    :param docs: documents, as mappings
+    :type docs: list
+    :param fields: optional -- names of the columns, by default every field
+                   in the order it first appears in
+    :type fields: list
+    :param datefields: optional -- names and patterns of date fields whose
+                       values may still be strings
+    :type datefields: tuple
+    :param use_numpy: optional -- build NumPy arrays, by default if NumPy is
+                      installed
+    :type use_numpy: bool
+    :returns: dict -- a column per field
+
+    Turn documents into columns. Integer columns become ``array("q")`` or
+    int64 arrays, float columns ``array("d")`` or float64 arrays (missing
+    values are NaN), boolean columns bool arrays with NumPy and date columns
+    datetime64 arrays (missing values are NaT) with NumPy and lists of
+    datetimes without. Anything else (strings, multi-valued fields, integer
+    columns with missing values ...) becomes a list with None for missing
+    values.
+    """
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    elif use_numpy and numpy is None:
+        raise ImportError("use_numpy needs NumPy to be installed")
+    if fields is None:
+        fields = {}
+        for doc in docs:
+            for name in doc:
+                fields[name] = None
+    datefields = scorched.dates.field_matcher(datefields)
+    columns = {}
+    for name in fields:
+        values = [doc.get(name) for doc in docs]
+        columns[name] = to_column(values, name in datefields, use_numpy)
+    return columns
+
+
+def to_column(values, is_date=False, use_numpy=False):
+    """
+    :param values: the values of a field, None where it is missing
+    :type values: list
+    :param is_date: optional -- the field holds dates, maybe as strings
+    :type is_date: bool
+    :param use_numpy: optional -- build a NumPy array
+    :type use_numpy: bool
+    :returns: array, numpy.ndarray or list -- see :func:`to_columns`
+    """
+    types = set(map(type, values))
+    missing = NoneType in types
+    types.discard(NoneType)
+    if not types:
+        return values
+    if types <= {datetime.datetime} or (is_date and types <= {str, datetime.datetime}):
+        return date_column(values, use_numpy)
+    if types == {bool}:
+        if use_numpy and not missing:
+            return numpy.array(values, dtype=bool)
+        return values
+    if types == {int}:
+        if missing:
+            # NaN would lose the precision of large (e.g. _version_) values
+            return values
+        try:
+            if use_numpy:
+                return numpy.array(values, dtype=numpy.int64)
+            return array.array("q", values)
+        except OverflowError:
+            return values
+    if types <= {int, float}:
+        if missing:
+            nan = float("nan")
+            values = [nan if v is None else v for v in values]
+        if use_numpy:
+            return numpy.array(values, dtype=numpy.float64)
+        return array.array("d", values)
+    return values
+
+
+def date_column(values, use_numpy):
+    if not use_numpy:
+        parse = scorched.dates.datetime_from_w3_datestring
+        return [parse(v) if isinstance(v, str) else v for v in values]
+    return numpy.array([numpy_date(v) for v in values], dtype="datetime64[us]")
+
+
+def numpy_date(value):
+    """A value datetime64 can be built from; it has no timezones"""
+    if value is None:
+        return "NaT"
+    if isinstance(value, str):
+        if value.endswith("Z"):
+            return value[:-1]
+        value = scorched.dates.datetime_from_w3_datestring(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(pytz.utc).replace(tzinfo=None)
+    return value
+
+
+def fl_fields(fl):
+    """
+    :param fl: value of the ``fl`` parameter
+    :type fl: str
+    :returns: list -- the field names, None if it has wildcards or is empty
+    """
+    if not fl:
+        return None
+    fields = [name.strip() for name in fl.split(",") if name.strip()]
+    if not fields or any("*" in name for name in fields):
+        return None
+    return fields
@@ -1,23 +1,48 @@
 from __future__ import unicode_literals
 
+import collections
+import concurrent.futures
+import gzip
 import itertools
-import json
+import os
+import threading
 import time
 import warnings
+import zlib
 
 import requests
+import urllib3
 
+import scorched.bulk
+import scorched.codec
 import scorched.compat
 import scorched.dates
 import scorched.exc
+import scorched.javabin
+import scorched.pool
 import scorched.response
+import scorched.retry
+import scorched.schema
 import scorched.search
+import scorched.spool
+import scorched.streaming
 from scorched.compat import str
 
 MAX_LENGTH_GET_URL = 2048
 # Jetty default is 4096; Tomcat default is 8192; picking 2048 to be
 # conservative.
 
+NODE_FAILURE_STATUS_CODES = scorched.pool.NODE_FAILURE_STATUS_CODES
+
+# Values of ``wt`` search responses can be decoded from
+RESPONSE_FORMATS = ("json", "javabin")
+
+# answer of SolrConnection.update for updates written to its spool
+SPOOLED_RESPONSE = '{"responseHeader": {"status": 0, "QTime": 0, "spooled": true}}'
+
+# Bytes read at once from streamed responses
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 def is_iter(val):
     return isinstance(val, (tuple, list))
@@ -35,10 +60,21 @@ class SolrConnection(object):
         retry_timeout,
         max_length_get_url,
         search_timeout=(),
+        writer_urls=None,
+        balancing="round_robin",
+        probe_interval=5.0,
+        retry_policy=None,
+        circuit_breaker=None,
+        hedge_delay=None,
+        hedge_workers=16,
+        gzip_level=None,
+        response_format="json",
+        codec=None,
+        spool=None,
     ):
         """
-        :param url: url to Solr
-        :type url: str
+        :param url: url to Solr, or a list of urls of equivalent replicas
+        :type url: str or list
         :param http_connection: existing requests.Session object, or None to
                                 create a new one.
         :type http_connection: requests connection
@@ -52,43 +88,333 @@ class SolrConnection(object):
                                send data before giving up, as a float, or a
                                (connect timeout, read timeout) tuple.
         :type search_timeout: float or tuple
+        :param writer_urls: optional -- urls updates are sent to, defaults to
+                            the first url
+        :type writer_urls: list
+        :param balancing: optional -- how reads are spread over the replicas,
+                          ``round_robin`` or ``least_outstanding``
+        :type balancing: str
+        :param probe_interval: optional -- seconds between two health checks
+                               (``admin/ping``) of an ejected node
+        :type probe_interval: float
+        :param retry_policy: optional -- when to retry failed requests,
+                             replaces ``retry_timeout``
+        :type retry_policy: scorched.retry.RetryPolicy
+        :param circuit_breaker: optional -- breaker template, every node gets
+                                its own copy and requests to a node fail fast
+                                while its breaker is open
+        :type circuit_breaker: scorched.breaker.CircuitBreaker
+        :param hedge_delay: optional -- seconds after which a search or get
+                            still unanswered is also sent to another replica,
+                            ``"auto"`` to use the 95th percentile of recent
+                            latencies, None to disable hedging
+        :type hedge_delay: float or str
+        :param hedge_workers: optional -- threads sending hedged requests
+        :type hedge_workers: int
+        :param gzip_level: optional -- gzip update, delete and extract request
+                           bodies with this compression level (0-9), None
+                           to send them uncompressed
+        :type gzip_level: int
+        :param response_format: optional -- ``wt`` of searches, ``json`` or
+                                ``javabin``
+        :type response_format: str
+        :param codec: optional -- the codec JSON responses are decoded with,
+                      they are returned as bytes then instead of text
+        :type codec: scorched.codec.JSONCodec
+        :param spool: optional -- where updates go while Solr can't be
+                      reached, see :class:`scorched.spool.WriteSpool`
+        :type spool: scorched.spool.WriteSpool
         """
         self.http_connection = http_connection or requests.Session()
         if mode == "r":
             self.writeable = False
         elif mode == "w":
             self.readable = False
-        self.url = url.rstrip("/") + "/"
+        urls = [url] if isinstance(url, str) else list(url)
+        self.url = urls[0].rstrip("/") + "/"
         self.update_url = self.url + "update/json"
         self.select_url = self.url + "select/"
         self.mlt_url = self.url + "mlt/"
         self.get_url = self.url + "get/"
+        self.export_url = self.url + "export"
+        self.stream_url = self.url + "stream"
+        self.ping_url = self.url + "admin/ping"
         self.retry_timeout = retry_timeout
+        if retry_policy is None:
+            retry_policy = scorched.retry.RetryPolicy.from_retry_timeout(retry_timeout)
+        self.retry_policy = retry_policy
         self.max_length_get_url = max_length_get_url
         self.search_timeout = search_timeout
+        self.probe_timeout = 1.0
+        self.readers = scorched.pool.NodePool(
+            urls,
+            balancing,
+            probe=self.ping,
+            probe_interval=probe_interval,
+            breaker=circuit_breaker,
+        )
+        # a writer which is also a reader is the same node, sharing its
+        # health and circuit breaker
+        readers = dict((node.url, node) for node in self.readers)
+        writer_nodes = [
+            readers.get(url.rstrip("/") + "/", url) for url in writer_urls or urls[:1]
+        ]
+        self.writers = scorched.pool.NodePool(
+            writer_nodes,
+            balancing,
+            probe=self.ping,
+            probe_interval=probe_interval,
+            breaker=circuit_breaker,
+        )
+        self.hedge_delay = hedge_delay
+        self.hedge_workers = hedge_workers
+        if gzip_level is not None and not 0 <= gzip_level <= 9:
+            raise ValueError("gzip_level must be between 0 and 9")
+        self.gzip_level = gzip_level
+        if response_format not in RESPONSE_FORMATS:
+            raise ValueError(
+                "response_format must be one of %s" % ", ".join(RESPONSE_FORMATS)
+            )
+        self.response_format = response_format
+        self.codec = codec
+        self.latencies = scorched.pool.LatencyTracker()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self.spool = spool
+        if spool is not None and spool.pending():
+            # left over from an earlier process
+            spool.start_replay(self._replay_update)
 
-    def request(self, *args, **kwargs):
+    def request(self, method, url, idempotent=False, **kwargs):
         """
-        :param args: arguments
-        :type args: tuple
-        :param kwargs: key word arguments
+        :param method: http method
+        :type method: str
+        :param url: url
+        :type url: str
+        :param idempotent: optional -- can the request be safely sent twice
+        :type idempotent: bool
+        :param kwargs: key word arguments passed to the http connection
         :type kwargs: dict
+        :returns: requests.Response
+
+        Send a request to ``url``, retrying as the retry policy allows.
+        """
+        return self.pool_request(None, method, url, idempotent=idempotent, **kwargs)
+
+    def pool_request(
+        self, pool, method, url, idempotent=False, hedge=False, retry=True, **kwargs
+    ):
+        """
+        :param pool: nodes the request can be sent to, None to send it to
+                     ``url`` as is
+        :type pool: scorched.pool.NodePool
+        :param method: http method
+        :type method: str
+        :param url: url built against ``self.url``
+        :type url: str
+        :param idempotent: optional -- can the request be safely sent twice,
+                           only those fail over to other nodes
+        :type idempotent: bool
+        :param hedge: optional -- send the request to a second node if the
+                      first one is slower than ``hedge_delay``
+        :type hedge: bool
+        :param retry: optional -- False to send the request only once, e.g.
+                      if its body can't be read twice
+        :type retry: bool
+        :returns: requests.Response
+
+        Send a request to a node of ``pool``. Nodes which can't be reached,
+        time out or answer with 502/503/504 are ejected from the pool and
+        idempotent requests are immediately sent to the next untried node.
+        Once every node has been tried the retry policy decides whether to
+        back off and start over.
+        """
+        policy = self.retry_policy
+        hedge = (
+            hedge
+            and idempotent
+            and self.hedge_delay is not None
+            and pool is not None
+            and len(pool) > 1
+        )
+        started = time.monotonic()
+        attempt = 1
+        tried = []
+        error = response = None
+        while True:
+            node = None
+            if pool is not None:
+                node = pool.pick(exclude=tried)
+                if node is None and not tried:
+                    raise scorched.exc.CircuitOpenError(
+                        "All Solr nodes are unavailable, circuit breakers are open"
+                    )
+            if node is not None or pool is None:
+                tried.append(node)
+                if hedge:
+                    error, response = self._send_hedged(
+                        pool, node, tried, method, url, **kwargs
+                    )
+                else:
+                    error, response = self._send(pool, node, method, url, **kwargs)
+                node_failed = self._node_failed(error, response)
+                if not node_failed and not policy.is_retryable(response):
+                    return response
+                if idempotent and pool is not None and len(tried) < len(pool):
+                    continue
+            delay = None
+            if retry:
+                delay = policy.delay_for(attempt, started, idempotent, response)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+            time.sleep(delay)
+            attempt += 1
+            tried = []
+
+    @staticmethod
+    def _node_failed(error, response):
+        return error is not None or response.status_code in NODE_FAILURE_STATUS_CODES
+
+    def _send(self, pool, node, method, url, **kwargs):
+        """
+        :returns: tuple -- (error, response), one of them is None
 
-        .. todo::
-            Make this api more explicit!
+        Send a single request and report the outcome to the node's pool.
         """
+        if node is not None:
+            pool.acquire(node)
+            url = node.rebase(url, self.url)
+        error = response = None
+        failed = True
         try:
-            return self.http_connection.request(*args, **kwargs)
-        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
-            if self.retry_timeout < 0:
-                raise
-            time.sleep(self.retry_timeout)
-            return self.http_connection.request(*args, **kwargs)
+            response = self.http_connection.request(method, url, **kwargs)
+            failed = self._node_failed(None, response)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            error = e
+        finally:
+            if node is not None:
+                pool.release(node)
+                # other errors (e.g. a broken chunked response) are recorded
+                # as failures too, a half-open breaker would otherwise wait
+                # for the outcome of its trial request forever
+                pool.record(node, failed)
+        return error, response
+
+    def _send_hedged(self, pool, node, tried, method, url, **kwargs):
+        """
+        :returns: tuple -- (error, response), one of them is None
+
+        Send the request to ``node``. If it hasn't answered after the hedge
+        delay, send it to another node as well and take whichever good
+        answer arrives first. The slower request is left to finish in the
+        background, its outcome still counts for its node.
+        """
+        delay = self.current_hedge_delay()
+        started = time.monotonic()
+        if delay is None:
+            # not enough latencies learned yet
+            error, response = self._send(pool, node, method, url, **kwargs)
+            if not self._node_failed(error, response):
+                self.latencies.add(time.monotonic() - started)
+            return error, response
+        executor = self.hedge_executor()
+        pending = set([executor.submit(self._send, pool, node, method, url, **kwargs)])
+        done, _ = concurrent.futures.wait(pending, timeout=delay)
+        if not done:
+            hedge_node = pool.pick(exclude=tried)
+            if hedge_node is not None:
+                tried.append(hedge_node)
+                pending.add(
+                    executor.submit(self._send, pool, hedge_node, method, url, **kwargs)
+                )
+        result = None
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                if result is None or self._node_failed(*result):
+                    result = future.result()
+            if not self._node_failed(*result):
+                self.latencies.add(time.monotonic() - started)
+                break
+        return result
+
+    def current_hedge_delay(self):
+        """
+        :returns: float -- seconds after which a request is hedged, None if
+                  the delay is learned and there aren't enough samples yet
+        """
+        if self.hedge_delay == "auto":
+            return self.latencies.percentile(95)
+        return self.hedge_delay
+
+    def hedge_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.hedge_workers,
+                    thread_name_prefix="scorched-hedge",
+                )
+            return self._executor
+
+    def node_status(self):
+        """
+        :returns: dict -- health, requests in flight and circuit breaker
+                  state of every reader and writer node
+        """
+        return {
+            "readers": self.readers.status(),
+            "writers": self.writers.status(),
+        }
+
+    def ping(self, node):
+        """
+        :param node: node to check
+        :type node: scorched.pool.SolrNode
+        :returns: bool -- True if the node answers the ping handler
+
+        Health check used to bring ejected nodes back into rotation.
+        """
+        url = node.rebase(self.ping_url, self.url)
+        response = self.http_connection.request(
+            "GET", url, params={"wt": "json"}, timeout=self.probe_timeout
+        )
+        return response.status_code == 200
 
     def get(self, ids, fl=None):
         """
         Perform a RealTime Get
         """
+        method, url, kwargs = self.request_for_get(ids, fl)
+        response = self.pool_request(
+            self.readers, method, url, idempotent=True, hedge=True, **kwargs
+        )
+        if response.status_code != 200:
+            raise scorched.exc.SolrError(response)
+        return self.json_body(response)
+
+    def json_body(self, response):
+        """
+        :returns: bytes or str -- the body of a JSON response, undecoded if
+                  there is a ``codec`` to decode it
+        """
+        if self.codec is None:
+            return response.text
+        return response.content
+
+    def request_for_get(self, ids, fl=None):
+        """
+        :param ids: id(s) of the document(s)
+        :type ids: list, string or int
+        :param fl: optional -- list of fields to return
+        :type fl: list
+        :returns: tuple -- (method, url, request keyword arguments)
+
+        Build the request for a RealTime Get.
+        """
         # We always send the ids parameter to force the standart output format,
         # but use the id parameter for our actual data as `ids` can no handle
         # ids with commas
@@ -106,32 +432,136 @@ class SolrConnection(object):
 
         qs = scorched.compat.urlencode(params)
         url = "%s?%s" % (self.get_url, qs)
+        return "GET", url, {}
+
+    def update(self, update_doc, **kwargs):
+        """
+        :param update_doc: data send to Solr
+        :type update_doc: json data
+        :returns: json -- json string
 
-        response = self.request("GET", url)
+        Send json to Solr. With a ``spool``, updates which can't reach Solr
+        and all updates after them until the spool is replayed are appended
+        to the spool instead; their response has ``"spooled": true`` in its
+        header.
+        """
+        spool = self.spool
+        if spool is None:
+            return self._update(update_doc, **kwargs)
+        if not spool.pending():
+            try:
+                return self._update(update_doc, **kwargs)
+            except Exception as e:
+                if not scorched.spool.unavailable(e):
+                    raise
+        # later updates queue up behind the spooled ones to keep the order
+        spool.append(update_doc, kwargs)
+        spool.start_replay(self._replay_update)
+        return SPOOLED_RESPONSE
+
+    def _replay_update(self, update_doc, params):
+        self._update(update_doc, **params)
+
+    def _update(self, update_doc, **kwargs):
+        method, url, request_kwargs = self.request_for_update(update_doc, **kwargs)
+        response = self.pool_request(self.writers, method, url, **request_kwargs)
         if response.status_code != 200:
             raise scorched.exc.SolrError(response)
-        return response.text
+        return self.json_body(response)
 
-    def update(self, update_doc, **kwargs):
+    def update_stream(self, chunks, **kwargs):
+        """
+        :param chunks: the update message in pieces
+        :type chunks: iterable of bytes
+        :returns: json -- json string
+
+        Send a json update message of unknown length with chunked transfer
+        encoding, reading it while it is sent. The request can't be replayed,
+        so it is never retried.
+        """
+        if not self.writeable:
+            raise TypeError("This Solr instance is only for reading")
+        headers = {"Content-Type": "application/json; charset=utf-8"}
+        body = self.compress_stream(chunks, headers)
+        url = self.url_for_update(**kwargs)
+        response = self.pool_request(
+            self.writers, "POST", url, retry=False, data=body, headers=headers
+        )
+        if response.status_code != 200:
+            raise scorched.exc.SolrError(response)
+        return self.json_body(response)
+
+    def request_for_update(self, update_doc, **kwargs):
         """
         :param update_doc: data send to Solr
         :type update_doc: json data
-        :returns: json -- json string
+        :returns: tuple -- (method, url, request keyword arguments)
 
-        Send json to Solr
+        Build the request sending json to Solr
         """
         if not self.writeable:
             raise TypeError("This Solr instance is only for reading")
         body = update_doc
         if body:
             headers = {"Content-Type": "application/json; charset=utf-8"}
+            body = self.compress(body, headers)
         else:
             headers = {}
         url = self.url_for_update(**kwargs)
-        response = self.request("POST", url, data=body, headers=headers)
-        if response.status_code != 200:
-            raise scorched.exc.SolrError(response)
-        return response.text
+        return "POST", url, {"data": body, "headers": headers}
+
+    def request_for_extract(self, fh, params):
+        """
+        :param fh: binary file (PDF, MSWord, ODF, ...)
+        :type fh: open file handle
+        :param params: query parameters for the extract handler
+        :type params: dict
+        :returns: tuple -- (method, url, request keyword arguments)
+
+        Build the request posting a file to the extract handler.
+        """
+        url = self.url + "update/extract"
+        if self.gzip_level is None:
+            return "POST", url, {"params": params, "files": {"file": fh}}
+        filename = os.path.basename(getattr(fh, "name", None) or "file")
+        body, content_type = urllib3.encode_multipart_formdata(
+            {"file": (filename, fh.read())}
+        )
+        headers = {"Content-Type": content_type}
+        body = self.compress(body, headers)
+        return "POST", url, {"params": params, "data": body, "headers": headers}
+
+    def compress(self, body, headers):
+        """
+        :param body: request body
+        :type body: str or bytes
+        :param headers: request headers, ``Content-Encoding`` is added
+        :type headers: dict
+        :returns: the body, gzipped if ``gzip_level`` is set
+
+        Solr has to accept gzipped request bodies, e.g. through Jetty's
+        GzipHandler with inflation enabled.
+        """
+        if self.gzip_level is None:
+            return body
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        headers["Content-Encoding"] = "gzip"
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    def compress_stream(self, chunks, headers):
+        """
+        :param chunks: request body in pieces
+        :type chunks: iterable of bytes
+        :param headers: request headers, ``Content-Encoding`` is added
+        :type headers: dict
+        :returns: iterable -- the pieces, gzipped on the fly if
+                  ``gzip_level`` is set
+        """
+        if self.gzip_level is None:
+            return chunks
+        headers["Content-Encoding"] = "gzip"
+        return gzip_stream(chunks, self.gzip_level)
 
     def url_for_update(
         self,
@@ -212,21 +642,129 @@ class SolrConnection(object):
         :param params: LuceneQuery converted to a dictionary with search
                        queries
         :type params: dict
-        :returns: json -- json string
+        :returns: json -- json string, or bytes if the response format is
+                  javabin
 
         We perform here a search on the `select` handler of Solr.
         """
+        method, url, kwargs = self.request_for_select(params)
+        response = self.pool_request(
+            self.readers, method, url, idempotent=True, hedge=True, **kwargs
+        )
+        if response.status_code != 200:
+            raise scorched.exc.SolrError(response)
+        if self.response_format == "javabin":
+            return response.content
+        return self.json_body(response)
+
+    def select_stream(self, params, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        :param params: LuceneQuery converted to a dictionary with search
+                       queries
+        :type params: dict
+        :param chunk_size: optional -- bytes read at once
+        :type chunk_size: int
+        :returns: generator of str -- the response body in chunks
+
+        Like :meth:`select` but the body is handed out while it is read.
+        Streamed searches are not hedged.
+        """
+        method, url, kwargs = self.request_for_select(params, wt="json")
+        kwargs["stream"] = True
+        response = self.pool_request(
+            self.readers, method, url, idempotent=True, **kwargs
+        )
+        if response.status_code != 200:
+            raise scorched.exc.SolrError(response)
+        return scorched.streaming.iter_response(response, chunk_size)
+
+    def export(self, params, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        :param params: LuceneQuery converted to a dictionary with search
+                       queries, needs ``fl`` and ``sort``
+        :type params: dict
+        :param chunk_size: optional -- bytes read at once
+        :type chunk_size: int
+        :returns: generator of str -- the response body in chunks
+
+        Stream the complete result set from the `export` handler of Solr.
+        """
+        method, url, kwargs = self.request_for_select(
+            params, wt="json", handler_url=self.export_url
+        )
+        kwargs["stream"] = True
+        response = self.pool_request(
+            self.readers, method, url, idempotent=True, **kwargs
+        )
+        if response.status_code != 200:
+            raise scorched.exc.SolrError(response)
+        return scorched.streaming.iter_response(response, chunk_size)
+
+    def stream(self, expr, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        :param expr: streaming expression
+        :type expr: str
+        :param chunk_size: optional -- bytes read at once
+        :type chunk_size: int
+        :returns: generator of str -- the response body in chunks
+
+        Send a streaming expression to the `stream` handler of Solr.
+        Expressions may write, so they are not failed over to another node.
+        """
+        method, url, kwargs = self.request_for_stream(expr)
+        kwargs["stream"] = True
+        response = self.pool_request(self.readers, method, url, **kwargs)
+        if response.status_code != 200:
+            raise scorched.exc.SolrError(response)
+        return scorched.streaming.iter_response(response, chunk_size)
+
+    def request_for_stream(self, expr):
+        """
+        :param expr: streaming expression
+        :type expr: str
+        :returns: tuple -- (method, url, request keyword arguments)
+
+        Build the request for the `stream` handler. Expressions are always
+        POSTed, they easily exceed the length of a GET url.
+        """
         if not self.readable:
             raise TypeError("This Solr instance is only for writing")
-        params.append(("wt", "json"))
+        kwargs = {
+            "data": scorched.compat.urlencode({"expr": expr}),
+            "headers": {"Content-Type": "application/x-www-form-urlencoded"},
+        }
+        if self.search_timeout != ():
+            kwargs["timeout"] = self.search_timeout
+        return "POST", self.stream_url, kwargs
+
+    def request_for_select(self, params, wt=None, handler_url=None):
+        """
+        :param params: LuceneQuery converted to a dictionary with search
+                       queries
+        :type params: dict
+        :param wt: optional -- response format, defaults to
+                   ``response_format``
+        :type wt: str
+        :param handler_url: optional -- url of the search handler, defaults
+                            to ``select_url``
+        :type handler_url: str
+        :returns: tuple -- (method, url, request keyword arguments)
+
+        Build the request for the `select` handler of Solr. Long queries are
+        POSTed instead of GETted.
+        """
+        if not self.readable:
+            raise TypeError("This Solr instance is only for writing")
+        handler_url = handler_url or self.select_url
+        params.append(("wt", wt or self.response_format))
         qs = scorched.compat.urlencode(params)
-        url = "%s?%s" % (self.select_url, qs)
+        url = "%s?%s" % (handler_url, qs)
         if len(url) > self.max_length_get_url:
             warnings.warn(
                 "Long query URL encountered - POSTing instead of "
                 "GETting. This query will not be cached at the HTTP layer"
             )
-            url = self.select_url
+            url = handler_url
             method = "POST"
             kwargs = {
                 "data": qs,
@@ -237,10 +775,7 @@ class SolrConnection(object):
             kwargs = {}
         if self.search_timeout != ():
             kwargs["timeout"] = self.search_timeout
-        response = self.request(method, url, **kwargs)
-        if response.status_code != 200:
-            raise scorched.exc.SolrError(response)
-        return response.text
+        return method, url, kwargs
 
     def mlt(self, params, content=None):
         """
@@ -252,6 +787,23 @@ class SolrConnection(object):
         Perform a MoreLikeThis query using the content specified
         There may be no content if stream.url is specified in the params.
         """
+        method, url, kwargs = self.request_for_mlt(params, content=content)
+        response = self.pool_request(
+            self.readers, method, url, idempotent=True, **kwargs
+        )
+        if response.status_code != 200:
+            raise scorched.exc.SolrError(response.content)
+        return self.json_body(response)
+
+    def request_for_mlt(self, params, content=None):
+        """
+        :param params: LuceneQuery converted to a dictionary with search
+                       queries
+        :type params: dict
+        :returns: tuple -- (method, url, request keyword arguments)
+
+        Build the request for a MoreLikeThis query.
+        """
         if not self.readable:
             raise TypeError("This Solr instance is only for writing")
         params.append(("wt", "json"))
@@ -275,14 +827,13 @@ class SolrConnection(object):
                     "data": content,
                     "headers": {"Content-Type": "text/plain; charset=utf-8"},
                 }
-        response = self.request(method, url, **kwargs)
-        if response.status_code != 200:
-            raise scorched.exc.SolrError(response.content)
-        return response.text
+        return method, url, kwargs
 
 
 class SolrInterface(object):
     remote_schema_file = "schema?wt=json"
+    # builds streaming expressions for stream()
+    E = scorched.search.StreamExpressionBuilder()
 
     def __init__(
         self,
@@ -292,10 +843,24 @@ class SolrInterface(object):
         retry_timeout=-1,
         max_length_get_url=MAX_LENGTH_GET_URL,
         search_timeout=(),
+        writer_urls=None,
+        balancing="round_robin",
+        retry_policy=None,
+        circuit_breaker=None,
+        hedge_delay=None,
+        gzip_level=None,
+        response_format="json",
+        schema=None,
+        schema_cache=None,
+        lazy_schema=False,
+        lazy_results=False,
+        facet_arrays=False,
+        codec=None,
+        spool=None,
     ):
         """
-        :param url: url to Solr
-        :type url: str
+        :param url: url to Solr, or a list of urls of equivalent replicas
+        :type url: str or list
         :param http_connection: optional -- already existing connection
         :type http_connection: requests connection
         :param mode: optional -- mode (readable, writable) Solr
@@ -308,17 +873,113 @@ class SolrInterface(object):
                                send data before giving up, as a float, or a
                                (connect timeout, read timeout) tuple.
         :type search_timeout: float or tuple
+        :param writer_urls: optional -- urls updates are sent to, defaults to
+                            the first url
+        :type writer_urls: list
+        :param balancing: optional -- how reads are spread over the replicas,
+                          ``round_robin`` or ``least_outstanding``
+        :type balancing: str
+        :param retry_policy: optional -- when to retry failed requests,
+                             replaces ``retry_timeout``
+        :type retry_policy: scorched.retry.RetryPolicy
+        :param circuit_breaker: optional -- fail fast on nodes which keep
+                                failing
+        :type circuit_breaker: scorched.breaker.CircuitBreaker
+        :param hedge_delay: optional -- seconds (or ``"auto"``) after which a
+                            slow search or get is also sent to another replica
+        :type hedge_delay: float or str
+        :param gzip_level: optional -- gzip update, delete and extract request
+                           bodies with this compression level (0-9)
+        :type gzip_level: int
+        :param response_format: optional -- ``json`` or ``javabin``, the
+                                format search responses are requested in
+        :type response_format: str
+        :param schema: optional -- the schema document, Solr is not asked for
+                       it then
+        :type schema: dict
+        :param schema_cache: optional -- cache the schema is taken from and
+                             revalidated through, e.g.
+                             ``scorched.schema.shared_cache``
+        :type schema_cache: scorched.schema.SchemaCache
+        :param lazy_schema: optional -- fetch the schema when it is first
+                            needed instead of in the constructor
+        :type lazy_schema: bool
+        :param lazy_results: optional -- convert the fields of search results
+                             and parse their facets, stats ... on first access
+        :type lazy_results: bool
+        :param facet_arrays: optional -- give field facets of search results
+                             as parallel ``(values, counts)`` sequences
+        :type facet_arrays: bool
+        :param codec: optional -- JSON codec of update messages and responses,
+                      ``"json"``, ``"orjson"`` or a codec instance; by
+                      default the standard library's ``json``, with
+                      responses kept as text in ``original_json``
+        :type codec: str or scorched.codec.JSONCodec
+        :param spool: optional -- durable spool updates are written to while
+                      Solr can't be reached and replayed from later
+        :type spool: scorched.spool.WriteSpool
         """
+        self.codec = scorched.codec.get_codec(codec)
 
         self.conn = SolrConnection(
-            url, http_connection, mode, retry_timeout, max_length_get_url
+            url,
+            http_connection,
+            mode,
+            retry_timeout,
+            max_length_get_url,
+            writer_urls=writer_urls,
+            balancing=balancing,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            hedge_delay=hedge_delay,
+            gzip_level=gzip_level,
+            response_format=response_format,
+            # responses stay text unless a codec was chosen
+            codec=None if codec is None else self.codec,
+            spool=spool,
         )
-        self.schema = self.init_schema()
-        self._datefields = self._extract_datefields(self.schema)
+        self.lazy_results = lazy_results
+        self.facet_arrays = facet_arrays
+        self.schema_cache = schema_cache
+        self._schema = None
+        if schema is not None:
+            self.schema_cache = None
+            self.schema = schema
+        elif not lazy_schema:
+            # fetch (or take from the cache) right away
+            self.schema
+
+    @property
+    def schema(self):
+        """The schema of the core, fetched when it is first needed"""
+        if self.schema_cache is not None:
+            schema = self.schema_cache.get(self.conn.url, self.init_schema)
+            if schema is not self._schema:
+                self.schema = schema
+        elif self._schema is None:
+            self.schema = self.init_schema()
+        return self._schema
+
+    @schema.setter
+    def schema(self, schema):
+        self._schema = schema
+        self._schema_converters = self._extract_converters(schema)
+
+    @property
+    def _converters(self):
+        self.schema  # make sure they belong to the current schema
+        return self._schema_converters
+
+    @property
+    def _datefields(self):
+        return self._converters.datefields
 
     def init_schema(self):
-        response = self.conn.request(
-            "GET", scorched.compat.urljoin(self.conn.url, self.remote_schema_file)
+        response = self.conn.pool_request(
+            self.conn.readers,
+            "GET",
+            scorched.compat.urljoin(self.conn.url, self.remote_schema_file),
+            idempotent=True,
         )
         if response.status_code != 200:
             raise EnvironmentError(
@@ -327,30 +988,17 @@ class SolrInterface(object):
             )
         return response.json()["schema"]
 
+    def _extract_converters(self, schema):
+        # field types are resolved by their java class, e.g. both
+        # <fieldType name="pdates" class="solr.DatePointField" .../> and
+        # <fieldType name="date" class="solr.TrieDateField" .../> hold dates
+        return scorched.schema.FieldConverters(schema)
+
     def _extract_datefields(self, schema):
-        # attn: in modern solr (>=8.x) date fields are declared
-        # as <fieldType name="pdates" class="solr.DatePointField"
-        #               docValues="true" multiValued="true"/>
-        # instead of <fieldType name="date" class="solr.TrieDateField"
-        #                       precisionStep="0" positionIncrementGap="0"/>
-        # This schema parsing is determining the fields by name
-        # and not by java class type. Therefore this is error-prone.
-        ret = [x["name"] for x in schema["fields"] if x["type"] in ["pdate", "date"]]
-        ret.extend(
-            [
-                x["name"]
-                for x in schema["dynamicFields"]
-                if x["type"] in ["pdate", "date"]
-            ]
-        )
-        return ret
+        return self._extract_converters(schema).datefields
 
     def _should_skip_value(self, value):
-        if value is None:
-            return True
-        if isinstance(value, dict) and "set" in value and value["set"] is None:
-            return True
-        return False
+        return should_skip_value(value)
 
     def _prepare_date(self, value):
         """Prepare a value of type date"""
@@ -361,50 +1009,158 @@ class SolrInterface(object):
         return value
 
     def _prepare_docs(self, docs):
-        prepared_docs = []
-        for doc in docs:
-            new_doc = {}
-            for name, value in list(doc.items()):
-                # XXX remove all None fields this is needed for adding date
-                # fields
-                if self._should_skip_value(value):
-                    continue
-                if scorched.dates.is_datetime_field(name, self._datefields):
-                    if isinstance(value, dict) and "set" in value:
-                        value["set"] = self._prepare_date(value["set"])
-                    else:
-                        value = self._prepare_date(value)
-                new_doc[name] = value
-            prepared_docs.append(new_doc)
-        return prepared_docs
+        return prepare_docs(docs, self._converters)
 
-    def add(self, docs, chunk=100, **kwargs):
+    def add(
+        self, docs, chunk=100, stream=False, concurrency=1, processes=None, **kwargs
+    ):
         """
         :param docs: documents to be added
         :type docs: dict
         :param chunk: optional -- size of chunks in which the add command
         should be split
         :type chunk: int
+        :param stream: optional -- send all documents in a single request
+                       whose body is serialized ``chunk`` documents at a
+                       time while it is sent
+        :type stream: bool
+        :param concurrency: optional -- number of chunks sent at the same
+                            time
+        :type concurrency: int
+        :param processes: optional -- number of worker processes preparing
+                          and serializing the chunks
+        :type processes: int
         :param kwargs: optinal -- additional arguments
         :type kwargs: dict
         :returns: list of SolrUpdateResponse  -- A Solr response object.
 
-        Add a document or a list of document to Solr.
+        Add a document or a list of document to Solr. With ``stream``,
+        ``concurrency`` or ``processes`` any iterable of documents, e.g. a
+        generator, can be given.
         """
-        if hasattr(docs, "items") or not is_iter(docs):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        if processes is not None and processes < 1:
+            raise ValueError("processes must be at least 1")
+        if stream and (concurrency > 1 or processes):
+            raise ValueError("stream sends a single request")
+        iterable = stream or concurrency > 1 or processes
+        if hasattr(docs, "items") or not (iterable or is_iter(docs)):
             docs = [docs]
+        if stream:
+            return [
+                scorched.response.SolrUpdateResponse.from_json(
+                    self.conn.update_stream(
+                        self._stream_update_message(docs, chunk), **kwargs
+                    ),
+                    loads=self.codec.loads,
+                )
+            ]
         # to avoid making messages too large, we break the message every
         # chunk docs.
+        messages = self._update_messages(docs, chunk, processes)
+        if concurrency > 1:
+            return self._add_concurrently(messages, concurrency, **kwargs)
         ret = []
-        for doc_chunk in grouper(docs, chunk):
-            update_message = json.dumps(self._prepare_docs(doc_chunk))
-            ret.append(
-                scorched.response.SolrUpdateResponse.from_json(
-                    self.conn.update(update_message, **kwargs)
+        try:
+            for update_message in messages:
+                ret.append(self._send_update_message(update_message, **kwargs))
+        finally:
+            messages.close()
+        return ret
+
+    def _update_messages(self, docs, chunk, processes=None):
+        """Yield the update message of every chunk of ``docs``, prepared by
+        ``processes`` worker processes if given"""
+        if not processes:
+            for doc_chunk in grouper(docs, chunk):
+                yield self.codec.dumps(self._prepare_docs(doc_chunk))
+            return
+        pending = collections.deque()
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_init_prepare_worker,
+            initargs=(self._converters, self.codec),
+        )
+        try:
+            for doc_chunk in grouper(docs, chunk):
+                if len(pending) >= 2 * processes:
+                    yield pending.popleft().result()
+                pending.append(executor.submit(_prepare_update_message, doc_chunk))
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def _send_update_message(self, update_message, **kwargs):
+        return scorched.response.SolrUpdateResponse.from_json(
+            self.conn.update(update_message, **kwargs), loads=self.codec.loads
+        )
+
+    def _add_concurrently(self, messages, concurrency, **kwargs):
+        """
+        Send ``messages`` from ``concurrency`` threads. At most twice as many
+        messages as threads are read ahead, the responses are returned in
+        the order of the messages. After the first failed message no more
+        are sent, messages already sent are waited for and the error is
+        raised.
+        """
+        ret = []
+        pending = collections.deque()
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="scorched-add"
+        )
+        try:
+            for update_message in messages:
+                if len(pending) >= 2 * concurrency:
+                    ret.append(pending.popleft().result())
+                for future in pending:
+                    if future.done() and future.exception() is not None:
+                        future.result()
+                pending.append(
+                    executor.submit(self._send_update_message, update_message, **kwargs)
                 )
-            )
+            while pending:
+                ret.append(pending.popleft().result())
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+            messages.close()
         return ret
 
+    def _stream_update_message(self, docs, chunk):
+        """Yield the json array of ``docs`` in pieces of about
+        ``STREAM_CHUNK_SIZE`` bytes"""
+        buf = bytearray(b"[")
+        separator = b""
+        for doc_chunk in grouper(docs, chunk):
+            # serialize a whole chunk at once, without its brackets
+            data = self.codec.dumps(self._prepare_docs(doc_chunk))[1:-1]
+            if not data:
+                continue
+            buf += separator
+            buf += data
+            separator = b","
+            if len(buf) >= STREAM_CHUNK_SIZE:
+                yield bytes(buf)
+                del buf[:]
+        buf += b"]"
+        yield bytes(buf)
+
+    def batch(self, **kwargs):
+        """
+        :param kwargs: optional -- additional arguments of the update request
+        :type kwargs: dict
+        :returns: UpdateBatch -- collects adds, deletes, commits ... to send
+                  them in a single request
+
+        See :class:`scorched.bulk.UpdateBatch`.
+        """
+        return scorched.bulk.UpdateBatch(self, **kwargs)
+
     def delete_by_query(self, query, **kwargs):
         """
         :param query: criteria how witch entries should be deleted
@@ -413,11 +1169,8 @@ class SolrInterface(object):
 
         Delete entries by a given query
         """
-        delete_message = json.dumps({"delete": {"query": str(query)}})
-        ret = scorched.response.SolrUpdateResponse.from_json(
-            self.conn.update(delete_message, **kwargs)
-        )
-        return ret
+        delete_message = self.codec.dumps({"delete": {"query": str(query)}})
+        return self._send_update_message(delete_message, **kwargs)
 
     def delete_by_ids(self, ids, **kwargs):
         """
@@ -427,11 +1180,8 @@ class SolrInterface(object):
 
         Delete entries by a given id
         """
-        delete_message = json.dumps({"delete": ids})
-        ret = scorched.response.SolrUpdateResponse.from_json(
-            self.conn.update(delete_message, **kwargs)
-        )
-        return ret
+        delete_message = self.codec.dumps({"delete": ids})
+        return self._send_update_message(delete_message, **kwargs)
 
     def commit(self, waitSearcher=None, expungeDeletes=None, softCommit=None):
         """
@@ -449,16 +1199,13 @@ class SolrInterface(object):
 
         A commit operation makes index changes visible to new search requests.
         """
-        ret = scorched.response.SolrUpdateResponse.from_json(
-            self.conn.update(
-                '{"commit": {}}',
-                commit=True,
-                waitSearcher=waitSearcher,
-                expungeDeletes=expungeDeletes,
-                softCommit=softCommit,
-            )
+        return self._send_update_message(
+            '{"commit": {}}',
+            commit=True,
+            waitSearcher=waitSearcher,
+            expungeDeletes=expungeDeletes,
+            softCommit=softCommit,
         )
-        return ret
 
     def optimize(self, waitSearcher=None, maxSegments=None):
         """
@@ -474,15 +1221,12 @@ class SolrInterface(object):
         An optimize is like a hard commit except that it forces all of the
         index segments to be merged into a single segment first.
         """
-        ret = scorched.response.SolrUpdateResponse.from_json(
-            self.conn.update(
-                '{"optimize": {}}',
-                optimize=True,
-                waitSearcher=waitSearcher,
-                maxSegments=maxSegments,
-            )
+        return self._send_update_message(
+            '{"optimize": {}}',
+            optimize=True,
+            waitSearcher=waitSearcher,
+            maxSegments=maxSegments,
         )
-        return ret
 
     def rollback(self):
         """
@@ -491,10 +1235,7 @@ class SolrInterface(object):
         The rollback command rollbacks all add/deletes made to the index since
         the last commit
         """
-        ret = scorched.response.SolrUpdateResponse.from_json(
-            self.conn.update('{"rollback": {}}')
-        )
-        return ret
+        return self._send_update_message('{"rollback": {}}')
 
     def delete_all(self):
         """
@@ -514,7 +1255,7 @@ class SolrInterface(object):
         :type fileds: list of strings
         """
         ret = scorched.response.SolrResponse.from_get_json(
-            self.conn.get(ids, fields), self._datefields
+            self.conn.get(ids, fields), self._converters, loads=self.codec.loads
         )
         return ret
 
@@ -525,13 +1266,96 @@ class SolrInterface(object):
         Search solr
         """
         params = scorched.search.params_from_dict(**kwargs)
+        if self.conn.response_format == "javabin":
+            return scorched.response.SolrResponse.from_javabin(
+                self.conn.select(params),
+                self.schema["uniqueKey"],
+                self._converters,
+                lazy=self.lazy_results,
+                facet_arrays=self.facet_arrays,
+            )
         ret = scorched.response.SolrResponse.from_json(
             self.conn.select(params),
             self.schema["uniqueKey"],
-            self._datefields,
+            self._converters,
+            lazy=self.lazy_results,
+            facet_arrays=self.facet_arrays,
+            loads=self.codec.loads,
         )
         return ret
 
+    def search_stream(self, constructor=None, **kwargs):
+        """
+        :param constructor: optional -- callable each document is passed to
+                            as keyword arguments
+        :type constructor: callable
+        :returns: SolrStreamingResponse -- A streaming Solr response object.
+
+        Search solr, decoding the documents while they are read
+        """
+        params = scorched.search.params_from_dict(**kwargs)
+        return scorched.response.SolrStreamingResponse(
+            self.conn.select_stream(params),
+            self.schema["uniqueKey"],
+            self._converters,
+            constructor=constructor,
+        )
+
+    def export(self, constructor=None, **kwargs):
+        """
+        :param constructor: optional -- callable each document is passed to
+                            as keyword arguments
+        :type constructor: callable
+        :returns: generator -- the documents of the whole result set
+
+        Dump a result set through the `export` handler, which needs ``fl``
+        and ``sort`` on docValues fields. Documents are decoded while they
+        are read.
+        """
+        params = scorched.search.params_from_dict(**kwargs)
+        response = scorched.response.SolrStreamingResponse(
+            self.conn.export(params),
+            self.schema["uniqueKey"],
+            self._converters,
+        )
+        try:
+            for doc in response:
+                # export reports errors after it started as a document
+                if "EXCEPTION" in doc:
+                    raise scorched.exc.SolrError(doc["EXCEPTION"])
+                if constructor is not None:
+                    doc = constructor(**doc)
+                yield doc
+        finally:
+            response.close()
+
+    def stream(self, expr):
+        """
+        :param expr: streaming expression, e.g. built with ``E``
+        :type expr: str or scorched.search.StreamExpression
+        :returns: generator -- the tuples as dicts
+
+        Run a streaming expression on the `stream` handler. The tuples are
+        decoded while they are read; iteration ends at the EOF tuple and an
+        error tuple is raised as SolrError.
+        """
+        chunks = self.conn.stream(str(expr))
+        parser = scorched.streaming.JSONStreamParser(chunks, [("result-set", "docs")])
+        try:
+            for kind, path, value in parser:
+                if kind != scorched.streaming.ITEM:
+                    continue
+                if "EXCEPTION" in value:
+                    raise scorched.exc.SolrError(value["EXCEPTION"])
+                if value.get("EOF"):
+                    return
+                yield scorched.response.SolrResult._prepare_docs(
+                    [value], self._converters
+                )[0]
+            raise scorched.exc.SolrError("Stream ended without the EOF tuple")
+        finally:
+            chunks.close()
+
     def query(self, *args, **kwargs):
         """
         :returns: SolrSearch -- A solrsearch.
@@ -554,7 +1378,8 @@ class SolrInterface(object):
         ret = scorched.response.SolrResponse.from_json(
             self.conn.mlt(params, content=content),
             self.schema["uniqueKey"],
-            self._datefields,
+            self._converters,
+            loads=self.codec.loads,
         )
         return ret
 
@@ -604,13 +1429,12 @@ class SolrInterface(object):
         The ExtractingRequestHandler is expected to be registered at the
         '/update/extract' endpoint in the solrconfig.xml file of the server.
         """
-        url = self.conn.url + "update/extract"
         params = {"wt": "json"}
         if extractOnly:
             params["extractOnly"] = "true"
         params["extractFormat"] = extractFormat
-        files = {"file": fh}
-        response = self.conn.request("POST", url, params=params, files=files)
+        method, url, kwargs = self.conn.request_for_extract(fh, params)
+        response = self.conn.pool_request(self.conn.writers, method, url, **kwargs)
         if response.status_code != 200:
             raise scorched.exc.SolrError(response)
         return scorched.response.SolrExtract.from_json(response.json())
@@ -621,6 +1445,65 @@ class SolrInterface(object):
         return q
 
 
+def should_skip_value(value):
+    if value is None:
+        return True
+    if isinstance(value, dict) and "set" in value and value["set"] is None:
+        return True
+    return False
+
+
+def prepare_docs(docs, converters):
+    """
+    :param docs: documents to be added
+    :type docs: iterable of dicts
+    :param converters: converters of the fields of the schema
+    :type converters: scorched.schema.FieldConverters
+    :returns: list -- copies of the documents the way Solr accepts them
+    """
+    to_solr = converters.to_solr if converters.converts_updates else None
+    prepared_docs = []
+    for doc in docs:
+        new_doc = {}
+        for name, value in list(doc.items()):
+            # XXX remove all None fields this is needed for adding date
+            # fields
+            if should_skip_value(value):
+                continue
+            if to_solr is not None:
+                value = to_solr(name, value)
+            new_doc[name] = value
+        prepared_docs.append(new_doc)
+    return prepared_docs
+
+
+# converters and codec of the worker processes of add(processes=...)
+_worker_converters = None
+_worker_codec = None
+
+
+def _init_prepare_worker(converters, codec):
+    global _worker_converters, _worker_codec
+    _worker_converters = converters
+    _worker_codec = codec
+
+
+def _prepare_update_message(docs):
+    # bytes, so the parent process only has to send them
+    return _worker_codec.dumps(prepare_docs(docs, _worker_converters))
+
+
+def gzip_stream(chunks, level):
+    """Gzip an iterable of bytes piece by piece"""
+    # wbits 31: gzip header and trailer
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
 def grouper(iterable, n):
     """
     grouper('ABCDEFG', 3) --> [['ABC'], ['DEF'], ['G']]
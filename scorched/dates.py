@@ -1,5 +1,6 @@
 import datetime
 import fnmatch
+import functools
 import math
 import re
 
@@ -28,7 +29,46 @@ extended_iso = extended_iso_template % " "
 extended_iso_re = re.compile("^" + extended_iso + "$", re.X)
 
 
+# The form Solr writes dates in
+canonical_iso_re = re.compile(
+    r"(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)(?:\.(\d{1,9}))?Z\Z", re.ASCII
+)
+
+# Number of parsed date strings kept, result sets repeat timestamps a lot
+DATE_CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
 def datetime_from_w3_datestring(s):
+    """Parse a date as Solr writes it, e.g. ``2009-07-23T03:24:34.376Z``,
+    into a datetime in UTC. Anything else, like years before 0AD or after
+    9999AD, is left to :func:`datetime_from_extended_w3_datestring`.
+    Recently parsed strings are cached.
+    """
+    m = canonical_iso_re.match(s)
+    if m is None:
+        return datetime_from_extended_w3_datestring(s)
+    year, month, day, hour, minute, second, fraction = m.groups()
+    microsecond = 0
+    if fraction:
+        # computed like datetime_factory does, to give identical results
+        microsecond = int(math.modf(float("%s.%s" % (second, fraction)))[0] * 1000000)
+    try:
+        return datetime.datetime(
+            int(year),
+            int(month),
+            int(day),
+            int(hour),
+            int(minute),
+            int(second),
+            microsecond,
+            pytz.utc,
+        )
+    except ValueError as e:
+        raise DateTimeRangeError(e.args[0])
+
+
+def datetime_from_extended_w3_datestring(s):
     """We need to extend ISO syntax (as permitted by the standard) to allow
     for dates before 0AD and after 9999AD. This is how to parse such a string
     """
@@ -144,7 +184,102 @@ class solr_date(object):
         return self._dt_obj == other
 
 
+fnmatch_special = re.compile(r"[*?[]")
+
+
+class FieldMatcher(object):
+    """
+    Field names and Solr dynamic field patterns, compiled for lookups.
+
+    ``name in matcher`` is true if ``name`` is one of the names or matches
+    one of the patterns. Exact names are hashed, ``prefix*`` and ``*suffix``
+    patterns (the only ones Solr allows) are checked with a single
+    ``startswith``/``endswith`` each, anything else by one compiled regex.
+    Results are memoized, so every field name is resolved once.
+    """
+
+    max_memo = 10000
+
+    def __init__(self, patterns):
+        self.patterns = tuple(patterns)
+        self.names = frozenset(p for p in self.patterns if "*" not in p)
+        prefixes, suffixes, others = [], [], []
+        for p in self.patterns:
+            if "*" not in p:
+                continue
+            if p.endswith("*") and not fnmatch_special.search(p[:-1]):
+                prefixes.append(p[:-1])
+            elif p.startswith("*") and not fnmatch_special.search(p[1:]):
+                suffixes.append(p[1:])
+            else:
+                others.append(p)
+        self.prefixes = tuple(prefixes)
+        self.suffixes = tuple(suffixes)
+        self.regex = None
+        if others:
+            self.regex = re.compile("|".join(fnmatch.translate(p) for p in others))
+        self.memo = {}
+
+    def __contains__(self, name):
+        try:
+            return self.memo[name]
+        except KeyError:
+            pass
+        result = (
+            name in self.names
+            or (bool(self.prefixes) and name.startswith(self.prefixes))
+            or (bool(self.suffixes) and name.endswith(self.suffixes))
+            or (self.regex is not None and self.regex.match(name) is not None)
+        )
+        if len(self.memo) >= self.max_memo:
+            self.memo.clear()
+        self.memo[name] = result
+        return result
+
+    def prepare_result(self, doc):
+        """Turn the values of the matching fields of a result document into
+        datetimes, in place"""
+        for name, value in doc.items():
+            if name in self:
+                if isinstance(value, (list, tuple)):
+                    doc[name] = [solr_date(v)._dt_obj for v in value]
+                else:
+                    doc[name] = solr_date(value)._dt_obj
+        return doc
+
+    def convert_result(self, name, value):
+        """Convert the value of field ``name`` read from Solr"""
+        if name not in self:
+            return value
+        if isinstance(value, (list, tuple)):
+            return [solr_date(v)._dt_obj for v in value]
+        return solr_date(value)._dt_obj
+
+    def __iter__(self):
+        return iter(self.patterns)
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def __repr__(self):
+        return "FieldMatcher(%r)" % (self.patterns,)
+
+
+def field_matcher(fields):
+    """
+    :param fields: field names and patterns
+    :type fields: iterable, FieldMatcher or scorched.schema.FieldConverters
+    :returns: FieldMatcher -- ``fields`` compiled, or as is if it already is
+              compiled
+    """
+    if hasattr(fields, "prepare_result"):
+        return fields
+    return FieldMatcher(fields)
+
+
 def is_datetime_field(name, datefields):
+    if isinstance(datefields, FieldMatcher):
+        return name in datefields
     if name in datefields:
         return True
     for fieldpattern in [d for d in datefields if "*" in d]:
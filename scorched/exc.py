@@ -3,3 +3,25 @@ from __future__ import unicode_literals
 
 class SolrError(Exception):
     pass
+
+
+class CircuitOpenError(SolrError):
+    """Raised instead of sending a request while every candidate node's
+    circuit breaker is open."""
+
+
+class BulkIndexError(SolrError):
+    """Raised by :class:`scorched.bulk.BulkIndexer` for the batches which
+    failed since the last flush; ``errors`` holds ``(batch, exception)``
+    pairs."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super(BulkIndexError, self).__init__(
+            "%d batch(es) failed, first error: %s" % (len(errors), errors[0][1])
+        )
+
+
+class SpoolFullError(SolrError):
+    """Raised when an update can't be sent and the
+    :class:`scorched.spool.WriteSpool` has no room left for it."""
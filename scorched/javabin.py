@@ -0,0 +1,419 @@
+from __future__ import unicode_literals
+
+import datetime
+import struct
+import uuid
+
+import pytz
+
+from scorched.compat import str
+
+VERSION = 2
+
+NULL = 0
+BOOL_TRUE = 1
+BOOL_FALSE = 2
+BYTE = 3
+SHORT = 4
+DOUBLE = 5
+INT = 6
+LONG = 7
+FLOAT = 8
+DATE = 9
+MAP = 10
+SOLRDOC = 11
+SOLRDOCLST = 12
+BYTEARR = 13
+ITERATOR = 14
+END = 15
+SOLRINPUTDOC = 16
+MAP_ENTRY_ITER = 17
+ENUM_FIELD_VALUE = 18
+MAP_ENTRY = 19
+UUID = 20
+
+# tags combined with a size in the lower 5 bits
+STR = 1 << 5
+SINT = 2 << 5
+SLONG = 3 << 5
+ARR = 4 << 5
+ORDERED_MAP = 5 << 5
+NAMED_LST = 6 << 5
+EXTERN_STRING = 7 << 5
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=pytz.utc)
+
+_byte = struct.Struct(">b")
+_short = struct.Struct(">h")
+_int = struct.Struct(">i")
+_long = struct.Struct(">q")
+_float = struct.Struct(">f")
+_double = struct.Struct(">d")
+
+# marks the end of an ITERATOR or MAP_ENTRY_ITER
+_END = object()
+
+
+def loads(data):
+    """
+    :param data: a response written by Solr's ``wt=javabin``
+    :type data: bytes
+    :returns: the decoded response
+
+    The result has the shape the JSON response writer would produce with
+    the default ``json.nl=flat``: SimpleOrderedMaps become dicts, other
+    NamedLists flat ``[name, value, ...]`` lists and document lists dicts
+    with ``numFound``, ``start`` and ``docs``. Values keep their types
+    though, dates are timezone aware datetimes in UTC and floats are single
+    precision.
+    """
+    if not data or data[0] != VERSION:
+        raise ValueError("Not a javabin version %d stream" % VERSION)
+    decoder = JavaBinDecoder(data)
+    try:
+        return decoder.read_value()
+    except (IndexError, struct.error):
+        raise ValueError("Truncated javabin stream")
+
+
+class JavaBinDecoder(object):
+    """
+    Reads values from a javabin byte string, see ``JavaBinCodec`` in SolrJ.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 1  # behind the version byte
+        self.strings = []
+
+    def read_value(self):
+        data = self.data
+        tag = data[self.pos]
+        self.pos += 1
+        kind = tag >> 5
+        # strings, field names and small ints make up most of a response,
+        # they are decoded inline
+        if kind == 1:
+            size = tag & 0x1F
+            if size == 0x1F:
+                size += self.read_vint()
+            start = self.pos
+            self.pos = end = start + size
+            if end > len(data):
+                raise IndexError(end)
+            return str(data[start:end], "utf-8")
+        if kind == 7:
+            index = tag & 0x1F
+            if index == 0x1F:
+                index += self.read_vint()
+            if index:
+                return self.strings[index - 1]
+            value = self.read_value()
+            self.strings.append(value)
+            return value
+        if kind == 2 or kind == 3:
+            value = tag & 0x0F
+            if tag & 0x10:
+                value |= self.read_vint() << 4
+            return value
+        if kind:
+            return self.tagged_readers[kind](self, tag)
+        try:
+            reader = self.readers[tag]
+        except KeyError:
+            raise ValueError("Unsupported javabin tag %d" % tag)
+        return reader(self)
+
+    def _unpack(self, fmt):
+        (value,) = fmt.unpack_from(self.data, self.pos)
+        self.pos += fmt.size
+        return value
+
+    def _read_bytes(self, size):
+        start = self.pos
+        end = start + size
+        if end > len(self.data):
+            raise IndexError(end)
+        value = self.data[start:end]
+        self.pos = end
+        return value
+
+    def read_vint(self):
+        data = self.data
+        value = shift = 0
+        while True:
+            b = data[self.pos]
+            self.pos += 1
+            value |= (b & 0x7F) << shift
+            if not b & 0x80:
+                return value
+            shift += 7
+
+    def read_size(self, tag):
+        size = tag & 0x1F
+        if size == 0x1F:
+            size += self.read_vint()
+        return size
+
+    # tags with a size, STR, SINT, SLONG and EXTERN_STRING are inlined
+
+    def read_array(self, tag):
+        return [self.read_value() for _ in range(self.read_size(tag))]
+
+    def read_ordered_map(self, tag):
+        # SimpleOrderedMap
+        result = {}
+        for _ in range(self.read_size(tag)):
+            name = self.read_value()
+            result[name] = self.read_value()
+        return result
+
+    def read_named_list(self, tag):
+        # NamedList, rendered as a flat list like json.nl=flat does
+        return [self.read_value() for _ in range(2 * self.read_size(tag))]
+
+    # simple tags
+
+    def read_null(self):
+        return None
+
+    def read_true(self):
+        return True
+
+    def read_false(self):
+        return False
+
+    def read_byte(self):
+        return self._unpack(_byte)
+
+    def read_short(self):
+        return self._unpack(_short)
+
+    def read_double(self):
+        return self._unpack(_double)
+
+    def read_int(self):
+        return self._unpack(_int)
+
+    def read_long(self):
+        return self._unpack(_long)
+
+    def read_float(self):
+        return self._unpack(_float)
+
+    def read_date(self):
+        return EPOCH + datetime.timedelta(milliseconds=self._unpack(_long))
+
+    def read_map(self):
+        result = {}
+        for _ in range(self.read_vint()):
+            key = self.read_value()
+            result[key] = self.read_value()
+        return result
+
+    def read_solr_doc(self):
+        tag = self.data[self.pos]
+        self.pos += 1
+        doc = {}
+        for _ in range(self.read_size(tag)):
+            name = self.read_value()
+            if isinstance(name, dict):
+                # anonymous child document
+                doc.setdefault("_childDocuments_", []).append(name)
+                continue
+            doc[name] = self.read_value()
+        return doc
+
+    def read_solr_doc_list(self):
+        header = self.read_value()
+        result = {"numFound": header[0], "start": header[1]}
+        if header[2] is not None:
+            result["maxScore"] = header[2]
+        if len(header) > 3:
+            result["numFoundExact"] = header[3]
+        result["docs"] = self.read_value()
+        return result
+
+    def read_byte_array(self):
+        return bytes(self._read_bytes(self.read_vint()))
+
+    def read_iterator(self):
+        result = []
+        while True:
+            value = self.read_value()
+            if value is _END:
+                return result
+            result.append(value)
+
+    def read_end(self):
+        return _END
+
+    def read_map_entry_iter(self):
+        result = {}
+        while True:
+            key = self.read_value()
+            if key is _END:
+                return result
+            result[key] = self.read_value()
+
+    def read_enum_field_value(self):
+        self.read_value()  # the ordinal
+        return self.read_value()
+
+    def read_map_entry(self):
+        key = self.read_value()
+        return {key: self.read_value()}
+
+    def read_uuid(self):
+        return str(uuid.UUID(bytes=bytes(self._read_bytes(16))))
+
+    tagged_readers = {
+        ARR >> 5: read_array,
+        ORDERED_MAP >> 5: read_ordered_map,
+        NAMED_LST >> 5: read_named_list,
+    }
+
+    readers = {
+        NULL: read_null,
+        BOOL_TRUE: read_true,
+        BOOL_FALSE: read_false,
+        BYTE: read_byte,
+        SHORT: read_short,
+        DOUBLE: read_double,
+        INT: read_int,
+        LONG: read_long,
+        FLOAT: read_float,
+        DATE: read_date,
+        MAP: read_map,
+        SOLRDOC: read_solr_doc,
+        SOLRDOCLST: read_solr_doc_list,
+        BYTEARR: read_byte_array,
+        ITERATOR: read_iterator,
+        END: read_end,
+        MAP_ENTRY_ITER: read_map_entry_iter,
+        ENUM_FIELD_VALUE: read_enum_field_value,
+        MAP_ENTRY: read_map_entry,
+        UUID: read_uuid,
+    }
+
+
+def dumps(value):
+    """
+    :param value: a decoded JSON response
+    :returns: bytes -- the response the way Solr's javabin writer sends it
+
+    Counterpart of :func:`loads` for tests and benchmarks: dicts holding
+    ``numFound``, ``start`` and ``docs`` become document lists, other dicts
+    SimpleOrderedMaps.
+    """
+    encoder = JavaBinEncoder()
+    encoder.out.append(VERSION)
+    encoder.write_value(value)
+    return bytes(encoder.out)
+
+
+class JavaBinEncoder(object):
+    def __init__(self):
+        self.out = bytearray()
+        self.strings = {}
+
+    def write_vint(self, value):
+        while value & ~0x7F:
+            self.out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        self.out.append(value)
+
+    def write_tag(self, tag, size):
+        if size < 0x1F:
+            self.out.append(tag | size)
+        else:
+            self.out.append(tag | 0x1F)
+            self.write_vint(size - 0x1F)
+
+    def write_small(self, tag, value):
+        if value < 0x10:
+            self.out.append(tag | value)
+        else:
+            self.out.append(tag | 0x10 | (value & 0x0F))
+            self.write_vint(value >> 4)
+
+    def write_str(self, value):
+        data = value.encode("utf-8")
+        self.write_tag(STR, len(data))
+        self.out += data
+
+    def write_extern_string(self, value):
+        index = self.strings.get(value)
+        if index is not None:
+            self.write_tag(EXTERN_STRING, index)
+            return
+        self.write_tag(EXTERN_STRING, 0)
+        self.write_str(value)
+        self.strings[value] = len(self.strings) + 1
+
+    def write_value(self, value):
+        out = self.out
+        if value is None:
+            out.append(NULL)
+        elif value is True:
+            out.append(BOOL_TRUE)
+        elif value is False:
+            out.append(BOOL_FALSE)
+        elif isinstance(value, int):
+            self.write_int(value)
+        elif isinstance(value, float):
+            out.append(DOUBLE)
+            out += _double.pack(value)
+        elif isinstance(value, str):
+            self.write_str(value)
+        elif isinstance(value, bytes):
+            out.append(BYTEARR)
+            self.write_vint(len(value))
+            out += value
+        elif isinstance(value, datetime.datetime):
+            out.append(DATE)
+            out += _long.pack((value - EPOCH) // datetime.timedelta(milliseconds=1))
+        elif isinstance(value, (list, tuple)):
+            self.write_tag(ARR, len(value))
+            for item in value:
+                self.write_value(item)
+        elif isinstance(value, dict):
+            self.write_dict(value)
+        else:
+            raise TypeError("Can't encode %r as javabin" % (value,))
+
+    def write_int(self, value):
+        out = self.out
+        if 0 <= value < 1 << 31:
+            self.write_small(SINT, value)
+        elif -(1 << 31) <= value < 1 << 31:
+            out.append(INT)
+            out += _int.pack(value)
+        elif 0 <= value < 1 << 56:
+            self.write_small(SLONG, value)
+        else:
+            out.append(LONG)
+            out += _long.pack(value)
+
+    def write_dict(self, value):
+        if "docs" not in value or "numFound" not in value:
+            self.write_tag(ORDERED_MAP, len(value))
+            for key, item in value.items():
+                self.write_value(key)
+                self.write_value(item)
+            return
+        self.out.append(SOLRDOCLST)
+        header = [value["numFound"], value.get("start", 0), value.get("maxScore")]
+        if "numFoundExact" in value:
+            header.append(value["numFoundExact"])
+        self.write_value(header)
+        self.write_tag(ARR, len(value["docs"]))
+        for doc in value["docs"]:
+            self.write_doc(doc)
+
+    def write_doc(self, doc):
+        self.out.append(SOLRDOC)
+        self.write_tag(ORDERED_MAP, len(doc))
+        for name, value in doc.items():
+            self.write_extern_string(name)
+            self.write_value(value)
@@ -0,0 +1,256 @@
+from __future__ import unicode_literals
+
+import collections
+import itertools
+import threading
+import time
+
+BALANCING_STRATEGIES = ("round_robin", "least_outstanding")
+
+# Status codes which mean that the node, not the request, is the problem
+NODE_FAILURE_STATUS_CODES = (502, 503, 504)
+
+
+class SolrNode(object):
+    """
+    One Solr base url plus the bookkeeping needed to balance requests
+    across it.
+    """
+
+    def __init__(self, url, breaker=None):
+        self.url = url.rstrip("/") + "/"
+        self.healthy = True
+        self.outstanding = 0
+        self.ejected_at = None
+        self.breaker = breaker
+
+    def available(self):
+        return self.breaker is None or self.breaker.available()
+
+    def rebase(self, url, base):
+        """
+        :param url: url built against ``base``
+        :type url: str
+        :param base: base url the handler urls were built from
+        :type base: str
+        :returns: str -- the same url pointing to this node
+
+        Urls not starting with ``base`` are returned untouched.
+        """
+        if url.startswith(base):
+            prefix = len(base)
+            return self.url + url[prefix:]
+        return url
+
+    def __repr__(self):
+        return "<SolrNode %s %s>" % (
+            self.url,
+            "healthy" if self.healthy else "ejected",
+        )
+
+
+class NodePool(object):
+    """
+    A set of equivalent Solr nodes.
+
+    Requests are spread over the healthy nodes either round robin or to the
+    node with the fewest requests in flight. Nodes which fail are ejected and
+    re-probed from a background thread until ``probe`` reports them healthy
+    again. The thread only runs while at least one node is ejected.
+    """
+
+    def __init__(
+        self,
+        urls,
+        balancing="round_robin",
+        probe=None,
+        probe_interval=5.0,
+        breaker=None,
+    ):
+        """
+        :param urls: base urls of the nodes, or SolrNode objects shared with
+                     another pool
+        :type urls: list
+        :param balancing: optional -- ``round_robin`` or ``least_outstanding``
+        :type balancing: str
+        :param probe: optional -- callable taking a SolrNode and returning
+                      True if the node is healthy
+        :type probe: callable
+        :param probe_interval: optional -- seconds between two probes of an
+                               ejected node
+        :type probe_interval: float
+        :param breaker: optional -- circuit breaker cloned for every node
+        :type breaker: scorched.breaker.CircuitBreaker
+        """
+        if not urls:
+            raise ValueError("NodePool needs at least one url")
+        if balancing not in BALANCING_STRATEGIES:
+            raise ValueError(
+                "balancing must be one of %s" % ", ".join(BALANCING_STRATEGIES)
+            )
+        self.nodes = [
+            (
+                url
+                if isinstance(url, SolrNode)
+                else SolrNode(url, breaker.clone() if breaker is not None else None)
+            )
+            for url in urls
+        ]
+        self.balancing = balancing
+        self.probe = probe
+        self.probe_interval = probe_interval
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._prober = None
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    @property
+    def healthy_nodes(self):
+        return [node for node in self.nodes if node.healthy]
+
+    def pick(self, exclude=()):
+        """
+        :param exclude: optional -- nodes which should not be used
+        :type exclude: list
+        :returns: SolrNode or None if every node is excluded or its circuit
+                  breaker is open
+
+        Choose the node for the next request. If no node is healthy all
+        nodes are considered, failing over to a node which might have
+        recovered is better than not trying at all.
+        """
+        exclude = list(exclude)
+        while True:
+            candidates = [n for n in self.nodes if n not in exclude and n.available()]
+            candidates = [n for n in candidates if n.healthy] or candidates
+            if not candidates:
+                return None
+            if self.balancing == "least_outstanding":
+                with self._lock:
+                    node = min(candidates, key=lambda n: n.outstanding)
+            else:
+                node = candidates[next(self._counter) % len(candidates)]
+            if node.breaker is None or node.breaker.allow():
+                return node
+            # lost the half-open trial slot to another thread
+            exclude.append(node)
+
+    def acquire(self, node):
+        with self._lock:
+            node.outstanding += 1
+
+    def release(self, node):
+        with self._lock:
+            node.outstanding -= 1
+
+    def record(self, node, failed):
+        """
+        :param node: node which answered or failed
+        :type node: SolrNode
+        :param failed: did the node fail
+        :type failed: bool
+
+        Feed the outcome of a request to the node's circuit breaker and eject
+        the node if it failed.
+        """
+        if node.breaker is not None:
+            if failed:
+                node.breaker.record_failure()
+            else:
+                node.breaker.record_success()
+        if failed:
+            self.eject(node)
+
+    def status(self):
+        """
+        :returns: list -- one dict per node for monitoring
+        """
+        ret = []
+        for node in self.nodes:
+            status = {
+                "url": node.url,
+                "healthy": node.healthy,
+                "outstanding": node.outstanding,
+            }
+            if node.breaker is not None:
+                status["breaker"] = node.breaker.stats()
+            ret.append(status)
+        return ret
+
+    def eject(self, node):
+        """
+        Take ``node`` out of rotation until a probe succeeds. A pool with a
+        single node never ejects it.
+        """
+        if len(self.nodes) == 1 or not node.healthy:
+            return
+        with self._lock:
+            node.healthy = False
+            node.ejected_at = time.time()
+            if self.probe is not None and (
+                self._prober is None or not self._prober.is_alive()
+            ):
+                self._prober = threading.Thread(
+                    target=self._probe_ejected, name="scorched-node-prober"
+                )
+                self._prober.daemon = True
+                self._prober.start()
+
+    def restore(self, node):
+        with self._lock:
+            node.healthy = True
+            node.ejected_at = None
+
+    def _probe_ejected(self):
+        while True:
+            time.sleep(self.probe_interval)
+            with self._lock:
+                ejected = [node for node in self.nodes if not node.healthy]
+                if not ejected:
+                    self._prober = None
+                    return
+            for node in ejected:
+                try:
+                    healthy = self.probe(node)
+                except Exception:
+                    healthy = False
+                if healthy:
+                    self.restore(node)
+
+
+class LatencyTracker(object):
+    """
+    Keeps the latencies of the most recent requests to estimate a
+    percentile, e.g. to learn the delay after which a request is hedged.
+    """
+
+    def __init__(self, size=200, min_samples=20):
+        """
+        :param size: optional -- number of latencies kept
+        :type size: int
+        :param min_samples: optional -- latencies needed before
+                            :meth:`percentile` returns an estimate
+        :type min_samples: int
+        """
+        self.samples = collections.deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, percent):
+        """
+        :param percent: e.g. 95
+        :type percent: float
+        :returns: float -- the latency or None without enough samples
+        """
+        samples = sorted(self.samples)
+        if len(samples) < self.min_samples:
+            return None
+        index = int(round(percent / 100.0 * (len(samples) - 1)))
+        return samples[index]
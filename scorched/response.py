@@ -1,11 +1,14 @@
 from __future__ import unicode_literals
 
+import collections
 import json
-from collections.abc import Sequence
+from collections.abc import MutableMapping, Sequence
 
+import scorched.columns
 import scorched.dates
+import scorched.javabin
+import scorched.streaming
 from scorched.compat import str
-from scorched.search import is_iter
 
 
 class SolrFacetCounts(object):
@@ -23,34 +26,42 @@ class SolrFacetCounts(object):
         self.facet_fields = dict(self.facet_fields)
 
     @classmethod
-    def from_json(cls, response):
+    def from_json(cls, response, arrays=False):
+        """
+        :param response: the decoded response
+        :type response: dict
+        :param arrays: optional -- give the field facets as a pair of
+                       parallel sequences ``(values, counts)`` instead of a
+                       list of ``(value, count)`` tuples
+        :type arrays: bool
+        """
         try:
             facet_counts = response["facet_counts"]
         except KeyError:
             return SolrFacetCounts()
         facet_fields = {}
         for facet_field, facet_values in list(facet_counts["facet_fields"].items()):
-            facets = []
             # Change each facet list from [a, 1, b, 2, c, 3 ...] to
-            # [(a, 1), (b, 2), (c, 3) ...]
-            for n, value in enumerate(facet_values):
-                if n & 1 == 0:
-                    name = value
-                else:
-                    facets.append((name, value))
-            facet_fields[facet_field] = facets
+            # [(a, 1), (b, 2), (c, 3) ...], or to ([a, b, c ...], [1, 2, 3 ...])
+            if arrays:
+                facet_fields[facet_field] = (
+                    facet_values[0::2],
+                    scorched.columns.to_column(
+                        facet_values[1::2], use_numpy=scorched.columns.numpy is not None
+                    ),
+                )
+            else:
+                facet_fields[facet_field] = list(
+                    zip(facet_values[0::2], facet_values[1::2])
+                )
         facet_counts["facet_fields"] = facet_fields
         for facet_field in list(facet_counts["facet_ranges"].keys()):
-            counts = []
             count_list = facet_counts["facet_ranges"][facet_field]["counts"]
             # Change each facet list from [a, 1, b, 2, c, 3 ...] to
             # [(a, 1), (b, 2), (c, 3) ...]
-            for n, value in enumerate(count_list):
-                if n & 1 == 0:
-                    name = value
-                else:
-                    counts.append((name, value))
-            facet_counts["facet_ranges"][facet_field]["counts"] = counts
+            facet_counts["facet_ranges"][facet_field]["counts"] = list(
+                zip(count_list[0::2], count_list[1::2])
+            )
         return SolrFacetCounts(**facet_counts)
 
 
@@ -97,80 +108,180 @@ class SolrStats(object):
 
 class SolrUpdateResponse(object):
     @classmethod
-    def from_json(cls, jsonmsg):
+    def from_json(cls, jsonmsg, loads=json.loads):
         self = cls()
         self.original_json = jsonmsg
-        doc = json.loads(jsonmsg)
+        doc = loads(jsonmsg)
         details = doc["responseHeader"]
         for attr in ["QTime", "params", "status"]:
             setattr(self, attr, details.get(attr))
+        # see scorched.spool
+        self.spooled = details.get("spooled", False)
         if self.status != 0:
             raise ValueError("Response indicates an error")
         return self
 
 
 class SolrResponse(Sequence):
+    # parsed on first access in lazy mode
+    sections = (
+        "facet_counts",
+        "spellcheck",
+        "group_field",
+        "groups",
+        "highlighting",
+        "debug",
+        "next_cursor_mark",
+        "more_like_these",
+        "term_vectors",
+        "interesting_terms",
+        "stats",
+    )
+
     @classmethod
-    def from_json(cls, jsonmsg, unique_key, datefields=()):
-        self = cls()
+    def from_json(
+        cls,
+        jsonmsg,
+        unique_key,
+        datefields=(),
+        lazy=False,
+        facet_arrays=False,
+        loads=json.loads,
+    ):
+        self = cls.from_dict(loads(jsonmsg), unique_key, datefields, lazy, facet_arrays)
         self.original_json = jsonmsg
-        doc = json.loads(jsonmsg)
+        return self
+
+    @classmethod
+    def from_javabin(
+        cls, data, unique_key, converters=None, lazy=False, facet_arrays=False
+    ):
+        """Generate instance from a ``wt=javabin`` response
+
+        javabin keeps dates typed, so no date fields need to be converted.
+        ``converters`` (scorched.schema.FieldConverters) may convert the
+        values of other types.
+        """
+        return cls.from_dict(
+            scorched.javabin.loads(data),
+            unique_key,
+            converters or (),
+            lazy,
+            facet_arrays,
+        )
+
+    @classmethod
+    def from_dict(cls, doc, unique_key, datefields=(), lazy=False, facet_arrays=False):
+        """Generate instance from an already decoded response
+
+        With ``lazy`` the documents are :class:`LazyDocument` mappings
+        converting their fields on first access, and the sections besides
+        the result (facet counts, groups, stats ...) are parsed on first
+        attribute access. With ``facet_arrays`` field facets are pairs of
+        parallel sequences, see :meth:`SolrFacetCounts.from_json`.
+        """
+        self = cls()
         details = doc["responseHeader"]
         for attr in ["QTime", "params", "status"]:
             setattr(self, attr, details.get(attr))
+        # see scorched.spool
+        self.spooled = details.get("spooled", False)
         if self.status != 0:
             raise ValueError("Response indicates an error")
+        self._doc = doc
+        self._unique_key = unique_key
+        self._datefields = scorched.dates.field_matcher(datefields)
+        self._lazy = lazy
+        self._facet_arrays = facet_arrays
         self.result = SolrResult()
         if doc.get("response"):
-            self.result = SolrResult.from_json(doc["response"], datefields)
+            self.result = SolrResult.from_json(doc["response"], self._datefields, lazy)
         # TODO mlt/ returns match what should we do with it ?
         # if doc.get('match'):
         #    self.result = SolrResult.from_json(doc['match'], datefields)
-        self.facet_counts = SolrFacetCounts.from_json(doc)
-        self.spellcheck = doc.get("spellcheck", {})
+        if lazy:
+            if doc.get("highlighting"):
+                # merged into the documents, which have to carry it
+                self.highlighting
+            return self
+        for name in self.sections:
+            getattr(self, name)
+        del self._doc, self._unique_key, self._datefields, self._lazy
+        del self._facet_arrays
+        return self
+
+    def __getattr__(self, name):
+        if name not in self.sections or "_doc" not in self.__dict__:
+            raise AttributeError(name)
+        value = getattr(self, "_parse_" + name)(self._doc)
+        setattr(self, name, value)
+        return value
+
+    def _parse_facet_counts(self, doc):
+        return SolrFacetCounts.from_json(doc, self._facet_arrays)
+
+    def _parse_spellcheck(self, doc):
+        return doc.get("spellcheck", {})
+
+    def _parse_group_field(self, doc):
         if self.params is not None:
-            self.group_field = self.params.get("group.field")
-        else:
-            self.group_field = None
-        self.groups = {}
-        if self.group_field is not None:
-            self.groups = SolrGroupResult.from_json(
-                doc["grouped"], self.group_field, datefields
-            )
-        self.highlighting = doc.get("highlighting", {})
-        if self.highlighting:
+            return self.params.get("group.field")
+        return None
+
+    def _parse_groups(self, doc):
+        if self.group_field is None:
+            return {}
+        return SolrGroupResult.from_json(
+            doc["grouped"], self.group_field, self._datefields, self._lazy
+        )
+
+    def _parse_highlighting(self, doc):
+        highlighting = doc.get("highlighting", {})
+        if highlighting:
             # Add highlighting info to the individual documents.
+            unique_key = self._unique_key
             if doc.get("response"):
                 for d in self.result.docs:
                     k = str(d[unique_key])
-                    if k in self.highlighting:
-                        d["solr_highlights"] = self.highlighting[k]
+                    if k in highlighting:
+                        d["solr_highlights"] = highlighting[k]
             elif doc.get("grouped"):
                 for group in getattr(self.groups, self.group_field)["groups"]:
                     for d in group["doclist"]["docs"]:
                         k = str(d[unique_key])
-                        if k in self.highlighting:
-                            d["solr_highlights"] = self.highlighting[k]
+                        if k in highlighting:
+                            d["solr_highlights"] = highlighting[k]
+        return highlighting
+
+    def _parse_debug(self, doc):
+        return doc.get("debug", {})
 
-        self.debug = doc.get("debug", {})
-        self.next_cursor_mark = doc.get("nextCursorMark")
-        self.more_like_these = dict(
-            (k, SolrResult.from_json(v, datefields))
+    def _parse_next_cursor_mark(self, doc):
+        return doc.get("nextCursorMark")
+
+    def _parse_more_like_these(self, doc):
+        return dict(
+            (k, SolrResult.from_json(v, self._datefields, self._lazy))
             for (k, v) in list(doc.get("moreLikeThis", {}).items())
         )
-        self.term_vectors = self.parse_term_vectors(doc.get("termVectors", []))
+
+    def _parse_term_vectors(self, doc):
+        return self.parse_term_vectors(doc.get("termVectors", []))
+
+    def _parse_interesting_terms(self, doc):
         # can be computed by MoreLikeThisHandler
-        self.interesting_terms = doc.get("interestingTerms", None)
-        self.stats = SolrStats.from_json(doc)
-        return self
+        return doc.get("interestingTerms", None)
+
+    def _parse_stats(self, doc):
+        return SolrStats.from_json(doc)
 
     @classmethod
-    def from_get_json(cls, jsonmsg, datefields=()):
+    def from_get_json(cls, jsonmsg, datefields=(), loads=json.loads):
         """Generate instance from the response of a RealTime Get"""
         self = cls()
         self.groups = {}
         self.original_json = jsonmsg
-        doc = json.loads(jsonmsg)
+        doc = loads(jsonmsg)
         self.result = SolrResult.from_json(doc["response"], datefields)
         return self
 
@@ -207,28 +318,111 @@ class SolrResponse(Sequence):
             return self.result.docs[key]
 
 
+class LazyDocument(MutableMapping):
+    """
+    A result document converting the value of a field on first access.
+
+    It is a mapping like the dicts of an eager response; ``dict(doc)``
+    converts all fields.
+    """
+
+    __slots__ = ("_fields", "_convert", "_converted")
+
+    def __init__(self, fields, convert):
+        """
+        :param fields: the document as decoded from the response
+        :type fields: dict
+        :param convert: called with the name and the value of a field
+        :type convert: callable
+        """
+        self._fields = fields
+        self._convert = convert
+        self._converted = None
+
+    @classmethod
+    def wrap(cls, docs, datefields):
+        """Wrap decoded documents, converting them with ``datefields``"""
+        convert = scorched.dates.field_matcher(datefields).convert_result
+        return [cls(doc, convert) for doc in docs]
+
+    def __getitem__(self, name):
+        value = self._fields[name]
+        converted = self._converted
+        if converted is None:
+            converted = self._converted = set()
+        if name not in converted:
+            value = self._fields[name] = self._convert(name, value)
+            converted.add(name)
+        return value
+
+    def __setitem__(self, name, value):
+        self._fields[name] = value
+        if self._converted is None:
+            self._converted = set()
+        self._converted.add(name)
+
+    def __delitem__(self, name):
+        del self._fields[name]
+        if self._converted is not None:
+            self._converted.discard(name)
+
+    def __contains__(self, name):
+        return name in self._fields
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
 class SolrResult(object):
+    # date fields of lazy documents, whose values may still be strings
+    _datefields = ()
+
     @classmethod
-    def from_json(cls, node, datefields=()):
+    def from_json(cls, node, datefields=(), lazy=False):
         self = cls()
         self.name = "response"
         self.numFound = int(node["numFound"])
         self.start = int(node["start"])
         docs = node["docs"]
-        self.docs = self._prepare_docs(docs, datefields)
+        if lazy:
+            self.docs = LazyDocument.wrap(docs, datefields)
+            datefields = scorched.dates.field_matcher(datefields)
+            self._datefields = getattr(datefields, "datefields", datefields)
+        else:
+            self.docs = self._prepare_docs(docs, datefields)
         return self
 
     @staticmethod
     def _prepare_docs(docs, datefields):
+        prepare = scorched.dates.field_matcher(datefields).prepare_result
         for doc in docs:
-            for name, value in list(doc.items()):
-                if scorched.dates.is_datetime_field(name, datefields):
-                    if is_iter(value):
-                        doc[name] = [scorched.dates.solr_date(v)._dt_obj for v in value]
-                    else:
-                        doc[name] = scorched.dates.solr_date(value)._dt_obj
+            prepare(doc)
         return docs
 
+    def to_columns(self, fields=None, use_numpy=None):
+        """
+        :param fields: optional -- names of the columns, by default every
+                       field of the documents
+        :type fields: list
+        :param use_numpy: optional -- build NumPy arrays, by default if NumPy
+                          is installed
+        :type use_numpy: bool
+        :returns: dict -- a column (array or list) per field, see
+                  :func:`scorched.columns.to_columns`
+        """
+        # lazy documents are read without converting their fields one by one
+        docs = [
+            doc._fields if isinstance(doc, LazyDocument) else doc
+            for doc in getattr(self, "docs", ())
+        ]
+        return scorched.columns.to_columns(docs, fields, self._datefields, use_numpy)
+
     def __str__(self):
         return "{numFound} results found, starting at #{start}".format(
             numFound=self.numFound, start=self.start
@@ -237,18 +431,24 @@ class SolrResult(object):
 
 class SolrGroupResult(object):
     @classmethod
-    def from_json(cls, node, group_field, datefields=()):
+    def from_json(cls, node, group_field, datefields=(), lazy=False):
         self = cls()
         self.name = "response"
         self.group_field = group_field
         groups = node[group_field]["groups"]
+        if lazy:
+            for group in groups:
+                doclist = group["doclist"]
+                doclist["docs"] = LazyDocument.wrap(doclist["docs"], datefields)
+        else:
+            groups = self._prepare_groups(groups, datefields)
         setattr(
             self,
             group_field,
             {
                 "matches": node[group_field]["matches"],
                 "ngroups": node[group_field]["ngroups"],
-                "groups": self._prepare_groups(groups, datefields),
+                "groups": groups,
             },
         )
         return self
@@ -256,16 +456,10 @@ class SolrGroupResult(object):
     @staticmethod
     def _prepare_groups(groups, datefields):
         """Iterate over the docs and the groups and cast fields appropriately"""
+        prepare = scorched.dates.field_matcher(datefields).prepare_result
         for group in groups:
             for doc in group["doclist"]["docs"]:
-                for name, value in doc.items():
-                    if scorched.dates.is_datetime_field(name, datefields):
-                        if is_iter(value):
-                            doc[name] = [
-                                scorched.dates.solr_date(v)._dt_obj for v in value
-                            ]
-                        else:
-                            doc[name] = scorched.dates.solr_date(value)._dt_obj
+                prepare(doc)
         return groups
 
     def __str__(self):
@@ -273,3 +467,122 @@ class SolrGroupResult(object):
             ngroups=getattr(self, self.group_field)["ngroups"],
             matches=getattr(self, self.group_field)["matches"],
         )
+
+
+class SolrStreamingResponse(object):
+    """
+    Response of a search whose documents are decoded while they are read.
+
+    Iterating yields the documents one by one, so a page of a hundred
+    thousand documents never has to be held in memory. The response header,
+    ``numFound`` and ``start`` are available right away. Everything Solr
+    sends after the documents (facet counts, highlighting, stats,
+    ``next_cursor_mark`` ...) is read on first access; documents not iterated
+    over yet are kept for later then. Highlighting is not merged into the
+    documents, it is only available as ``highlighting``.
+
+    The documents can be iterated over once.
+    """
+
+    trailing = (
+        "facet_counts",
+        "spellcheck",
+        "group_field",
+        "groups",
+        "highlighting",
+        "debug",
+        "next_cursor_mark",
+        "more_like_these",
+        "term_vectors",
+        "interesting_terms",
+        "stats",
+    )
+
+    def __init__(self, chunks, unique_key, datefields=(), constructor=None):
+        """
+        :param chunks: the response body as str chunks
+        :type chunks: iterable
+        :param unique_key: name of the unique key field
+        :type unique_key: str
+        :param datefields: optional -- names of the date fields, or the
+                           converters of all fields
+        :type datefields: tuple or scorched.schema.FieldConverters
+        :param constructor: optional -- callable each document is passed to
+                            as keyword arguments
+        :type constructor: callable
+        """
+        self.chunks = chunks
+        self.unique_key = unique_key
+        self.datefields = scorched.dates.field_matcher(datefields)
+        self.constructor = constructor
+        self._events = iter(
+            scorched.streaming.JSONStreamParser(chunks, [("response", "docs")])
+        )
+        self._doc = {}
+        self._pending = collections.deque()
+        self._sections = None
+        first = self._next_doc()
+        if first is not None:
+            self._pending.append(first)
+        details = self._doc["responseHeader"]
+        for attr in ["QTime", "params", "status"]:
+            setattr(self, attr, details.get(attr))
+        # see scorched.spool
+        self.spooled = details.get("spooled", False)
+        if self.status != 0:
+            raise ValueError("Response indicates an error")
+        result = self._doc.get("response", {})
+        self.numFound = result.get("numFound")
+        self.start = result.get("start")
+
+    def _next_doc(self):
+        """Read up to the next document, None after the last one"""
+        for kind, path, value in self._events:
+            if kind == scorched.streaming.ITEM:
+                return value
+            scorched.streaming.set_path(self._doc, path, value)
+        return None
+
+    def _read_sections(self):
+        if self._sections is None:
+            while True:
+                doc = self._next_doc()
+                if doc is None:
+                    break
+                self._pending.append(doc)
+            doc = dict(self._doc)
+            if "response" in doc:
+                doc["response"] = dict(doc["response"], docs=[])
+            self._sections = SolrResponse.from_dict(
+                doc, self.unique_key, self.datefields
+            )
+        return self._sections
+
+    def __getattr__(self, name):
+        if name not in self.trailing:
+            raise AttributeError(name)
+        return getattr(self._read_sections(), name)
+
+    def __iter__(self):
+        while True:
+            if self._pending:
+                doc = self._pending.popleft()
+            else:
+                doc = self._next_doc()
+                if doc is None:
+                    return
+            doc = SolrResult._prepare_docs([doc], self.datefields)[0]
+            if self.constructor is not None:
+                doc = self.constructor(**doc)
+            yield doc
+
+    def close(self):
+        """Stop reading and release the connection"""
+        close = getattr(self.chunks, "close", None)
+        if close is not None:
+            close()
+
+    def __str__(self):
+        return "{numFound} results found, starting at #{start}".format(
+            numFound=self.numFound, start=self.start
+        )
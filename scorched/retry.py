@@ -0,0 +1,128 @@
+from __future__ import unicode_literals
+
+import random
+import time
+
+
+class RetryPolicy(object):
+    """
+    Decides whether and when a failed request is sent again.
+
+    The delay grows exponentially with every attempt
+    (``backoff * multiplier ** (attempt - 1)``, capped at ``max_backoff``)
+    and is randomized between zero and that value when ``jitter`` is set, so
+    clients which failed together don't retry together. No retry is started
+    which would end after ``deadline`` seconds counted from the first
+    attempt.
+    """
+
+    def __init__(
+        self,
+        max_attempts=3,
+        backoff=0.1,
+        multiplier=2.0,
+        max_backoff=2.0,
+        jitter=True,
+        deadline=10.0,
+        retry_status_codes=(429, 503),
+        idempotent_only=True,
+    ):
+        """
+        :param max_attempts: optional -- how often a request is sent at most,
+                             failing over to another replica doesn't count
+        :type max_attempts: int
+        :param backoff: optional -- delay in seconds before the first retry
+        :type backoff: float
+        :param multiplier: optional -- factor the delay grows per attempt
+        :type multiplier: float
+        :param max_backoff: optional -- upper bound of a single delay
+        :type max_backoff: float
+        :param jitter: optional -- randomize the delay between 0 and its
+                       computed value
+        :type jitter: bool
+        :param deadline: optional -- seconds after which no retry is started,
+                         None for no limit
+        :type deadline: float
+        :param retry_status_codes: optional -- http status codes answered by
+                                   an overloaded or restarting Solr
+        :type retry_status_codes: tuple
+        :param idempotent_only: optional -- only retry requests which can be
+                                safely sent twice (searches, gets)
+        :type idempotent_only: bool
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.multiplier = multiplier
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.deadline = deadline
+        self.retry_status_codes = tuple(retry_status_codes)
+        self.idempotent_only = idempotent_only
+
+    @classmethod
+    def from_retry_timeout(cls, retry_timeout):
+        """
+        :param retry_timeout: seconds to wait before the one retry, a
+                              negative value disables retries
+        :type retry_timeout: float
+        :returns: RetryPolicy
+
+        The policy matching the historic ``retry_timeout`` argument: every
+        request failing with a connection error or timeout is retried once
+        after a fixed sleep.
+        """
+        if retry_timeout < 0:
+            return cls(max_attempts=1)
+        return cls(
+            max_attempts=2,
+            backoff=retry_timeout,
+            multiplier=1.0,
+            max_backoff=retry_timeout,
+            jitter=False,
+            deadline=None,
+            retry_status_codes=(),
+            idempotent_only=False,
+        )
+
+    def is_retryable(self, response):
+        """
+        :param response: the http response
+        :returns: bool -- True if the status code asks for a retry
+        """
+        return response.status_code in self.retry_status_codes
+
+    def delay_for(self, attempt, started, idempotent, response=None):
+        """
+        :param attempt: number of the attempt which just failed, from 1
+        :type attempt: int
+        :param started: ``time.monotonic()`` of the first attempt
+        :type started: float
+        :param idempotent: can the request be safely sent again
+        :type idempotent: bool
+        :param response: optional -- the response if the request did not fail
+                         with a connection error or timeout
+        :returns: float -- seconds to sleep before the next attempt or None
+                  if the request must not be retried
+        """
+        if attempt >= self.max_attempts:
+            return None
+        if self.idempotent_only and not idempotent:
+            return None
+        if response is not None and not self.is_retryable(response):
+            return None
+        delay = min(self.max_backoff, self.backoff * self.multiplier ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        if response is not None:
+            try:
+                delay = max(delay, float(response.headers.get("Retry-After")))
+            except (AttributeError, TypeError, ValueError):
+                pass
+        if (
+            self.deadline is not None
+            and time.monotonic() + delay - started > self.deadline
+        ):
+            return None
+        return delay
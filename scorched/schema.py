@@ -0,0 +1,413 @@
+from __future__ import unicode_literals
+
+import decimal
+import hashlib
+import json
+import numbers
+import operator
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+import scorched.dates
+import scorched.search
+from scorched.compat import str
+
+
+class SchemaCache(object):
+    """
+    Solr schemas keyed by core url.
+
+    Interfaces sharing a cache fetch the schema of a core once. Entries
+    older than ``ttl`` seconds are still returned, but trigger a refresh in
+    a background thread (or a blocking one with ``background=False``), so
+    construction never waits for Solr once a core is known. With ``path``
+    the schemas are also written to that directory and survive restarts,
+    e.g. of pre-forked workers.
+    """
+
+    def __init__(self, ttl=300.0, path=None, background=True):
+        """
+        :param ttl: optional -- seconds after which a schema is revalidated,
+                    None to never revalidate
+        :type ttl: float
+        :param path: optional -- directory the schemas are persisted in
+        :type path: str
+        :param background: optional -- revalidate stale schemas in a
+                           background thread instead of blocking the caller
+        :type background: bool
+        """
+        self.ttl = ttl
+        self.path = path
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+        self.background = background
+        # url -> {"schema": ..., "fetched_at": ..., "checked_at": ...}
+        self._entries = {}
+        self._refreshing = set()
+        # url -> lock held while its first fetch is running
+        self._fetching = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, fetch):
+        """
+        :param url: url of the core
+        :type url: str
+        :param fetch: callable returning the schema from Solr
+        :type fetch: callable
+        :returns: dict -- the schema
+
+        Return the cached schema of ``url``, calling ``fetch`` if there is
+        none yet.
+        """
+        entry = self._entries.get(url)
+        if entry is None:
+            # only callers of the same core wait for each other, a slow core
+            # doesn't hold up the others
+            with self._url_lock(url):
+                entry = self._entries.get(url)
+                if entry is None:
+                    entry = self._load(url)
+                    if entry is None:
+                        return self._fetch(url, fetch)["schema"]
+                    self._entries[url] = entry
+        if self._stale(entry):
+            if not self.background:
+                try:
+                    entry = self._fetch(url, fetch)
+                except Exception:
+                    # keep serving the old schema, try again after ttl
+                    entry["checked_at"] = time.time()
+            else:
+                self._revalidate(url, fetch)
+        return entry["schema"]
+
+    def put(self, url, schema):
+        """Store a schema fetched elsewhere"""
+        now = time.time()
+        entry = {"schema": schema, "fetched_at": now, "checked_at": now}
+        self._entries[url] = entry
+        self._store(url, entry)
+        return entry
+
+    def invalidate(self, url=None):
+        """Forget the schema of ``url``, or of every core"""
+        with self._lock:
+            urls = list(self._entries) if url is None else [url]
+            for key in urls:
+                self._entries.pop(key, None)
+                if self.path is not None:
+                    try:
+                        os.remove(self._filename(key))
+                    except OSError:
+                        pass
+
+    def _url_lock(self, url):
+        with self._lock:
+            return self._fetching.setdefault(url, threading.Lock())
+
+    def _stale(self, entry):
+        return self.ttl is not None and time.time() - entry["checked_at"] >= self.ttl
+
+    def _fetch(self, url, fetch):
+        return self.put(url, fetch())
+
+    def _revalidate(self, url, fetch):
+        with self._lock:
+            if url in self._refreshing:
+                return
+            self._refreshing.add(url)
+
+        def refresh():
+            try:
+                self._fetch(url, fetch)
+            except Exception:
+                entry = self._entries.get(url)
+                if entry is not None:
+                    entry["checked_at"] = time.time()
+            finally:
+                with self._lock:
+                    self._refreshing.discard(url)
+
+        thread = threading.Thread(
+            target=refresh, name="scorched-schema-refresh", daemon=True
+        )
+        thread.start()
+
+    def _filename(self, url):
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.path, "schema-%s.json" % digest)
+
+    def _load(self, url):
+        if self.path is None:
+            return None
+        try:
+            with open(self._filename(url)) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if stored.get("url") != url:
+            return None
+        return {
+            "schema": stored["schema"],
+            "fetched_at": stored["fetched_at"],
+            "checked_at": stored["fetched_at"],
+        }
+
+    def _store(self, url, entry):
+        if self.path is None:
+            return
+        stored = {
+            "url": url,
+            "fetched_at": entry["fetched_at"],
+            "schema": entry["schema"],
+        }
+        # write and rename, so other processes never read half a file
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(stored, f)
+            os.replace(tmp, self._filename(url))
+        except Exception:
+            os.remove(tmp)
+            raise
+
+
+# cache shared by all interfaces of the process which pass it
+shared_cache = SchemaCache()
+
+
+# Kind of values a field type holds, by the Java class implementing it
+JAVA_CLASS_KINDS = {
+    "DatePointField": "date",
+    "TrieDateField": "date",
+    "DateField": "date",
+    "IntPointField": "int",
+    "LongPointField": "int",
+    "TrieIntField": "int",
+    "TrieLongField": "int",
+    "IntField": "int",
+    "LongField": "int",
+    "FloatPointField": "float",
+    "DoublePointField": "float",
+    "TrieFloatField": "float",
+    "TrieDoubleField": "float",
+    "FloatField": "float",
+    "DoubleField": "float",
+    "BoolField": "bool",
+    "UUIDField": "uuid",
+}
+
+# Kinds of field types the schema doesn't declare, by their name
+TYPE_NAME_KINDS = {"pdate": "date", "date": "date"}
+
+
+def date_to_solr(value):
+    return str(scorched.dates.solr_date(value))
+
+
+def date_from_solr(value):
+    # javabin responses hold datetimes already
+    if isinstance(value, str):
+        return scorched.dates.datetime_from_w3_datestring(value)
+    return value
+
+
+def int_to_solr(value):
+    # numpy and other integers json can't encode
+    if isinstance(value, (int, str)) or not hasattr(value, "__index__"):
+        return value
+    return operator.index(value)
+
+
+def float_to_solr(value):
+    if isinstance(value, (float, int, str)):
+        return value
+    if isinstance(value, (numbers.Real, decimal.Decimal)):
+        return float(value)
+    return value
+
+
+def bool_to_solr(value):
+    if isinstance(value, (bool, str)):
+        return value
+    return bool(value)
+
+
+def uuid_to_solr(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def uuid_from_solr(value):
+    if isinstance(value, str):
+        return uuid.UUID(value)
+    return value
+
+
+# Converters of values sent to Solr, by kind
+TO_SOLR = {
+    "date": date_to_solr,
+    "int": int_to_solr,
+    "float": float_to_solr,
+    "bool": bool_to_solr,
+    "uuid": uuid_to_solr,
+}
+
+# Converters of values read from Solr, by kind. JSON already has numbers
+# and booleans.
+FROM_SOLR = {"date": date_from_solr, "uuid": uuid_from_solr}
+
+# Atomic update operations whose value is not a field value
+RAW_OPERATIONS = frozenset(["removeregex"])
+
+
+class FieldConverters(object):
+    """
+    Converters of the field values of a schema.
+
+    Field types are resolved by their Java class (``solr.DatePointField``,
+    ``solr.TrieIntField``, ``solr.BoolField``, ``solr.UUIDField``, ...),
+    fields and dynamic fields by their type; dynamic fields are matched
+    longest pattern first, as Solr does. The kind of every field name is
+    resolved once and memoized. Fields of other types are left alone.
+    """
+
+    max_memo = 10000
+
+    def __init__(self, schema):
+        """
+        :param schema: the Solr schema, as returned by the schema API
+        :type schema: dict
+        """
+        classes = {}
+        for field_type in schema.get("fieldTypes", ()):
+            classes[field_type["name"]] = field_type["class"].rsplit(".", 1)[-1]
+
+        def kind_of(field):
+            java_class = classes.get(field["type"])
+            if java_class is None:
+                return TYPE_NAME_KINDS.get(field["type"])
+            return JAVA_CLASS_KINDS.get(java_class)
+
+        self.fields = {}
+        for field in schema.get("fields", ()):
+            self.fields[field["name"]] = kind_of(field)
+        self.dynamic_fields = sorted(
+            (
+                (field["name"], kind_of(field))
+                for field in schema.get("dynamicFields", ())
+            ),
+            key=lambda item: -len(item[0]),
+        )
+        kinds = set(self.fields.values())
+        kinds.update(kind for _, kind in self.dynamic_fields)
+        self.converts_updates = any(kind in TO_SOLR for kind in kinds)
+        self.converts_results = any(kind in FROM_SOLR for kind in kinds)
+        self.datefields = scorched.dates.FieldMatcher(
+            [name for name, kind in self.fields.items() if kind == "date"]
+            + [name for name, kind in self.dynamic_fields if kind == "date"]
+        )
+        self.memo = {}
+
+    def kind(self, name):
+        """
+        :param name: name of a field
+        :type name: str
+        :returns: str -- kind of its values (``date``, ``int``, ``float``,
+                  ``bool`` or ``uuid``) or None
+        """
+        try:
+            return self.memo[name]
+        except KeyError:
+            pass
+        if name in self.fields:
+            kind = self.fields[name]
+        else:
+            kind = None
+            for pattern, pattern_kind in self.dynamic_fields:
+                if (pattern.startswith("*") and name.endswith(pattern[1:])) or (
+                    pattern.endswith("*") and name.startswith(pattern[:-1])
+                ):
+                    kind = pattern_kind
+                    break
+        if len(self.memo) >= self.max_memo:
+            self.memo.clear()
+        self.memo[name] = kind
+        return kind
+
+    def to_solr(self, name, value):
+        """
+        :param name: name of the field
+        :type name: str
+        :param value: value, list of values or atomic update of the field
+        :returns: the value the way Solr accepts it
+        """
+        convert = TO_SOLR.get(self.kind(name))
+        if convert is None:
+            return value
+        if isinstance(value, dict):
+            return dict(
+                (op, v if op in RAW_OPERATIONS else self._apply(convert, v))
+                for op, v in value.items()
+            )
+        return self._apply(convert, value)
+
+    @staticmethod
+    def _apply(convert, value):
+        if scorched.search.is_iter(value):
+            return [convert(v) for v in value]
+        return convert(value)
+
+    def prepare_update(self, doc):
+        """
+        :param doc: document to send to Solr
+        :type doc: dict
+        :returns: dict -- a copy of the document with converted values
+        """
+        if not self.converts_updates:
+            return dict(doc)
+        to_solr = self.to_solr
+        return dict((name, to_solr(name, value)) for name, value in doc.items())
+
+    def convert_result(self, name, value):
+        """
+        :param name: name of the field
+        :type name: str
+        :param value: value or list of values read from Solr
+        :returns: the converted value
+        """
+        convert = FROM_SOLR.get(self.kind(name))
+        if convert is None or value is None:
+            return value
+        if isinstance(value, list):
+            return [convert(v) for v in value]
+        return convert(value)
+
+    def prepare_result(self, doc):
+        """
+        :param doc: document read from Solr
+        :type doc: dict
+        :returns: dict -- the document, with its values converted in place
+        """
+        if not self.converts_results:
+            return doc
+        kind = self.kind
+        for name, value in doc.items():
+            convert = FROM_SOLR.get(kind(name))
+            if convert is None or value is None:
+                continue
+            if isinstance(value, list):
+                doc[name] = [convert(v) for v in value]
+            else:
+                doc[name] = convert(value)
+        return doc
+
+    def __repr__(self):
+        return "FieldConverters(%d fields, %d dynamic fields)" % (
+            len(self.fields),
+            len(self.dynamic_fields),
+        )
@@ -7,6 +7,7 @@ import numbers
 import operator
 import re
 
+import scorched.columns
 import scorched.strings
 import scorched.exc
 import scorched.dates
@@ -379,6 +380,65 @@ class LuceneQuery(object):
         self.boosts.append((kwargs, boost_score))
 
 
+class StreamExpression(object):
+    """A Solr streaming expression like
+    ``rollup(search(books, q="*:*", fl="cat,price", sort="cat asc"),
+    over="cat", sum(price))``.
+
+    Positional arguments are written as they are, so collection names,
+    field names and nested expressions go there. Keyword arguments become
+    named parameters with quoted values.
+    """
+
+    def __init__(self, function, *args, **kwargs):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+
+    @staticmethod
+    def quote(value):
+        # Solr only unescapes quotes, backslashes are passed on as they are
+        return u'"%s"' % value.replace('"', '\\"')
+
+    def serialize(self, value, quoted):
+        if isinstance(value, StreamExpression):
+            return str(value)
+        if isinstance(value, bool):
+            return u"true" if value else u"false"
+        if isinstance(value, numbers.Number):
+            return str(value)
+        if isinstance(value, datetime.datetime):
+            value = scorched.dates.solr_date(value)
+        elif is_iter(value):
+            value = u",".join(str(v) for v in value)
+        value = str(value)
+        return self.quote(value) if quoted else value
+
+    @python_2_unicode_compatible
+    def __str__(self):
+        params = [self.serialize(arg, False) for arg in self.args]
+        params.extend(u"%s=%s" % (key, self.serialize(value, True))
+                      for key, value in sorted(self.kwargs.items()))
+        return u"%s(%s)" % (self.function, u", ".join(params))
+
+    def __repr__(self):
+        return "StreamExpression(%r)" % str(self)
+
+
+class StreamExpressionBuilder(object):
+    """Builds streaming expressions, every attribute is a stream source,
+    decorator or evaluator: ``E.top(E.search("books", q="*:*"), n=3)``
+    """
+
+    def __getattr__(self, function):
+        if function.startswith('_'):
+            raise AttributeError(function)
+
+        def build(*args, **kwargs):
+            return StreamExpression(function, *args, **kwargs)
+        return build
+
+
 class BaseSearch(object):
 
     """Base class for common search options management"""
@@ -617,41 +677,88 @@ class SolrSearch(BaseSearch):
             options['q'] = '*:*'  # search everything
         return options
 
-    def execute(self, constructor=None):
+    def execute(self, constructor=None, stream=False):
+        if stream:
+            return self.interface.search_stream(
+                constructor=constructor, **self.options())
         ret = self.interface.search(**self.options())
         if constructor:
             ret = self.constructor(ret, constructor)
         return ret
 
-    def cursor(self, constructor=None, rows=None):
+    def cursor(self, constructor=None, rows=None, stream=False):
         if self.paginator.start is not None:
             raise ValueError(
                 "cannot use the start parameter and cursors at the same time")
         search = self
         if rows:
             search = search.paginate(rows=rows)
-        return SolrCursor(search, constructor)
+        return SolrCursor(search, constructor, stream=stream)
+
+    def export(self, fields, sort, constructor=None):
+        """Stream the whole result set from Solr's export handler
+
+        ``fields`` and ``sort`` are required by the handler and must be
+        docValues fields; ``sort`` takes field names as ``sort_by()``.
+        Returns a generator of documents.
+        """
+        search = self.field_limit(fields)
+        if not is_iter(sort):
+            sort = [sort]
+        for field in sort:
+            search = search.sort_by(field)
+        options = search.options()
+        # export always returns every match
+        options.pop('start', None)
+        options.pop('rows', None)
+        return self.interface.export(constructor=constructor, **options)
 
 
 class SolrCursor:
-    def __init__(self, search, constructor):
+    def __init__(self, search, constructor, stream=False):
         self.search = search
         self.constructor = constructor
+        self.stream = stream
 
     def __iter__(self):
         cursor_mark = "*"
         while True:
             options = self.search.options()
             options['cursorMark'] = cursor_mark
-            ret = self.search.interface.search(**options)
-            if self.constructor:
-                ret = self.search.constructor(ret, self.constructor)
+            if self.stream:
+                ret = self.search.interface.search_stream(
+                    constructor=self.constructor, **options)
+            else:
+                ret = self.search.interface.search(**options)
+                if self.constructor:
+                    ret = self.search.constructor(ret, self.constructor)
             for item in ret:
                 yield item
             if ret.next_cursor_mark == cursor_mark:
                 break
             cursor_mark = ret.next_cursor_mark
 
+    def columns(self, fields=None, use_numpy=None):
+        """Iterate over the result set a page at a time, as columns
+
+        Yields a dict of columns per page (see
+        ``scorched.columns.to_columns``), keyed by ``fields`` or the fields
+        of ``field_limit()``. No documents are constructed; with
+        ``lazy_results=True`` their dates are not even parsed one by one.
+        """
+        options = self.search.options()
+        if fields is None:
+            fields = scorched.columns.fl_fields(options.get('fl'))
+        cursor_mark = "*"
+        while True:
+            options['cursorMark'] = cursor_mark
+            ret = self.search.interface.search(**options)
+            if ret.result.docs:
+                yield ret.result.to_columns(fields, use_numpy)
+            if ret.next_cursor_mark == cursor_mark:
+                break
+            cursor_mark = ret.next_cursor_mark
+
 
 class MltSolrSearch(BaseSearch):
 
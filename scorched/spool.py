@@ -0,0 +1,348 @@
+from __future__ import unicode_literals
+
+import json
+import os
+import struct
+import threading
+import time
+import warnings
+import zlib
+
+import requests
+
+import scorched.exc
+import scorched.pool
+from scorched.compat import str
+
+# length and crc32 of the payload of a record
+HEADER = struct.Struct(">II")
+SUFFIX = ".spool"
+POSITION = "position.json"
+
+
+# answers of a node which is restarting, overloaded or can't be reached by
+# the proxy in front of it
+UNAVAILABLE_STATUS_CODES = frozenset(scorched.pool.NODE_FAILURE_STATUS_CODES + (429,))
+
+
+def status_code(error):
+    if isinstance(error, scorched.exc.SolrError) and error.args:
+        return getattr(error.args[0], "status_code", None)
+    return None
+
+
+def unavailable(error):
+    """
+    :returns: bool -- True if ``error`` means the update didn't reach Solr
+              (no connection, circuit breaker open, 502/503/504 during a
+              restart, 429), so it is safe to send it again later
+    """
+    if isinstance(
+        error, (requests.exceptions.ConnectionError, scorched.exc.CircuitOpenError)
+    ):
+        return True
+    return status_code(error) in UNAVAILABLE_STATUS_CODES
+
+
+def rejected(error):
+    """
+    :returns: bool -- True if Solr refused the update itself (4xx other than
+              429), so sending it again won't help
+    """
+    code = status_code(error)
+    return (
+        code is not None and 400 <= code < 500 and code not in UNAVAILABLE_STATUS_CODES
+    )
+
+
+class WriteSpool(object):
+    """
+    Ordered on disk log of update requests Solr couldn't be reached for.
+
+    Records are appended to segment files of about ``segment_bytes`` in
+    ``path``. A background thread replays them in order, at most
+    ``replay_rate`` per second, and deletes every segment once it has been
+    sent; while Solr is unavailable it retries every ``retry_interval``
+    seconds. The replay position is kept in ``path`` as well, so records
+    left by a previous process are replayed once a connection with this
+    spool is created again.
+
+    Appending more than ``max_bytes`` raises
+    :class:`scorched.exc.SpoolFullError`. Records Solr refuses with a 4xx
+    answer (e.g. 400 for an invalid document) are passed to ``on_rejected``
+    and dropped; on 5xx answers they stay queued and are retried.
+    """
+
+    def __init__(
+        self,
+        path,
+        segment_bytes=16 * 2**20,
+        max_bytes=2**30,
+        fsync=False,
+        replay_rate=None,
+        retry_interval=1.0,
+        on_rejected=None,
+    ):
+        """
+        :param path: directory of the segment files
+        :type path: str
+        :param segment_bytes: optional -- size after which a new segment is
+                              started
+        :type segment_bytes: int
+        :param max_bytes: optional -- disk space the segments may take
+        :type max_bytes: int
+        :param fsync: optional -- fsync every record, not only flush it to
+                      the operating system
+        :type fsync: bool
+        :param replay_rate: optional -- records replayed per second, None
+                            for as fast as Solr takes them
+        :type replay_rate: float
+        :param retry_interval: optional -- seconds between attempts while
+                               Solr is unavailable
+        :type retry_interval: float
+        :param on_rejected: optional -- called with the body, the request
+                            parameters and the error of a record Solr
+                            refused; a warning is issued by default
+        :type on_rejected: callable
+        """
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.fsync = fsync
+        self.replay_rate = replay_rate
+        self.retry_interval = retry_interval
+        self.on_rejected = on_rejected
+        self.replayed = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._replayer = None
+        self._writer = None
+        # segment number -> size, oldest first
+        self._segments = dict(
+            (number, os.path.getsize(self._segment_path(number)))
+            for number in sorted(
+                int(name[: -len(SUFFIX)])
+                for name in os.listdir(path)
+                if name.endswith(SUFFIX)
+            )
+        )
+        self._position = self._read_position()
+
+    def __repr__(self):
+        return "<%s %s: %d bytes pending>" % (
+            self.__class__.__name__,
+            self.path,
+            self.pending_bytes(),
+        )
+
+    def _segment_path(self, number):
+        return os.path.join(self.path, "%020d%s" % (number, SUFFIX))
+
+    def _read_position(self):
+        try:
+            with open(os.path.join(self.path, POSITION)) as f:
+                position = json.load(f)
+            segment, offset = position["segment"], position["offset"]
+        except (IOError, OSError, ValueError, KeyError):
+            segment, offset = None, 0
+        if segment not in self._segments:
+            # replayed and deleted, or nothing replayed yet
+            segment = next(iter(self._segments), None)
+            offset = 0
+        return segment, offset
+
+    def _write_position(self):
+        segment, offset = self._position
+        tmp = os.path.join(self.path, POSITION + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"segment": segment, "offset": offset}, f)
+        os.replace(tmp, os.path.join(self.path, POSITION))
+
+    def total_bytes(self):
+        """
+        :returns: int -- disk space taken by the segments
+        """
+        with self._lock:
+            return sum(self._segments.values())
+
+    def pending_bytes(self):
+        """
+        :returns: int -- bytes of records not replayed yet
+        """
+        with self._lock:
+            return sum(self._segments.values()) - self._position[1]
+
+    def pending(self):
+        """
+        :returns: bool -- True if there are records to be replayed
+        """
+        return self.pending_bytes() > 0
+
+    def append(self, body, params):
+        """
+        :param body: update message
+        :type body: str or bytes
+        :param params: arguments of :meth:`SolrConnection.update`, e.g.
+                       ``commitWithin``
+        :type params: dict
+        :raises: scorched.exc.SpoolFullError -- if the record doesn't fit
+                 into ``max_bytes``
+        """
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        payload = json.dumps(params).encode("utf-8") + b"\n" + body
+        record = HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._lock:
+            if self._stopped.is_set():
+                raise ValueError("the spool is closed")
+            total = sum(self._segments.values())
+            if total + len(record) > self.max_bytes:
+                raise scorched.exc.SpoolFullError(
+                    "Spool %s is full (%d bytes)" % (self.path, total)
+                )
+            if self._writer is None or (
+                self._segments[self._writer[0]]
+                and self._segments[self._writer[0]] + len(record) > self.segment_bytes
+            ):
+                self._rotate()
+            number, f = self._writer
+            f.write(record)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+            self._segments[number] += len(record)
+            if self._position[0] is None:
+                self._position = (number, 0)
+
+    def _rotate(self):
+        # segments of earlier processes may end in a torn record, so they are
+        # never appended to
+        if self._writer is not None:
+            self._writer[1].close()
+        number = max(self._segments) + 1 if self._segments else 0
+        self._writer = (number, open(self._segment_path(number), "ab"))
+        self._segments[number] = 0
+
+    def _next(self):
+        """
+        :returns: tuple -- (body, params, position after the record) of the
+                  oldest record not replayed, None if there is none
+        """
+        while True:
+            segment, offset = self._position
+            if segment is None:
+                return None
+            size = self._segments[segment]
+            if offset < size:
+                with open(self._segment_path(segment), "rb") as f:
+                    f.seek(offset)
+                    header = f.read(HEADER.size)
+                    if len(header) == HEADER.size:
+                        length, crc = HEADER.unpack(header)
+                        payload = f.read(length)
+                        if len(payload) == length and zlib.crc32(payload) == crc:
+                            params, body = payload.split(b"\n", 1)
+                            end = offset + HEADER.size + length
+                            return body, json.loads(params), (segment, end)
+                warnings.warn(
+                    "Skipping damaged end of spool segment %s"
+                    % self._segment_path(segment)
+                )
+            if self._writer is not None and self._writer[0] == segment:
+                if offset >= size:
+                    return None
+                # damaged records are never written by this process
+                self._writer[1].close()
+                self._writer = None
+            self._drop(segment)
+
+    def _drop(self, segment):
+        del self._segments[segment]
+        os.remove(self._segment_path(segment))
+        self._position = (next(iter(self._segments), None), 0)
+        self._write_position()
+
+    def _advance(self, position):
+        self._position = position
+        segment, offset = position
+        writing = self._writer is not None and self._writer[0] == segment
+        if offset >= self._segments[segment] and not writing:
+            self._drop(segment)
+        else:
+            self._write_position()
+
+    def start_replay(self, send):
+        """
+        :param send: called with the body and the parameters of every record
+        :type send: callable
+
+        Replay the records in a background thread unless one is running.
+        """
+        with self._lock:
+            if self._replayer is not None or self._stopped.is_set():
+                return
+            self._replayer = threading.Thread(
+                target=self.replay, args=(send,), name="scorched-spool", daemon=True
+            )
+            self._replayer.start()
+
+    def replay(self, send):
+        """
+        :param send: called with the body and the parameters of every record
+        :type send: callable
+
+        Replay the records in order until there are none left.
+        """
+        try:
+            while not self._stopped.is_set():
+                with self._lock:
+                    record = self._next()
+                    if record is None:
+                        # decided under the lock, so a record appended now
+                        # starts a new replayer
+                        self._replayer = None
+                        return
+                body, params, position = record
+                started = time.monotonic()
+                try:
+                    send(body, params)
+                except Exception as e:
+                    if not isinstance(e, scorched.exc.SolrError) and not unavailable(e):
+                        raise
+                    if not rejected(e):
+                        # unavailable or a server error, keep the record
+                        self._stopped.wait(self.retry_interval)
+                        continue
+                    self._reject(body, params, e)
+                with self._lock:
+                    self._advance(position)
+                self.replayed += 1
+                if self.replay_rate:
+                    elapsed = time.monotonic() - started
+                    self._stopped.wait(max(0, 1.0 / self.replay_rate - elapsed))
+        finally:
+            with self._lock:
+                if self._replayer is threading.current_thread():
+                    self._replayer = None
+
+    def _reject(self, body, params, error):
+        if self.on_rejected is not None:
+            self.on_rejected(body, params, error)
+        else:
+            warnings.warn("Dropping spooled update Solr refused: %s" % (error,))
+
+    def close(self):
+        """
+        Stop replaying and close the current segment. Records not replayed
+        stay on disk.
+        """
+        self._stopped.set()
+        replayer = self._replayer
+        if replayer is not None:
+            replayer.join()
+        with self._lock:
+            if self._writer is not None:
+                self._writer[1].close()
+                self._writer = None
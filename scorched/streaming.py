@@ -0,0 +1,207 @@
+from __future__ import unicode_literals
+
+import codecs
+import json
+import re
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+VALUE = "value"
+ITEM = "item"
+
+# characters which may follow a complete value
+DELIMITERS = frozenset(",]} \t\n\r")
+
+
+def iter_text(chunks, encoding="utf-8"):
+    """
+    :param chunks: iterable of bytes, e.g. ``response.iter_content()``
+    :type chunks: iterable
+    :returns: generator of str
+
+    Decode a byte stream chunk by chunk; multi byte characters split between
+    two chunks are handled.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+class JSONStreamParser(object):
+    """
+    Incremental parser for JSON documents holding one or more large arrays.
+
+    Only the objects leading to ``stream_paths`` are tokenized by hand. The
+    elements of the arrays at ``stream_paths`` and every other member are
+    decoded as a whole by the stdlib decoder, so memory is bounded by the
+    largest single element instead of the whole document.
+
+    Iterating yields ``(kind, path, value)`` tuples. ``path`` is the tuple of
+    object keys leading to the value, ``kind`` is ``"item"`` for an element
+    of a streamed array and ``"value"`` for any other member::
+
+        >>> parser = JSONStreamParser(chunks, [("response", "docs")])
+        >>> list(parser)
+        [('value', ('responseHeader',), {...}),
+         ('value', ('response', 'numFound'), 2),
+         ('item', ('response', 'docs'), {'id': '1'}),
+         ('item', ('response', 'docs'), {'id': '2'}),
+         ('value', ('nextCursorMark',), '...')]
+    """
+
+    def __init__(self, chunks, stream_paths):
+        """
+        :param chunks: iterable of str
+        :type chunks: iterable
+        :param stream_paths: paths of the arrays to stream
+        :type stream_paths: list of tuples
+        """
+        self.chunks = iter(chunks)
+        self.stream_paths = set(tuple(p) for p in stream_paths)
+        self.descend_paths = set(
+            p[:n] for p in self.stream_paths for n in range(len(p))
+        )
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def __iter__(self):
+        if self._next_char() != "{":
+            raise ValueError("Expected a JSON object")
+        return self._parse_object(())
+
+    def _fill(self, minimum=1):
+        """Read at least ``minimum`` more characters, False at the end"""
+        if self.eof:
+            return False
+        # drop what has been parsed already
+        pos = self.pos
+        self.buf = self.buf[pos:]
+        self.pos = 0
+        added = 0
+        while added < minimum:
+            try:
+                chunk = next(self.chunks)
+            except StopIteration:
+                self.eof = True
+                break
+            self.buf += chunk
+            added += len(chunk)
+        return added > 0
+
+    def _next_char(self):
+        """Consume whitespace and return the next character, consuming it"""
+        while True:
+            self.pos = WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                char = self.buf[self.pos]
+                self.pos += 1
+                return char
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON stream")
+
+    def _peek_char(self):
+        char = self._next_char()
+        self.pos -= 1
+        return char
+
+    def _read_value(self):
+        """Decode the complete value starting at the next character"""
+        self._peek_char()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                end = None
+            if end is not None and self._complete(value, end):
+                self.pos = end
+                return value
+            # grow the buffer geometrically to keep re-decoding linear
+            if not self._fill(max(len(self.buf) - self.pos, 1)):
+                if end is not None:
+                    self.pos = end
+                    return value
+                raise ValueError("Invalid or truncated JSON stream")
+
+    def _complete(self, value, end):
+        """True if the value decoded up to ``end`` can't continue in the next chunk"""
+        if self.eof:
+            return True
+        # a value is always followed by , ] or } -- if it ends with the
+        # buffer a number might continue in the next chunk
+        if end == len(self.buf):
+            return False
+        # so might "1." of "1.5" or "1.5E" of "1.5E10", decoded as numbers
+        number = isinstance(value, (int, float)) and not isinstance(value, bool)
+        return not number or self.buf[end] in DELIMITERS
+
+    def _parse_object(self, path):
+        if self._peek_char() == "}":
+            self._next_char()
+            return
+        while True:
+            key = self._read_value()
+            if self._next_char() != ":":
+                raise ValueError("Expected ':' after key %r" % key)
+            child = path + (key,)
+            if child in self.stream_paths and self._peek_char() == "[":
+                self._next_char()
+                for event in self._parse_array(child):
+                    yield event
+            elif child in self.descend_paths and self._peek_char() == "{":
+                self._next_char()
+                for event in self._parse_object(child):
+                    yield event
+            else:
+                yield VALUE, child, self._read_value()
+            char = self._next_char()
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError("Expected ',' or '}' not %r" % char)
+
+    def _parse_array(self, path):
+        if self._peek_char() == "]":
+            self._next_char()
+            return
+        while True:
+            yield ITEM, path, self._read_value()
+            char = self._next_char()
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError("Expected ',' or ']' not %r" % char)
+
+
+def set_path(doc, path, value):
+    """
+    Set ``value`` in the nested dict ``doc`` at ``path``, creating the
+    intermediate dicts.
+    """
+    for key in path[:-1]:
+        doc = doc.setdefault(key, {})
+    doc[path[-1]] = value
+
+
+def iter_response(response, chunk_size):
+    """
+    :param response: response of a request sent with ``stream=True``
+    :type response: requests.Response
+    :param chunk_size: bytes read at once
+    :type chunk_size: int
+    :returns: generator of str
+
+    Read the body of ``response`` as text, the connection is released when
+    the generator is exhausted or closed.
+    """
+    try:
+        for text in iter_text(response.iter_content(chunk_size)):
+            yield text
+    finally:
+        response.close()
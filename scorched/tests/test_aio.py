@@ -0,0 +1,220 @@
+import asyncio
+import datetime
+import json
+import os
+import unittest
+
+import pytest
+
+import scorched.exc
+import scorched.retry
+import scorched.tests.schema
+
+httpx = pytest.importorskip("httpx")
+
+import scorched.aio  # noqa: E402
+
+
+def load_dump(name):
+    with open(os.path.join(os.path.dirname(__file__), "dumps", name)) as f:
+        return f.read()
+
+
+class FakeSolr(object):
+    """Records requests and answers them like a tiny Solr core."""
+
+    def __init__(self):
+        self.requests = []
+        self.select_body = load_dump("request_w_facets.json")
+
+    def __call__(self, request):
+        self.requests.append(request)
+        path = request.url.path
+        if path.endswith("/schema"):
+            return httpx.Response(200, json={"schema": scorched.tests.schema.schema})
+        if path.endswith("/select/"):
+            return httpx.Response(200, text=self.select_body)
+        if path.endswith("/get/"):
+            return httpx.Response(
+                200, json={"response": {"numFound": 0, "start": 0, "docs": []}}
+            )
+        if path.endswith("/update/json"):
+            return httpx.Response(200, json={"responseHeader": {"status": 0}})
+        return httpx.Response(404, text="not found")
+
+
+class TestAsyncSolrInterface(unittest.TestCase):
+    def _make_one(self, solr):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(solr))
+        return scorched.aio.AsyncSolrInterface(
+            "http://localhost:8983/solr/core0", http_connection=client
+        )
+
+    def test_schema_is_fetched_lazily_once(self):
+        solr = FakeSolr()
+
+        async def run():
+            si = self._make_one(solr)
+            self.assertIsNone(si.schema)
+            await asyncio.gather(*[si.search(q="*:*") for _ in range(5)])
+            return si
+
+        si = asyncio.run(run())
+        schema_requests = [r for r in solr.requests if r.url.path.endswith("schema")]
+        self.assertEqual(len(schema_requests), 1)
+        self.assertEqual(si.schema["uniqueKey"], "id")
+
+    def test_search(self):
+        solr = FakeSolr()
+
+        async def run():
+            si = self._make_one(solr)
+            return await si.query(name="thief").field_limit("name").execute()
+
+        res = asyncio.run(run())
+        self.assertEqual(res.result.numFound, 3)
+        self.assertEqual(res.facet_counts.facet_fields["cat"][0], ("book", 3))
+        params = solr.requests[-1].url.params
+        self.assertEqual(params["q"], "name:thief")
+        self.assertEqual(params["wt"], "json")
+
+    def test_add_converts_dates(self):
+        solr = FakeSolr()
+
+        async def run():
+            si = self._make_one(solr)
+            return await si.add(
+                [
+                    {"id": "1", "last_modified": datetime.datetime(2014, 2, 18)},
+                    {"id": "2"},
+                ],
+                chunk=1,
+            )
+
+        ret = asyncio.run(run())
+        self.assertEqual(len(ret), 2)
+        updates = [r for r in solr.requests if r.url.path.endswith("update/json")]
+        self.assertEqual(
+            json.loads(updates[0].content),
+            [{"id": "1", "last_modified": "2014-02-18T00:00:00Z"}],
+        )
+
+    def test_batch(self):
+        solr = FakeSolr()
+
+        async def run():
+            si = self._make_one(solr)
+            async with si.batch(commitWithin=1000) as batch:
+                batch.add({"id": "1", "last_modified": datetime.datetime(2014, 2, 18)})
+                batch.delete_by_ids("2").commit()
+            self.assertEqual(len(batch), 0)
+            with self.assertRaises(TypeError):
+                with si.batch():
+                    pass
+
+        asyncio.run(run())
+        updates = [r for r in solr.requests if r.url.path.endswith("update/json")]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(updates[0].url.params["commitWithin"], "1000")
+        self.assertEqual(
+            json.loads(updates[0].content, object_pairs_hook=list),
+            [
+                (
+                    "add",
+                    [("doc", [("id", "1"), ("last_modified", "2014-02-18T00:00:00Z")])],
+                ),
+                ("delete", ["2"]),
+                ("commit", []),
+            ],
+        )
+
+    def test_get_and_commit(self):
+        solr = FakeSolr()
+
+        async def run():
+            si = self._make_one(solr)
+            res = await si.get(["1", "2"])
+            await si.commit()
+            return res
+
+        res = asyncio.run(run())
+        self.assertEqual(len(res), 0)
+        self.assertEqual(solr.requests[-1].url.params["commit"], "true")
+
+    def test_sync_only(self):
+        si = self._make_one(FakeSolr())
+        self.assertRaises(NotImplementedError, si.search_stream, q="*:*")
+        self.assertRaises(NotImplementedError, si.query().export, "id", "id")
+        self.assertRaises(NotImplementedError, si.stream, "search(core0)")
+
+    def test_cursor(self):
+        solr = FakeSolr()
+        page = json.loads(solr.select_body)
+        page["nextCursorMark"] = "*"
+        solr.select_body = json.dumps(page)
+
+        async def run():
+            si = self._make_one(solr)
+            return [doc async for doc in si.query().cursor(rows=3)]
+
+        docs = asyncio.run(run())
+        self.assertEqual(len(docs), 3)
+        self.assertEqual(solr.requests[-1].url.params["cursorMark"], "*")
+
+    def test_cursor_columns(self):
+        solr = FakeSolr()
+        page = json.loads(solr.select_body)
+        page["nextCursorMark"] = "*"
+        solr.select_body = json.dumps(page)
+
+        async def run():
+            si = self._make_one(solr)
+            cursor = si.query().field_limit("id").cursor(rows=3)
+            return [columns async for columns in cursor.columns(use_numpy=False)]
+
+        pages = asyncio.run(run())
+        self.assertEqual(len(pages), 1)
+        self.assertEqual(list(pages[0]), ["id"])
+        self.assertEqual(len(pages[0]["id"]), 3)
+
+    def test_error_status(self):
+        solr = FakeSolr()
+        solr.select_body = None
+
+        def broken(request):
+            if request.url.path.endswith("/select/"):
+                return httpx.Response(500, text="boom")
+            return solr(request)
+
+        async def run():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(broken))
+            async with scorched.aio.AsyncSolrInterface(
+                "http://localhost:8983/solr/core0", http_connection=client
+            ) as si:
+                await si.search(q="*:*")
+
+        self.assertRaises(scorched.exc.SolrError, asyncio.run, run())
+
+    def test_retry_policy(self):
+        solr = FakeSolr()
+        calls = []
+
+        def flaky(request):
+            if request.url.path.endswith("/select/"):
+                calls.append(request)
+                if len(calls) == 1:
+                    return httpx.Response(503, text="restarting")
+            return solr(request)
+
+        async def run():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(flaky))
+            si = scorched.aio.AsyncSolrInterface(
+                "http://localhost:8983/solr/core0",
+                http_connection=client,
+                retry_policy=scorched.retry.RetryPolicy(backoff=0.001),
+            )
+            return await si.search(q="*:*")
+
+        res = asyncio.run(run())
+        self.assertEqual(res.result.numFound, 3)
+        self.assertEqual(len(calls), 2)
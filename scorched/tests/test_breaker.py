@@ -0,0 +1,55 @@
+import unittest
+from unittest import mock
+
+from scorched.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_invalid(self):
+        self.assertRaises(ValueError, CircuitBreaker, failure_threshold=0)
+
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        self.assertFalse(breaker.available())
+        self.assertFalse(breaker.allow())
+        self.assertEqual(
+            breaker.stats(), {"state": OPEN, "failures": 2, "times_opened": 1}
+        )
+
+    def test_success_resets_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_half_open(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        with mock.patch("time.monotonic", return_value=100.0):
+            breaker.record_failure()
+        with mock.patch("time.monotonic", return_value=110.0):
+            self.assertEqual(breaker.state, HALF_OPEN)
+            self.assertTrue(breaker.available())
+            self.assertTrue(breaker.allow())
+            # only a single trial request at a time
+            self.assertFalse(breaker.available())
+            self.assertFalse(breaker.allow())
+            breaker.record_failure()
+            self.assertEqual(breaker.state, OPEN)
+        with mock.patch("time.monotonic", return_value=120.0):
+            self.assertTrue(breaker.allow())
+            breaker.record_success()
+            self.assertEqual(breaker.state, CLOSED)
+            self.assertEqual(breaker.times_opened, 2)
+
+    def test_clone(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=3)
+        breaker.record_failure()
+        clone = breaker.clone()
+        self.assertEqual(clone.state, CLOSED)
+        self.assertEqual((clone.failure_threshold, clone.reset_timeout), (1, 3))
@@ -0,0 +1,306 @@
+import json
+import threading
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+import scorched.bulk
+import scorched.connection
+import scorched.exc
+import scorched.tests.schema
+
+OK = '{"responseHeader": {"status": 0, "QTime": 1}}'
+
+
+class TestBulkIndexer(unittest.TestCase):
+    def setUp(self):
+        with mock.patch("scorched.connection.SolrInterface.init_schema") as init_schema:
+            init_schema.return_value = scorched.tests.schema.schema
+            self.si = scorched.connection.SolrInterface("http://localhost:8983/solr")
+        self.bodies = []
+        patcher = mock.patch.object(
+            requests.Session, "request", side_effect=self.request
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self, method, url, data=None, **kwargs):
+        self.bodies.append(json.loads(data))
+        return mock.Mock(status_code=200, text=OK)
+
+    def test_flush_by_count(self):
+        indexer = scorched.bulk.BulkIndexer(self.si, max_docs=3, max_latency=None)
+        for i in range(7):
+            indexer.add({"id": str(i)})
+        indexer.flush()
+        self.assertEqual(sorted(len(b) for b in self.bodies), [1, 3, 3])
+        indexer.close()
+        self.assertRaises(ValueError, indexer.add, {"id": "8"})
+        indexer.close()
+
+    def test_flush_by_bytes(self):
+        with scorched.bulk.BulkIndexer(
+            self.si, max_bytes=40, max_latency=None, workers=1
+        ) as indexer:
+            for i in range(4):
+                indexer.add({"id": str(i), "name": "x" * 10})
+        # every document is 30 (orjson) or 33 (json) bytes of JSON
+        self.assertEqual([len(b) for b in self.bodies], [2, 2])
+
+    def test_flush_by_latency(self):
+        indexer = scorched.bulk.BulkIndexer(self.si, max_latency=0.01)
+        indexer.add({"id": "1"})
+        for _ in range(100):
+            if self.bodies:
+                break
+            time.sleep(0.01)
+        self.assertEqual(self.bodies, [[{"id": "1"}]])
+        indexer.close()
+
+    def test_mixed_operations(self):
+        with scorched.bulk.BulkIndexer(self.si, workers=1) as indexer:
+            indexer.add({"id": "1"})
+            indexer.add({"id": "2", "popularity": None})
+            indexer.delete_by_ids(["3", "4"])
+            indexer.delete_by_ids("doc-6")
+            indexer.delete_by_query(self.si.Q(name="x"))
+            indexer.add({"id": "5"})
+        self.assertEqual(
+            self.bodies,
+            [
+                [{"id": "1"}, {"id": "2"}],
+                {"delete": ["3", "4", "doc-6"]},
+                {"delete": {"query": "name:x"}},
+                [{"id": "5"}],
+            ],
+        )
+
+    def test_batches_in_order(self):
+        calls = []
+
+        def request(method, url, data=None, **kwargs):
+            calls.append(url)
+            if len(calls) == 1:
+                # a slow first batch must not be overtaken
+                time.sleep(0.05)
+            return self.request(method, url, data)
+
+        with mock.patch.object(requests.Session, "request", side_effect=request):
+            with scorched.bulk.BulkIndexer(
+                self.si, max_docs=1, max_latency=None
+            ) as indexer:
+                indexer.add({"id": "1", "name": "a"})
+                indexer.delete_by_ids("1")
+                indexer.add({"id": "1", "name": "b"})
+        self.assertEqual(
+            self.bodies,
+            [[{"id": "1", "name": "a"}], {"delete": ["1"]}, [{"id": "1", "name": "b"}]],
+        )
+
+    def test_errors(self):
+        def request(method, url, data=None, **kwargs):
+            if json.loads(data)[0]["id"] == "bad":
+                return mock.Mock(status_code=400, text="bad doc")
+            return mock.Mock(status_code=200, text=OK)
+
+        indexer = scorched.bulk.BulkIndexer(self.si, max_docs=1, max_latency=None)
+        with mock.patch.object(requests.Session, "request", side_effect=request):
+            indexer.add({"id": "1"})
+            indexer.add({"id": "bad"})
+            with self.assertRaises(scorched.exc.BulkIndexError) as cm:
+                indexer.flush()
+            self.assertEqual(len(cm.exception.errors), 1)
+            batch, error = cm.exception.errors[0]
+            self.assertEqual(batch, [("add", self.si.codec.dumps({"id": "bad"}))])
+            self.assertIsInstance(error, scorched.exc.SolrError)
+            # errors are only raised once
+            indexer.add({"id": "2"})
+            indexer.close()
+
+    def test_backpressure(self):
+        release = threading.Event()
+
+        def request(method, url, data=None, **kwargs):
+            release.wait()
+            return mock.Mock(status_code=200, text=OK)
+
+        indexer = scorched.bulk.BulkIndexer(
+            self.si, max_docs=1, max_latency=None, workers=1, max_pending=1
+        )
+        with mock.patch.object(requests.Session, "request", side_effect=request):
+            indexer.add({"id": "1"})  # taken by the worker
+            indexer.add({"id": "2"})  # waits in the queue
+            adder = threading.Thread(target=indexer.add, args=({"id": "3"},))
+            adder.start()
+            adder.join(0.05)
+            self.assertTrue(adder.is_alive())
+            release.set()
+            adder.join()
+            indexer.close()
+
+    def test_coalesce(self):
+        with scorched.bulk.BulkIndexer(self.si, workers=1, coalesce=True) as indexer:
+            indexer.add({"id": "1", "popularity": 1, "cat": ["a"]})
+            indexer.add({"id": "2", "popularity": {"inc": 1}})
+            indexer.add({"id": "1", "popularity": {"inc": 2}})
+            indexer.add({"id": "1", "cat": {"add": "b"}})
+            indexer.add({"id": "2", "popularity": {"inc": 3}, "cat": {"set": ["x"]}})
+            indexer.add({"id": "2", "cat": {"remove": "x"}})
+            indexer.add({"id": "3", "name": {"set": "old"}})
+            indexer.delete_by_ids(["3"])
+            indexer.add({"id": "3", "name": {"set": "new"}})
+        self.assertEqual(
+            self.bodies,
+            [
+                [
+                    {"id": "1", "popularity": 3, "cat": ["a", "b"]},
+                    {"id": "2", "popularity": {"inc": 4}, "cat": {"set": None}},
+                ],
+                {"delete": ["3"]},
+                [{"id": "3", "name": {"set": "new"}}],
+            ],
+        )
+
+    def test_coalesce_barriers(self):
+        with scorched.bulk.BulkIndexer(self.si, workers=1, coalesce=True) as indexer:
+            indexer.add({"id": "1", "cat": {"add": "a"}})
+            # can't be merged without knowing the stored value
+            indexer.add({"id": "1", "cat": {"remove": "b"}})
+            indexer.add({"id": "1", "cat": {"remove": "c"}})
+            indexer.delete_by_query(self.si.Q(cat="c"))
+            indexer.add({"id": "1", "cat": {"remove": "d"}})
+        self.assertEqual(
+            self.bodies,
+            [
+                [
+                    {"id": "1", "cat": {"add": "a"}},
+                    {"id": "1", "cat": {"remove": ["b", "c"]}},
+                ],
+                {"delete": {"query": "cat:c"}},
+                [{"id": "1", "cat": {"remove": "d"}}],
+            ],
+        )
+
+    def test_merge_updates(self):
+        merge = scorched.bulk.merge_updates
+        self.assertEqual(
+            merge({"id": "1", "n": {"set": 1}}, {"id": "1", "n": {"inc": 2}}, "id"),
+            {"id": "1", "n": {"set": 3}},
+        )
+        self.assertEqual(
+            merge({"id": "1", "n": 1}, {"id": "1", "m": 2}, "id"), {"id": "1", "m": 2}
+        )
+        self.assertEqual(
+            merge(
+                {"id": "1", "t": ["a"]}, {"id": "1", "t": {"add-distinct": "a"}}, "id"
+            ),
+            {"id": "1", "t": ["a"]},
+        )
+        self.assertEqual(
+            merge({"id": "1", "t": "a"}, {"id": "1", "t": {"remove": "a"}}, "id"),
+            {"id": "1"},
+        )
+        self.assertEqual(
+            merge({"id": "1", "n": {"inc": 1}}, {"id": "1", "n": {"set": 2}}, "id"),
+            {"id": "1", "n": {"set": 2}},
+        )
+        self.assertIsNone(
+            merge(
+                {"id": "1", "t": {"set": "a"}, "_version_": 1},
+                {"id": "1", "t": {"set": "b"}},
+                "id",
+            )
+        )
+        self.assertIsNone(
+            merge(
+                {"id": "1", "t": {"removeregex": "a.*"}},
+                {"id": "1", "t": {"add": "b"}},
+                "id",
+            )
+        )
+        self.assertIsNone(
+            merge({"id": "1", "n": "x"}, {"id": "1", "n": {"inc": 1}}, "id")
+        )
+        # several operations on one field are an atomic update too
+        multiple = {"id": "1", "t": {"add": "a", "remove": "b"}}
+        self.assertTrue(scorched.bulk.is_atomic(multiple, "id"))
+        self.assertIsNone(merge({"id": "1", "n": {"inc": 1}}, multiple, "id"))
+        self.assertIsNone(merge(multiple, {"id": "1", "n": {"inc": 1}}, "id"))
+        self.assertIsNone(merge({"id": "1", "t": ["b"]}, multiple, "id"))
+        self.assertFalse(scorched.bulk.is_atomic({"id": "1", "m": {"k": 1}}, "id"))
+
+    def test_coalesce_multiple_operations(self):
+        with scorched.bulk.BulkIndexer(self.si, workers=1, coalesce=True) as indexer:
+            indexer.add({"id": "1", "count": {"inc": 1}})
+            indexer.add({"id": "1", "tags": {"add": "a", "remove": "b"}})
+        self.assertEqual(
+            self.bodies,
+            [
+                [
+                    {"id": "1", "count": {"inc": 1}},
+                    {"id": "1", "tags": {"add": "a", "remove": "b"}},
+                ]
+            ],
+        )
+
+    def test_invalid_arguments(self):
+        self.assertRaises(ValueError, scorched.bulk.BulkIndexer, self.si, max_docs=0)
+        self.assertRaises(ValueError, scorched.bulk.BulkIndexer, self.si, workers=0)
+
+
+class TestUpdateBatch(unittest.TestCase):
+    def setUp(self):
+        with mock.patch("scorched.connection.SolrInterface.init_schema") as init_schema:
+            init_schema.return_value = scorched.tests.schema.schema
+            self.si = scorched.connection.SolrInterface("http://localhost:8983/solr")
+
+    def test_single_request(self):
+        with mock.patch.object(
+            requests.Session,
+            "request",
+            return_value=mock.Mock(status_code=200, text=OK),
+        ) as request:
+            with self.si.batch(commitWithin=1000) as batch:
+                batch.delete_by_query(self.si.Q(name="old"))
+                batch.add([{"id": "1", "popularity": None}, {"id": "2"}])
+                batch.delete_by_ids(["3"]).add({"id": "4"}, overwrite=False)
+                batch.commit(softCommit=True)
+                self.assertEqual(len(batch), 6)
+        self.assertEqual(request.call_count, 1)
+        args, kwargs = request.call_args
+        self.assertEqual(
+            args[1], "http://localhost:8983/solr/update/json?commitWithin=1000"
+        )
+        body = kwargs["data"]
+        self.assertEqual(
+            json.loads(body, object_pairs_hook=list),
+            [
+                ("delete", [("query", "name:old")]),
+                ("add", [("doc", [("id", "1")])]),
+                ("add", [("doc", [("id", "2")])]),
+                ("delete", ["3"]),
+                ("add", [("doc", [("id", "4")]), ("overwrite", False)]),
+                ("commit", [("softCommit", True)]),
+            ],
+        )
+        self.assertEqual(len(batch), 0)
+
+    def test_delete_single_id(self):
+        batch = self.si.batch()
+        batch.delete_by_ids("doc-12").delete_by_ids(("a", "b"))
+        self.assertEqual(
+            json.loads(batch.message(), object_pairs_hook=list),
+            [("delete", ["doc-12"]), ("delete", ["a", "b"])],
+        )
+
+    def test_not_sent(self):
+        with mock.patch.object(requests.Session, "request") as request:
+            self.assertIsNone(self.si.batch().send())
+            with self.assertRaises(KeyError):
+                with self.si.batch() as batch:
+                    batch.rollback()
+                    raise KeyError()
+        self.assertEqual(request.call_count, 0)
+        self.assertEqual(json.loads(batch.message()), {"rollback": {}})
@@ -0,0 +1,128 @@
+import datetime
+import decimal
+import json
+import unittest
+import uuid
+from unittest import mock
+
+import pytz
+import requests
+
+import scorched.codec
+import scorched.connection
+import scorched.dates
+import scorched.tests.schema
+
+CODECS = ["json"] + (["orjson"] if scorched.codec.orjson is not None else [])
+
+RESPONSE = {
+    "responseHeader": {"status": 0, "QTime": 1},
+    "response": {
+        "numFound": 1,
+        "start": 0,
+        "docs": [{"id": "1", "name": "Köln", "created_dt": "2020-01-02T03:04:05Z"}],
+    },
+}
+
+
+class TestCodecs(unittest.TestCase):
+    def test_roundtrip(self):
+        for name in CODECS:
+            codec = scorched.codec.get_codec(name)
+            data = codec.dumps({"id": "1", "name": "Köln", "n": [1, 2.5, None]})
+            self.assertIsInstance(data, bytes)
+            self.assertEqual(
+                codec.loads(data), {"id": "1", "name": "Köln", "n": [1, 2.5, None]}
+            )
+            self.assertEqual(codec.loads(data.decode("utf-8")), codec.loads(data))
+
+    def test_values(self):
+        value = {
+            "naive": datetime.datetime(2020, 1, 2, 3, 4, 5, 123000),
+            "utc": datetime.datetime(2020, 1, 2, 3, 4, 5, tzinfo=pytz.utc),
+            "other": pytz.timezone("Europe/Berlin").localize(
+                datetime.datetime(2020, 1, 2, 4, 4, 5)
+            ),
+            "solr_date": scorched.dates.solr_date("2020-01-02T03:04:05Z"),
+            "date": datetime.date(2020, 1, 2),
+            "uuid": uuid.UUID(int=1),
+            "decimal": decimal.Decimal("1.5"),
+            "set": {1},
+        }
+        for name in CODECS:
+            codec = scorched.codec.get_codec(name)
+            self.assertEqual(
+                json.loads(codec.dumps(value)),
+                {
+                    "naive": "2020-01-02T03:04:05.123000Z",
+                    "utc": "2020-01-02T03:04:05Z",
+                    "other": "2020-01-02T03:04:05Z",
+                    "solr_date": "2020-01-02T03:04:05Z",
+                    "date": "2020-01-02T00:00:00Z",
+                    "uuid": "00000000-0000-0000-0000-000000000001",
+                    "decimal": 1.5,
+                    "set": [1],
+                },
+            )
+            self.assertRaises(TypeError, codec.dumps, object())
+
+    def test_get_codec(self):
+        self.assertIsInstance(
+            scorched.codec.get_codec("json"), scorched.codec.JSONCodec
+        )
+        codec = scorched.codec.JSONCodec()
+        self.assertIs(scorched.codec.get_codec(codec), codec)
+        self.assertRaises(ValueError, scorched.codec.get_codec, "yaml")
+        # orjson is opt-in, even if it is installed
+        self.assertEqual(scorched.codec.get_codec().name, "json")
+
+    @unittest.skipIf(scorched.codec.orjson is not None, "orjson is installed")
+    def test_no_orjson(self):
+        self.assertRaises(ImportError, scorched.codec.get_codec, "orjson")
+
+
+class TestInterfaceCodec(unittest.TestCase):
+    def _make_one(self, codec=None):
+        with mock.patch("scorched.connection.SolrInterface.init_schema") as init_schema:
+            init_schema.return_value = scorched.tests.schema.schema
+            return scorched.connection.SolrInterface(
+                "http://localhost:8983/solr", codec=codec
+            )
+
+    def test_default_keeps_text(self):
+        si = self._make_one()
+        self.assertEqual(si.codec.name, "json")
+        text = json.dumps(RESPONSE)
+        with mock.patch.object(
+            requests.Session,
+            "request",
+            return_value=mock.Mock(
+                status_code=200, text=text, content=text.encode("utf-8")
+            ),
+        ):
+            res = si.query(id="1").execute()
+        self.assertEqual(res.original_json, text)
+        self.assertEqual(res.result.docs[0]["name"], "Köln")
+
+    def test_search_and_add(self):
+        for name in CODECS:
+            si = self._make_one(name)
+            body = json.dumps(RESPONSE).encode("utf-8")
+            with mock.patch.object(
+                requests.Session,
+                "request",
+                return_value=mock.Mock(status_code=200, content=body),
+            ) as request:
+                res = si.query(id="1").execute()
+                si.add({"id": "2", "created_dt": datetime.datetime(2020, 1, 2)})
+            self.assertEqual(res.result.docs[0]["name"], "Köln")
+            self.assertEqual(
+                res.result.docs[0]["created_dt"],
+                datetime.datetime(2020, 1, 2, 3, 4, 5, tzinfo=pytz.utc),
+            )
+            self.assertEqual(res.original_json, body)
+            data = request.call_args[1]["data"]
+            self.assertIsInstance(data, bytes)
+            self.assertEqual(
+                json.loads(data), [{"id": "2", "created_dt": "2020-01-02T00:00:00Z"}]
+            )
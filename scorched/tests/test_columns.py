@@ -0,0 +1,146 @@
+import array
+import datetime
+import json
+import unittest
+from unittest import mock
+
+import pytz
+import requests
+
+import scorched.columns
+import scorched.connection
+import scorched.response
+import scorched.tests.schema
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+DOCS = [
+    {
+        "id": "1",
+        "n": 1,
+        "price": 1.5,
+        "flag": True,
+        "created": "2020-01-02T03:04:05.123Z",
+        "tags": ["a", "b"],
+        "version": 2**62,
+    },
+    {"id": "2", "n": 2, "price": 2, "flag": False, "version": 1},
+]
+
+
+class TestToColumns(unittest.TestCase):
+    def test_stdlib(self):
+        columns = scorched.columns.to_columns(
+            DOCS, datefields=("created",), use_numpy=False
+        )
+        self.assertEqual(
+            list(columns),
+            ["id", "n", "price", "flag", "created", "tags", "version"],
+        )
+        self.assertEqual(columns["id"], ["1", "2"])
+        self.assertEqual(columns["n"], array.array("q", [1, 2]))
+        self.assertEqual(columns["price"], array.array("d", [1.5, 2.0]))
+        self.assertEqual(columns["flag"], [True, False])
+        self.assertEqual(
+            columns["created"],
+            [datetime.datetime(2020, 1, 2, 3, 4, 5, 123000, tzinfo=pytz.utc), None],
+        )
+        self.assertEqual(columns["tags"], [["a", "b"], None])
+        self.assertEqual(columns["version"], array.array("q", [2**62, 1]))
+
+    def test_missing_values(self):
+        columns = scorched.columns.to_columns(
+            [{"n": 1, "x": 0.5}, {}], ["n", "x", "y"], use_numpy=False
+        )
+        # ints with gaps stay exact
+        self.assertEqual(columns["n"], [1, None])
+        self.assertEqual(columns["x"][0], 0.5)
+        self.assertNotEqual(columns["x"][1], columns["x"][1])  # NaN
+        self.assertEqual(columns["y"], [None, None])
+        self.assertEqual(
+            scorched.columns.to_column([2**70, 1]), [2**70, 1]  # too large
+        )
+
+    @unittest.skipIf(numpy is None, "needs numpy")
+    def test_numpy(self):
+        columns = scorched.columns.to_columns(
+            DOCS, datefields=("created",), use_numpy=True
+        )
+        self.assertEqual(columns["n"].dtype, numpy.int64)
+        self.assertEqual(columns["price"].dtype, numpy.float64)
+        self.assertEqual(columns["flag"].dtype, bool)
+        self.assertEqual(
+            columns["created"][0], numpy.datetime64("2020-01-02T03:04:05.123")
+        )
+        self.assertTrue(numpy.isnat(columns["created"][1]))
+
+    @unittest.skipIf(numpy is not None, "numpy is installed")
+    def test_no_numpy(self):
+        self.assertRaises(
+            ImportError, scorched.columns.to_columns, DOCS, use_numpy=True
+        )
+
+    def test_fl_fields(self):
+        self.assertEqual(scorched.columns.fl_fields("id,price"), ["id", "price"])
+        self.assertIsNone(scorched.columns.fl_fields("id,*_s"))
+        self.assertIsNone(scorched.columns.fl_fields(None))
+
+
+class TestResultColumns(unittest.TestCase):
+    def response(self, docs, lazy=False):
+        return scorched.response.SolrResponse.from_json(
+            json.dumps(
+                {
+                    "responseHeader": {"status": 0},
+                    "response": {"numFound": len(docs), "start": 0, "docs": docs},
+                }
+            ),
+            "id",
+            ("created",),
+            lazy=lazy,
+        )
+
+    def test_eager_and_lazy(self):
+        eager = self.response(DOCS).result.to_columns(use_numpy=False)
+        lazy = self.response(DOCS, lazy=True).result.to_columns(use_numpy=False)
+        self.assertEqual(eager, lazy)
+        self.assertEqual(scorched.response.SolrResult().to_columns(), {})
+
+    def test_cursor(self):
+        with mock.patch("scorched.connection.SolrInterface.init_schema") as init_schema:
+            init_schema.return_value = scorched.tests.schema.schema
+            si = scorched.connection.SolrInterface("http://localhost:2222/mysolr")
+        pages = [
+            {
+                "responseHeader": {"status": 0},
+                "response": {"numFound": 3, "start": 0, "docs": docs},
+                "nextCursorMark": mark,
+            }
+            for docs, mark in [
+                ([{"id": "1", "popularity": 1}, {"id": "2"}], "a"),
+                ([{"id": "3", "popularity": 3}], "b"),
+                ([], "b"),
+            ]
+        ]
+        responses = [mock.Mock(status_code=200, text=json.dumps(p)) for p in pages]
+        with mock.patch.object(requests.Session, "request", side_effect=responses):
+            batches = list(
+                si.query(id="*")
+                .field_limit(["id", "popularity", "price"])
+                .cursor(rows=2)
+                .columns(use_numpy=False)
+            )
+        self.assertEqual(
+            batches,
+            [
+                {"id": ["1", "2"], "popularity": [1, None], "price": [None, None]},
+                {
+                    "id": ["3"],
+                    "popularity": array.array("q", [3]),
+                    "price": [None],
+                },
+            ],
+        )
@@ -1,8 +1,16 @@
 import datetime
+import gzip
+import io
 import json
 import os
 import requests
+import scorched.breaker
 import scorched.connection
+import scorched.pool
+import scorched.retry
+import scorched.tests.schema
+import threading
+import time
 import unittest
 
 from unittest import mock
@@ -203,3 +211,489 @@ class TestSolrInterface(unittest.TestCase):
             result[0]['last_modified']['set'],
             '2014-02-18T12:12:10Z',
         )
+
+
+class TestStreamingAdd(unittest.TestCase):
+
+    def _make_one(self, **kwargs):
+        with mock.patch('scorched.connection.SolrInterface.init_schema') as \
+                init_schema:
+            init_schema.return_value = scorched.tests.schema.schema
+            return scorched.connection.SolrInterface(
+                "http://localhost:8983/solr/core0", **kwargs)
+
+    def _request(self, bodies):
+        def request(method, url, data=None, **kwargs):
+            # read the generator like requests does while sending
+            chunks = list(data)
+            bodies.append((chunks, kwargs['headers']))
+            return mock.Mock(
+                status_code=200,
+                text='{"responseHeader": {"status": 0, "QTime": 1}}')
+        return request
+
+    def test_add_stream(self):
+        si = self._make_one()
+        dt = datetime.datetime(2014, 2, 18, 12, 12, 10)
+        docs = ({'id': str(i), 'last_modified': dt, 'text': 'lorem ' * 50}
+                for i in range(1000))
+        bodies = []
+        with mock.patch.object(requests.Session, 'request',
+                               side_effect=self._request(bodies)) as req:
+            ret = si.add(docs, stream=True, commitWithin=10)
+        self.assertEqual(req.call_count, 1)
+        self.assertIn('commitWithin=10', req.call_args[0][1])
+        self.assertEqual(len(ret), 1)
+        self.assertEqual(ret[0].status, 0)
+        chunks, headers = bodies[0]
+        self.assertTrue(len(chunks) > 1)
+        self.assertNotIn('Content-Encoding', headers)
+        body = json.loads(b''.join(chunks).decode('utf-8'))
+        self.assertEqual(len(body), 1000)
+        self.assertEqual(body[999]['id'], '999')
+        self.assertEqual(body[0]['last_modified'], '2014-02-18T12:12:10Z')
+
+    def test_add_stream_empty(self):
+        si = self._make_one()
+        bodies = []
+        with mock.patch.object(requests.Session, 'request',
+                               side_effect=self._request(bodies)):
+            si.add([], stream=True)
+        self.assertEqual(b''.join(bodies[0][0]), b'[]')
+
+    def test_add_stream_gzipped(self):
+        si = self._make_one(gzip_level=6)
+        bodies = []
+        with mock.patch.object(requests.Session, 'request',
+                               side_effect=self._request(bodies)):
+            si.add([{'id': '1'}, {'id': '2'}], chunk=1, stream=True)
+        chunks, headers = bodies[0]
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            json.loads(gzip.decompress(b''.join(chunks)).decode('utf-8')),
+            [{'id': '1'}, {'id': '2'}])
+
+    @mock.patch('time.sleep')
+    def test_add_stream_is_not_retried(self, sleep):
+        si = self._make_one(retry_policy=scorched.retry.RetryPolicy(
+            idempotent_only=False))
+        with mock.patch.object(
+                requests.Session, 'request',
+                side_effect=requests.exceptions.ConnectionError()) as req:
+            self.assertRaises(requests.exceptions.ConnectionError,
+                              si.add, [{'id': '1'}], stream=True)
+        self.assertEqual(req.call_count, 1)
+
+
+class TestConcurrentAdd(unittest.TestCase):
+
+    def _make_one(self):
+        with mock.patch('scorched.connection.SolrInterface.init_schema') as \
+                init_schema:
+            init_schema.return_value = scorched.tests.schema.schema
+            return scorched.connection.SolrInterface(
+                "http://localhost:8983/solr/core0")
+
+    def test_responses_in_order(self):
+        si = self._make_one()
+        lock = threading.Lock()
+        in_flight = [0, 0]  # current, maximum
+
+        def request(method, url, data=None, **kwargs):
+            first = int(json.loads(data)[0]['id'])
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            # later chunks finish first
+            time.sleep(0.001 * (20 - first // 10))
+            with lock:
+                in_flight[0] -= 1
+            return mock.Mock(
+                status_code=200,
+                text='{"responseHeader": {"status": 0, "QTime": %d}}' % first)
+
+        docs = ({'id': str(i)} for i in range(200))
+        with mock.patch.object(requests.Session, 'request',
+                               side_effect=request) as req:
+            ret = si.add(docs, chunk=10, concurrency=4)
+        self.assertEqual(req.call_count, 20)
+        self.assertEqual([r.QTime for r in ret], list(range(0, 200, 10)))
+        self.assertTrue(1 < in_flight[1] <= 4)
+
+    def test_stops_on_first_error(self):
+        si = self._make_one()
+
+        def request(method, url, data=None, **kwargs):
+            if json.loads(data)[0]['id'] == '20':
+                return mock.Mock(status_code=400, text='bad doc')
+            time.sleep(0.01)
+            return mock.Mock(
+                status_code=200,
+                text='{"responseHeader": {"status": 0, "QTime": 1}}')
+
+        docs = [{'id': str(i)} for i in range(1000)]
+        with mock.patch.object(requests.Session, 'request',
+                               side_effect=request) as req:
+            self.assertRaises(scorched.exc.SolrError, si.add, docs,
+                              chunk=10, concurrency=2)
+        self.assertTrue(req.call_count < 20)
+
+    def test_invalid_arguments(self):
+        si = self._make_one()
+        self.assertRaises(ValueError, si.add, [], concurrency=0)
+        self.assertRaises(ValueError, si.add, [], stream=True, concurrency=2)
+
+
+class TestProcessAdd(unittest.TestCase):
+
+    def _make_one(self):
+        with mock.patch('scorched.connection.SolrInterface.init_schema') as \
+                init_schema:
+            init_schema.return_value = scorched.tests.schema.schema
+            return scorched.connection.SolrInterface(
+                "http://localhost:8983/solr/core0")
+
+    def _request(self, method, url, data=None, **kwargs):
+        self.bodies.append(data)
+        return mock.Mock(
+            status_code=200,
+            text='{"responseHeader": {"status": 0, "QTime": 1}}')
+
+    def test_prepared_in_processes(self):
+        si = self._make_one()
+        self.bodies = []
+        docs = ({'id': str(i),
+                 'created_dt': datetime.datetime(2014, 2, 18, 10, 0, i),
+                 'popularity': None} for i in range(25))
+        with mock.patch.object(requests.Session, 'request',
+                               side_effect=self._request):
+            ret = si.add(docs, chunk=10, processes=2)
+        self.assertEqual(len(ret), 3)
+        self.assertTrue(all(isinstance(b, bytes) for b in self.bodies))
+        sent = [doc for body in self.bodies for doc in json.loads(body)]
+        self.assertEqual([doc['id'] for doc in sent],
+                         [str(i) for i in range(25)])
+        self.assertEqual(sent[3], {'id': '3',
+                                   'created_dt': '2014-02-18T10:00:03Z'})
+        self.assertEqual(
+            self.bodies,
+            [si.codec.dumps(si._prepare_docs(json.loads(body)))
+             for body in self.bodies])
+
+    def test_with_concurrency(self):
+        si = self._make_one()
+        self.bodies = []
+        docs = [{'id': str(i)} for i in range(50)]
+        with mock.patch.object(requests.Session, 'request',
+                               side_effect=self._request):
+            ret = si.add(docs, chunk=10, processes=2, concurrency=2)
+        self.assertEqual(len(ret), 5)
+        self.assertEqual(
+            [doc['id'] for body in self.bodies for doc in json.loads(body)],
+            [str(i) for i in range(50)])
+
+    def test_invalid_arguments(self):
+        si = self._make_one()
+        self.assertRaises(ValueError, si.add, [], processes=0)
+        self.assertRaises(ValueError, si.add, [], stream=True, processes=2)
+
+
+class TestReplicaPool(unittest.TestCase):
+
+    urls = ["http://a:8983/solr/core0", "http://b:8983/solr/core0"]
+
+    def _make_connection(self, **kwargs):
+        return scorched.connection.SolrConnection(
+            url=self.urls, http_connection=None, mode="", retry_timeout=-1,
+            max_length_get_url=2048, **kwargs)
+
+    def test_reads_are_balanced(self):
+        sc = self._make_connection()
+        with mock.patch.object(requests.Session, 'request',
+                               return_value=mock.Mock(status_code=200,
+                                                      text='{}')) as req:
+            sc.select([])
+            sc.select([])
+        hosts = [c[0][1].split('/')[2] for c in req.call_args_list]
+        self.assertEqual(hosts, ['a:8983', 'b:8983'])
+
+    def test_updates_go_to_writers(self):
+        sc = self._make_connection(writer_urls=["http://w:8983/solr/core0"])
+        with mock.patch.object(requests.Session, 'request',
+                               return_value=mock.Mock(status_code=200,
+                                                      text='{}')) as req:
+            sc.update('{}')
+            sc.update('{}')
+        self.assertEqual(
+            [c[0][1] for c in req.call_args_list],
+            ["http://w:8983/solr/core0/update/json"] * 2)
+
+    def test_failover_ejects_node(self):
+        sc = self._make_connection()
+        sc.readers.probe = None
+        responses = [requests.exceptions.ConnectionError(),
+                     mock.Mock(status_code=200, text='{"ok": 1}')]
+        with mock.patch.object(requests.Session, 'request',
+                               side_effect=responses) as req:
+            self.assertEqual(sc.select([]), '{"ok": 1}')
+        self.assertEqual(req.call_count, 2)
+        a, b = sc.readers.nodes
+        self.assertFalse(a.healthy)
+        self.assertTrue(b.healthy)
+        self.assertEqual(a.outstanding, 0)
+
+    def test_unavailable_status_ejects_node(self):
+        sc = self._make_connection()
+        sc.readers.probe = None
+        responses = [mock.Mock(status_code=503),
+                     mock.Mock(status_code=200, text='{}')]
+        with mock.patch.object(requests.Session, 'request',
+                               side_effect=responses):
+            sc.get("1")
+        self.assertEqual(
+            [n.healthy for n in sc.readers.nodes], [False, True])
+
+    def test_all_nodes_down(self):
+        sc = self._make_connection()
+        sc.readers.probe = None
+        with mock.patch.object(requests.Session, 'request',
+                               side_effect=requests.exceptions.Timeout()):
+            self.assertRaises(requests.exceptions.Timeout, sc.select, [])
+
+    def test_updates_do_not_fail_over(self):
+        sc = self._make_connection(writer_urls=self.urls)
+        sc.writers.probe = None
+        with mock.patch.object(
+                requests.Session, 'request',
+                side_effect=requests.exceptions.ConnectionError()) as req:
+            self.assertRaises(requests.exceptions.ConnectionError,
+                              sc.update, '{}')
+        self.assertEqual(req.call_count, 1)
+
+    def test_ping(self):
+        sc = self._make_connection()
+        with mock.patch.object(requests.Session, 'request',
+                               return_value=mock.Mock(status_code=200)) as req:
+            self.assertTrue(sc.ping(sc.readers.nodes[1]))
+        self.assertEqual(req.call_args[0][1],
+                         "http://b:8983/solr/core0/admin/ping")
+
+
+class TestRetries(unittest.TestCase):
+
+    def _make_connection(self, **kwargs):
+        return scorched.connection.SolrConnection(
+            url="http://localhost:8983/solr/core0", http_connection=None,
+            mode="", retry_timeout=-1, max_length_get_url=2048, **kwargs)
+
+    def test_no_retries_by_default(self):
+        sc = self._make_connection()
+        with mock.patch.object(
+                requests.Session, 'request',
+                side_effect=requests.exceptions.ConnectionError()) as req:
+            self.assertRaises(requests.exceptions.ConnectionError,
+                              sc.select, [])
+        self.assertEqual(req.call_count, 1)
+
+    def test_retry_timeout_retries_once(self):
+        sc = self._make_connection()
+        sc.retry_policy = scorched.retry.RetryPolicy.from_retry_timeout(0)
+        responses = [requests.exceptions.ConnectionError(),
+                     mock.Mock(status_code=200, text='{}')]
+        with mock.patch.object(requests.Session, 'request',
+                               side_effect=responses) as req:
+            self.assertEqual(sc.update('{}'), '{}')
+        self.assertEqual(req.call_count, 2)
+
+    @mock.patch('time.sleep')
+    def test_backoff_for_idempotent_requests(self, sleep):
+        policy = scorched.retry.RetryPolicy(
+            max_attempts=3, backoff=0.5, jitter=False)
+        sc = self._make_connection(retry_policy=policy)
+        responses = [mock.Mock(status_code=503, headers={}),
+                     requests.exceptions.Timeout(),
+                     mock.Mock(status_code=200, text='{"ok": 1}')]
+        with mock.patch.object(requests.Session, 'request',
+                               side_effect=responses) as req:
+            self.assertEqual(sc.select([]), '{"ok": 1}')
+        self.assertEqual(req.call_count, 3)
+        self.assertEqual([c[0][0] for c in sleep.call_args_list], [0.5, 1.0])
+
+    @mock.patch('time.sleep')
+    def test_updates_are_not_retried(self, sleep):
+        sc = self._make_connection(
+            retry_policy=scorched.retry.RetryPolicy())
+        with mock.patch.object(
+                requests.Session, 'request',
+                return_value=mock.Mock(status_code=503, headers={})) as req:
+            self.assertRaises(scorched.exc.SolrError, sc.update, '{}')
+        self.assertEqual(req.call_count, 1)
+        self.assertFalse(sleep.called)
+
+    @mock.patch('time.sleep')
+    def test_gives_up_after_max_attempts(self, sleep):
+        sc = self._make_connection(
+            retry_policy=scorched.retry.RetryPolicy(max_attempts=2))
+        with mock.patch.object(
+                requests.Session, 'request',
+                return_value=mock.Mock(status_code=429, headers={})) as req:
+            self.assertRaises(scorched.exc.SolrError, sc.get, "1")
+        self.assertEqual(req.call_count, 2)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def _make_connection(self, url="http://localhost:8983/solr/core0"):
+        return scorched.connection.SolrConnection(
+            url=url, http_connection=None, mode="", retry_timeout=-1,
+            max_length_get_url=2048,
+            circuit_breaker=scorched.breaker.CircuitBreaker(
+                failure_threshold=2, reset_timeout=60))
+
+    def test_fail_fast_while_open(self):
+        sc = self._make_connection()
+        with mock.patch.object(
+                requests.Session, 'request',
+                side_effect=requests.exceptions.ConnectTimeout()) as req:
+            for _ in range(2):
+                self.assertRaises(requests.exceptions.ConnectTimeout,
+                                  sc.select, [])
+            self.assertRaises(scorched.exc.CircuitOpenError, sc.select, [])
+            self.assertRaises(scorched.exc.CircuitOpenError, sc.update, '{}')
+        self.assertEqual(req.call_count, 2)
+        status = sc.node_status()
+        self.assertEqual(status['readers'][0]['breaker']['state'], 'open')
+        # reads and writes to the same url share the breaker
+        self.assertEqual(status['writers'][0]['breaker']['state'], 'open')
+
+    def test_unexpected_error_ends_trial(self):
+        sc = self._make_connection()
+        breaker = sc.readers.nodes[0].breaker
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.opened_at -= 60
+        self.assertEqual(breaker.state, 'half-open')
+        with mock.patch.object(
+                requests.Session, 'request',
+                side_effect=requests.exceptions.ChunkedEncodingError()):
+            self.assertRaises(requests.exceptions.ChunkedEncodingError,
+                              sc.select, [])
+        self.assertEqual(breaker.state, 'open')
+        breaker.opened_at -= 60
+        with mock.patch.object(requests.Session, 'request',
+                               return_value=mock.Mock(status_code=200,
+                                                      text='{}')):
+            sc.select([])
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_open_breaker_skips_replica(self):
+        sc = self._make_connection(
+            url=["http://a:8983/solr/core0", "http://b:8983/solr/core0"])
+        sc.readers.probe = None
+        a, b = sc.readers.nodes
+        a.breaker.record_failure()
+        a.breaker.record_failure()
+        with mock.patch.object(requests.Session, 'request',
+                               return_value=mock.Mock(status_code=200,
+                                                      text='{}')) as req:
+            for _ in range(3):
+                sc.select([])
+        self.assertEqual(
+            set(c[0][1].split('/')[2] for c in req.call_args_list),
+            set(['b:8983']))
+
+
+class TestHedging(unittest.TestCase):
+
+    urls = ["http://a:8983/solr/core0", "http://b:8983/solr/core0"]
+
+    def _make_connection(self, hedge_delay):
+        return scorched.connection.SolrConnection(
+            url=self.urls, http_connection=None, mode="", retry_timeout=-1,
+            max_length_get_url=2048, hedge_delay=hedge_delay)
+
+    def _slow_a(self, method, url, **kwargs):
+        if url.startswith("http://a:"):
+            time.sleep(0.5)
+            return mock.Mock(status_code=200, text='"a"')
+        return mock.Mock(status_code=200, text='"b"')
+
+    def test_slow_replica_is_hedged(self):
+        sc = self._make_connection(hedge_delay=0.05)
+        with mock.patch.object(requests.Session, 'request',
+                               side_effect=self._slow_a) as req:
+            started = time.time()
+            self.assertEqual(sc.select([]), '"b"')
+            self.assertTrue(time.time() - started < 0.4)
+        self.assertEqual(req.call_count, 2)
+        self.assertEqual(len(sc.latencies.samples), 1)
+
+    def test_fast_replica_is_not_hedged(self):
+        sc = self._make_connection(hedge_delay=1.0)
+        with mock.patch.object(requests.Session, 'request',
+                               return_value=mock.Mock(status_code=200,
+                                                      text='{}')) as req:
+            sc.get("1")
+        self.assertEqual(req.call_count, 1)
+
+    def test_auto_delay_needs_samples(self):
+        sc = self._make_connection(hedge_delay="auto")
+        self.assertIsNone(sc.current_hedge_delay())
+        for _ in range(sc.latencies.min_samples):
+            sc.latencies.add(0.01)
+        self.assertEqual(sc.current_hedge_delay(), 0.01)
+
+    def test_updates_are_not_hedged(self):
+        sc = self._make_connection(hedge_delay=0.0)
+        sc.writers = scorched.pool.NodePool(self.urls)
+        with mock.patch.object(requests.Session, 'request',
+                               return_value=mock.Mock(status_code=200,
+                                                      text='{}')) as req:
+            sc.update('{}')
+        self.assertEqual(req.call_count, 1)
+
+
+class TestGzipUpdates(unittest.TestCase):
+
+    def _make_connection(self, gzip_level):
+        return scorched.connection.SolrConnection(
+            url="http://localhost:8983/solr/core0", http_connection=None,
+            mode="", retry_timeout=-1, max_length_get_url=2048,
+            gzip_level=gzip_level)
+
+    def test_invalid_level(self):
+        self.assertRaises(ValueError, self._make_connection, 10)
+
+    def test_uncompressed_by_default(self):
+        sc = self._make_connection(None)
+        method, url, kwargs = sc.request_for_update('[{"id": "1"}]')
+        self.assertEqual(kwargs['data'], '[{"id": "1"}]')
+        self.assertNotIn('Content-Encoding', kwargs['headers'])
+
+    def test_update_body_is_gzipped(self):
+        sc = self._make_connection(6)
+        body = json.dumps([{"id": str(i), "text_t": "lorem ipsum " * 20}
+                           for i in range(50)])
+        method, url, kwargs = sc.request_for_update(body, commitWithin=10)
+        self.assertEqual(kwargs['headers']['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            kwargs['headers']['Content-Type'],
+            'application/json; charset=utf-8')
+        self.assertEqual(gzip.decompress(kwargs['data']).decode('utf-8'), body)
+        self.assertTrue(len(kwargs['data']) < len(body) / 10)
+        # empty bodies stay empty
+        method, url, kwargs = sc.request_for_update({})
+        self.assertEqual(kwargs, {'data': {}, 'headers': {}})
+
+    def test_extract_body_is_gzipped(self):
+        sc = self._make_connection(1)
+        fh = io.BytesIO(b"%PDF-1.4 fake")
+        fh.name = "/tmp/lipsum.pdf"
+        method, url, kwargs = sc.request_for_extract(fh, {"wt": "json"})
+        self.assertEqual(url, "http://localhost:8983/solr/core0/update/extract")
+        self.assertEqual(kwargs['headers']['Content-Encoding'], 'gzip')
+        self.assertTrue(kwargs['headers']['Content-Type'].startswith(
+            'multipart/form-data; boundary='))
+        body = gzip.decompress(kwargs['data'])
+        self.assertIn(b'filename="lipsum.pdf"', body)
+        self.assertIn(b"%PDF-1.4 fake", body)
@@ -5,7 +5,10 @@ import scorched.exc
 import pytest
 
 from scorched.dates import (solr_date, datetime_from_w3_datestring,
-                            datetime_factory)
+                            datetime_factory, FieldMatcher, field_matcher,
+                            is_datetime_field,
+                            datetime_from_extended_w3_datestring,
+                            DateTimeRangeError)
 from scorched.search import LuceneQuery
 
 not_utc = pytz.timezone('Etc/GMT-3')
@@ -104,3 +107,82 @@ class TestDates(unittest.TestCase):
         query = LuceneQuery()
         date = solr_date("2009-07-23T03:24:34.000376Z")
         query.Q(**{"last_modified__gt": date})
+
+
+field_matcher_data = (
+    ("created", True),
+    ("created_at", False),
+    ("publish_dt", True),
+    ("publish_dts", True),
+    ("publish_dtx", False),
+    ("date_from", True),
+    ("dat", False),
+    ("a_b_c", True),
+    ("a_c", False),
+)
+
+field_matcher_patterns = ("created", "*_dt", "*_dts", "date_*", "a*b_c")
+
+
+@pytest.mark.parametrize("name, expected", field_matcher_data)
+def test_field_matcher(name, expected):
+    matcher = FieldMatcher(field_matcher_patterns)
+    assert (name in matcher) == expected
+    # memoized answers stay the same
+    assert (name in matcher) == expected
+    assert is_datetime_field(name, matcher) == expected
+    assert is_datetime_field(name, field_matcher_patterns) == expected
+
+
+def test_field_matcher_compiled_once():
+    matcher = FieldMatcher(field_matcher_patterns)
+    assert field_matcher(matcher) is matcher
+    assert list(matcher) == list(field_matcher_patterns)
+    assert matcher.names == frozenset(["created"])
+    assert matcher.prefixes == ("date_",)
+    assert matcher.suffixes == ("_dt", "_dts")
+    assert matcher.regex is not None
+
+
+def test_field_matcher_bounded_memo():
+    matcher = FieldMatcher(["*_dt"])
+    matcher.max_memo = 10
+    for i in range(25):
+        assert ("f%d_dt" % i) in matcher
+    assert len(matcher.memo) <= 10
+
+
+@pytest.mark.parametrize("s", [
+    "2009-07-23T03:24:34Z",
+    "2009-07-23T03:24:34.1Z",
+    "2009-07-23T03:24:34.123Z",
+    "2009-07-23T03:24:34.000376Z",
+    "2009-07-23T03:24:34.123456789Z",
+    "0001-01-01T00:00:00Z",
+])
+def test_canonical_fast_path(s):
+    assert datetime_from_w3_datestring(s) == \
+        datetime_from_extended_w3_datestring(s)
+
+
+def test_extended_fallback():
+    # five digit and BC years aren't canonical and can't be represented
+    for s in ["12009-07-23T03:24:34Z", "-0009-07-23T03:24:34Z"]:
+        with pytest.raises(DateTimeRangeError):
+            datetime_from_w3_datestring(s)
+    # neither are offsets or dates without time
+    assert datetime_from_w3_datestring("2009-07-23T03:24:34+02:00") == \
+        datetime.datetime(2009, 7, 23, 5, 24, 34, tzinfo=pytz.utc)
+    assert datetime_from_w3_datestring("2009-07-23") == \
+        datetime.datetime(2009, 7, 23, tzinfo=pytz.utc)
+    with pytest.raises(DateTimeRangeError):
+        datetime_from_w3_datestring("2009-13-23T03:24:34Z")
+    with pytest.raises(ValueError):
+        datetime_from_w3_datestring("yesterday")
+
+
+def test_parsed_dates_are_cached():
+    datetime_from_w3_datestring.cache_clear()
+    first = datetime_from_w3_datestring("2014-03-11T10:49:00Z")
+    assert datetime_from_w3_datestring("2014-03-11T10:49:00Z") is first
+    assert datetime_from_w3_datestring.cache_info().hits == 1
@@ -0,0 +1,209 @@
+import datetime
+import json
+import os.path
+import struct
+import unittest
+from unittest import mock
+
+import pytz
+import requests
+
+import scorched.connection
+import scorched.javabin as jb
+import scorched.response
+import scorched.tests.schema
+
+
+def load(*values):
+    return jb.loads(bytes([jb.VERSION]) + b"".join(values))
+
+
+class TestLoads(unittest.TestCase):
+    def test_scalars(self):
+        self.assertIsNone(load(bytes([jb.NULL])))
+        self.assertIs(load(bytes([jb.BOOL_TRUE])), True)
+        self.assertIs(load(bytes([jb.BOOL_FALSE])), False)
+        self.assertEqual(load(bytes([jb.BYTE]), struct.pack(">b", -3)), -3)
+        self.assertEqual(load(bytes([jb.SHORT]), struct.pack(">h", -300)), -300)
+        self.assertEqual(load(bytes([jb.INT]), struct.pack(">i", -70000)), -70000)
+        self.assertEqual(load(bytes([jb.LONG]), struct.pack(">q", -(2**40))), -(2**40))
+        self.assertEqual(load(bytes([jb.DOUBLE]), struct.pack(">d", 1.1)), 1.1)
+        self.assertEqual(load(bytes([jb.FLOAT]), struct.pack(">f", 0.5)), 0.5)
+        self.assertEqual(load(bytes([jb.BYTEARR, 3]), b"abc"), b"abc")
+
+    def test_small_ints(self):
+        # 5 fits into the tag
+        self.assertEqual(load(bytes([jb.SINT | 5])), 5)
+        # 300 = 0b100101100: lower 4 bits in the tag, 18 as vint
+        self.assertEqual(load(bytes([jb.SINT | 0x10 | 12, 18])), 300)
+        # 2 ** 40 needs a multi byte vint
+        data = jb.dumps(2**40)
+        self.assertEqual(data[1] >> 5, jb.SLONG >> 5)
+        self.assertEqual(jb.loads(data), 2**40)
+
+    def test_strings(self):
+        self.assertEqual(load(bytes([jb.STR | 3]), b"abc"), "abc")
+        text = "\xe9中" * 20
+        data = text.encode("utf-8")
+        # sizes from 31 on continue in a vint
+        self.assertEqual(load(bytes([jb.STR | 0x1F, len(data) - 0x1F]), data), text)
+        # extern strings are referenced by their index after the first time
+        value = load(
+            bytes([jb.ARR | 3, jb.EXTERN_STRING, jb.STR | 2]),
+            b"id",
+            bytes([jb.EXTERN_STRING | 1, jb.EXTERN_STRING | 1]),
+        )
+        self.assertEqual(value, ["id", "id", "id"])
+
+    def test_date(self):
+        value = load(bytes([jb.DATE]), struct.pack(">q", 1394534940000))
+        self.assertEqual(value, datetime.datetime(2014, 3, 11, 10, 49, tzinfo=pytz.utc))
+
+    def test_containers(self):
+        # NamedList -> flat list, SimpleOrderedMap -> dict
+        pairs = bytes([jb.STR | 1]) + b"a" + bytes([jb.SINT | 1])
+        self.assertEqual(load(bytes([jb.ORDERED_MAP | 1]), pairs), {"a": 1})
+        self.assertEqual(load(bytes([jb.NAMED_LST | 1]), pairs), ["a", 1])
+        self.assertEqual(load(bytes([jb.MAP, 1]), pairs), {"a": 1})
+        self.assertEqual(
+            load(bytes([jb.MAP_ENTRY_ITER]), pairs, bytes([jb.END])), {"a": 1}
+        )
+        self.assertEqual(
+            load(bytes([jb.ITERATOR, jb.SINT | 1, jb.SINT | 2, jb.END])), [1, 2]
+        )
+        self.assertEqual(
+            load(bytes([jb.ENUM_FIELD_VALUE, jb.SINT | 1, jb.STR | 1]), b"x"), "x"
+        )
+
+    def test_documents(self):
+        value = load(
+            bytes([jb.SOLRDOCLST, jb.ARR | 3, jb.SINT | 1, jb.SINT, jb.NULL]),
+            bytes([jb.ARR | 1, jb.SOLRDOC, jb.ORDERED_MAP | 1]),
+            bytes([jb.EXTERN_STRING, jb.STR | 2]),
+            b"id",
+            bytes([jb.STR | 1]),
+            b"1",
+        )
+        self.assertEqual(value, {"numFound": 1, "start": 0, "docs": [{"id": "1"}]})
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, jb.loads, b"")
+        self.assertRaises(ValueError, jb.loads, b"\x01\x00")
+        self.assertRaises(ValueError, load, bytes([jb.STR | 5]), b"ab")
+        self.assertRaises(ValueError, load, bytes([jb.INT, 0]))
+        self.assertRaises(ValueError, load, bytes([jb.SOLRINPUTDOC]))
+
+    def test_solr_response(self):
+        # laid out the way Solr 8's BinaryResponseWriter writes a faceted
+        # search: SimpleOrderedMaps for the response sections, a NamedList
+        # for the facet counts
+        path = os.path.join(
+            os.path.dirname(__file__), "dumps", "request_w_facets.javabin"
+        )
+        with open(path, "rb") as f:
+            value = jb.loads(f.read())
+        self.assertEqual(value["responseHeader"]["status"], 0)
+        self.assertEqual(value["responseHeader"]["params"]["facet.field"], "cat")
+        self.assertEqual(
+            value["facet_counts"]["facet_fields"]["cat"],
+            ["electronics", 12, "memory", 3, "multifunction printer", 1, "search", 0],
+        )
+        self.assertEqual(value["facet_counts"]["facet_queries"], {})
+        result = value["response"]
+        self.assertEqual(
+            (result["numFound"], result["start"], result["maxScore"]), (2, 0, 1.0)
+        )
+        self.assertIs(result["numFoundExact"], True)
+        doc = result["docs"][0]
+        self.assertEqual(doc["id"], "VS1GB400C3")
+        self.assertEqual(doc["cat"], ["electronics", "memory"])
+        self.assertEqual(doc["popularity"], 7)
+        self.assertIs(doc["inStock"], True)
+        self.assertAlmostEqual(doc["price"], 74.99, places=5)
+        self.assertEqual(
+            doc["manufacturedate_dt"],
+            datetime.datetime(2006, 2, 9, tzinfo=pytz.utc),
+        )
+        self.assertEqual(doc["_version_"], 1712345678901234688)
+        self.assertEqual(result["docs"][1]["id"], "0579B002")
+
+    def test_round_trip(self):
+        for name in ["request_w_facets.json", "request_hl.json"]:
+            path = os.path.join(os.path.dirname(__file__), "dumps", name)
+            with open(path) as f:
+                doc = json.load(f)
+            self.assertEqual(jb.loads(jb.dumps(doc)), doc)
+
+
+class TestJavabinResponse(unittest.TestCase):
+    def test_same_as_json(self):
+        path = os.path.join(os.path.dirname(__file__), "dumps", "request_w_facets.json")
+        with open(path) as f:
+            data = f.read()
+        expected = scorched.response.SolrResponse.from_json(data, "id")
+        res = scorched.response.SolrResponse.from_javabin(
+            jb.dumps(json.loads(data)), "id"
+        )
+        self.assertEqual(res.result.numFound, expected.result.numFound)
+        self.assertEqual(res.result.docs, expected.result.docs)
+        self.assertEqual(
+            res.facet_counts.facet_fields, expected.facet_counts.facet_fields
+        )
+
+    def test_solr_response(self):
+        path = os.path.join(
+            os.path.dirname(__file__), "dumps", "request_w_facets.javabin"
+        )
+        with open(path, "rb") as f:
+            res = scorched.response.SolrResponse.from_javabin(f.read(), "id")
+        self.assertEqual(res.status, 0)
+        self.assertEqual(res.result.numFound, 2)
+        self.assertEqual(
+            [doc["id"] for doc in res.result.docs], ["VS1GB400C3", "0579B002"]
+        )
+        self.assertEqual(
+            res.facet_counts.facet_fields["cat"],
+            [
+                ("electronics", 12),
+                ("memory", 3),
+                ("multifunction printer", 1),
+                ("search", 0),
+            ],
+        )
+
+    def test_search(self):
+        with mock.patch("scorched.connection.SolrInterface.init_schema") as init_schema:
+            init_schema.return_value = scorched.tests.schema.schema
+            si = scorched.connection.SolrInterface(
+                "http://localhost:2222/mysolr", response_format="javabin"
+            )
+        created = datetime.datetime(2020, 1, 2, 3, 4, 5, tzinfo=pytz.utc)
+        body = jb.dumps(
+            {
+                "responseHeader": {"status": 0, "QTime": 1, "params": {}},
+                "response": {
+                    "numFound": 1,
+                    "start": 0,
+                    "docs": [{"id": "1", "last_modified": created}],
+                },
+            }
+        )
+        response = mock.Mock(status_code=200, content=body)
+        with mock.patch.object(
+            requests.Session, "request", return_value=response
+        ) as request:
+            res = si.query(id="1").execute()
+        self.assertIn("wt=javabin", request.call_args[0][1])
+        self.assertEqual(res.result.docs, [{"id": "1", "last_modified": created}])
+
+    def test_invalid_format(self):
+        self.assertRaises(
+            ValueError,
+            scorched.connection.SolrConnection,
+            "http://localhost:2222/mysolr",
+            None,
+            "",
+            -1,
+            2048,
+            response_format="xml",
+        )
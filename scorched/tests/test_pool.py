@@ -0,0 +1,95 @@
+import time
+import unittest
+
+from scorched.pool import LatencyTracker, NodePool, SolrNode
+
+
+class TestSolrNode(unittest.TestCase):
+    def test_rebase(self):
+        node = SolrNode("http://replica:8983/solr/core0")
+        self.assertEqual(node.url, "http://replica:8983/solr/core0/")
+        self.assertEqual(
+            node.rebase(
+                "http://primary/solr/core0/select/?q=a", "http://primary/solr/core0/"
+            ),
+            "http://replica:8983/solr/core0/select/?q=a",
+        )
+        self.assertEqual(
+            node.rebase("http://elsewhere/select", "http://primary/solr/core0/"),
+            "http://elsewhere/select",
+        )
+
+
+class TestNodePool(unittest.TestCase):
+    urls = ["http://a/solr", "http://b/solr", "http://c/solr"]
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, NodePool, [])
+        self.assertRaises(ValueError, NodePool, self.urls, balancing="random")
+
+    def test_round_robin(self):
+        pool = NodePool(self.urls)
+        picked = [pool.pick().url for _ in range(6)]
+        self.assertEqual(
+            picked,
+            ["http://a/solr/", "http://b/solr/", "http://c/solr/"] * 2,
+        )
+
+    def test_least_outstanding(self):
+        pool = NodePool(self.urls, balancing="least_outstanding")
+        a, b, c = pool.nodes
+        pool.acquire(a)
+        pool.acquire(b)
+        self.assertIs(pool.pick(), c)
+        pool.acquire(c)
+        pool.acquire(c)
+        pool.release(a)
+        self.assertIs(pool.pick(), a)
+
+    def test_eject_and_exclude(self):
+        pool = NodePool(self.urls)
+        a, b, c = pool.nodes
+        pool.eject(b)
+        self.assertEqual(pool.healthy_nodes, [a, c])
+        self.assertNotIn(b, [pool.pick() for _ in range(4)])
+        self.assertIs(pool.pick(exclude=[a]), c)
+        self.assertIsNone(pool.pick(exclude=[a, b, c]))
+        # with every healthy node excluded the ejected one is still tried
+        self.assertIs(pool.pick(exclude=[a, c]), b)
+
+    def test_single_node_is_never_ejected(self):
+        pool = NodePool(self.urls[:1], probe=lambda node: True)
+        pool.eject(pool.nodes[0])
+        self.assertTrue(pool.nodes[0].healthy)
+        self.assertIsNone(pool._prober)
+
+    def test_probe_restores_node(self):
+        probed = []
+
+        def probe(node):
+            probed.append(node)
+            return len(probed) > 1
+
+        pool = NodePool(self.urls, probe=probe, probe_interval=0.01)
+        node = pool.nodes[0]
+        pool.eject(node)
+        self.assertFalse(node.healthy)
+        deadline = time.time() + 5
+        while not node.healthy and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(node.healthy)
+        self.assertEqual(probed, [node, node])
+
+
+class TestLatencyTracker(unittest.TestCase):
+    def test_percentile(self):
+        tracker = LatencyTracker(size=100, min_samples=10)
+        for n in range(9):
+            tracker.add(n)
+        self.assertIsNone(tracker.percentile(95))
+        for n in range(9, 200):
+            tracker.add(n / 100.0 if n < 190 else 10.0)
+        # only the latest 100 samples count
+        self.assertEqual(len(tracker.samples), 100)
+        self.assertEqual(tracker.percentile(95), 10.0)
+        self.assertEqual(tracker.percentile(0), 1.0)
@@ -145,3 +145,67 @@ class ResultsTestCase(unittest.TestCase):
         self.assertEqual(
             type(groups[0]["doclist"]["docs"][0]["important_dts"][0]), datetime.datetime
         )
+
+    def test_lazy_response(self):
+        eager = scorched.response.SolrResponse.from_json(
+            self.data, "id", datefields=("*_dt", "modified")
+        )
+        res = scorched.response.SolrResponse.from_json(
+            self.data, "id", datefields=("*_dt", "modified"), lazy=True
+        )
+        self.assertNotIn("facet_counts", res.__dict__)
+        doc = res.result.docs[0]
+        self.assertIsInstance(doc, scorched.response.LazyDocument)
+        # fields are converted when they are read
+        self.assertIsInstance(doc._fields["created_dt"], str)
+        self.assertEqual(
+            doc["created_dt"],
+            datetime.datetime(2009, 7, 23, 3, 24, 34, 376, tzinfo=pytz.utc),
+        )
+        self.assertIs(doc["created_dt"], doc._fields["created_dt"])
+        self.assertEqual(res.result.docs, eager.result.docs)
+        self.assertEqual(res.facet_counts.__dict__, eager.facet_counts.__dict__)
+        self.assertIn("facet_counts", res.__dict__)
+        self.assertEqual(res.stats.__dict__, eager.stats.__dict__)
+        self.assertEqual(len(res), 3)
+        self.assertRaises(AttributeError, getattr, res, "unknown")
+
+    def test_lazy_document(self):
+        doc = scorched.response.LazyDocument(
+            {"id": "1", "n": 2}, lambda name, value: value * 2
+        )
+        self.assertEqual(doc["n"], 4)
+        self.assertEqual(doc["n"], 4)
+        doc["m"] = 1
+        self.assertEqual(doc["m"], 1)
+        del doc["n"]
+        self.assertEqual(dict(doc), {"id": "11", "m": 1})
+        self.assertIn("id", doc)
+        self.assertEqual(doc.get("n", 0), 0)
+        self.assertEqual(len(doc), 2)
+
+    def test_lazy_highlighting(self):
+        res = scorched.response.SolrResponse.from_json(self.data_hl, "id", lazy=True)
+        highlights = {"author": ["<em>John</em> Muir"]}
+        self.assertEqual(res.result.docs[0]["solr_highlights"], highlights)
+
+        res = scorched.response.SolrResponse.from_json(
+            self.data_hl_grouped, "id", datefields=("important_dts",), lazy=True
+        )
+        groups = getattr(res.groups, res.group_field)["groups"]
+        doc = groups[0]["doclist"]["docs"][0]
+        self.assertEqual(doc["solr_highlights"], {"author": ["John <em>Muir</em>"]})
+        self.assertEqual(type(doc["important_dts"][0]), datetime.datetime)
+
+    def test_facet_arrays(self):
+        res = scorched.response.SolrResponse.from_json(
+            self.data, "id", facet_arrays=True
+        )
+        values, counts = res.facet_counts.facet_fields["cat"]
+        self.assertEqual(values, ["book", "paperback", "hardcover"])
+        self.assertEqual(list(counts), [3, 2, 1])
+        # range facets are pairs as before
+        self.assertEqual(
+            res.facet_counts.facet_ranges["created_dt"]["counts"][0],
+            ("2009-01-01T00:00:00Z", 1),
+        )
@@ -0,0 +1,63 @@
+import time
+import unittest
+from unittest import mock
+
+from scorched.retry import RetryPolicy
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_invalid(self):
+        self.assertRaises(ValueError, RetryPolicy, max_attempts=0)
+
+    def test_exponential_backoff(self):
+        policy = RetryPolicy(
+            max_attempts=5, backoff=0.1, multiplier=2, max_backoff=0.3, jitter=False
+        )
+        started = time.monotonic()
+        delays = [policy.delay_for(n, started, True) for n in range(1, 6)]
+        self.assertEqual(delays, [0.1, 0.2, 0.3, 0.3, None])
+
+    def test_jitter(self):
+        policy = RetryPolicy(backoff=1.0, max_attempts=2)
+        started = time.monotonic()
+        for _ in range(20):
+            delay = policy.delay_for(1, started, True)
+            self.assertTrue(0 <= delay <= 1.0)
+
+    def test_idempotent_only(self):
+        policy = RetryPolicy()
+        started = time.monotonic()
+        self.assertIsNone(policy.delay_for(1, started, False))
+        self.assertIsNotNone(policy.delay_for(1, started, True))
+        policy = RetryPolicy(idempotent_only=False)
+        self.assertIsNotNone(policy.delay_for(1, started, False))
+
+    def test_retry_status_codes(self):
+        policy = RetryPolicy(jitter=False)
+        started = time.monotonic()
+        for status, retried in [(503, True), (429, True), (500, False), (200, False)]:
+            response = mock.Mock(status_code=status, headers={})
+            self.assertEqual(policy.is_retryable(response), retried)
+            self.assertEqual(
+                policy.delay_for(1, started, True, response) is not None, retried
+            )
+
+    def test_retry_after(self):
+        policy = RetryPolicy(jitter=False, deadline=None)
+        response = mock.Mock(status_code=429, headers={"Retry-After": "3"})
+        self.assertEqual(policy.delay_for(1, time.monotonic(), True, response), 3.0)
+
+    def test_deadline(self):
+        policy = RetryPolicy(jitter=False, backoff=1.0, deadline=5.0)
+        self.assertEqual(policy.delay_for(1, time.monotonic(), True), 1.0)
+        self.assertIsNone(policy.delay_for(1, time.monotonic() - 4.5, True))
+
+    def test_from_retry_timeout(self):
+        started = time.monotonic()
+        self.assertIsNone(
+            RetryPolicy.from_retry_timeout(-1).delay_for(1, started, True)
+        )
+        policy = RetryPolicy.from_retry_timeout(2)
+        self.assertEqual(policy.delay_for(1, started, False), 2)
+        self.assertIsNone(policy.delay_for(2, started, False))
+        self.assertFalse(policy.is_retryable(mock.Mock(status_code=503)))
@@ -0,0 +1,275 @@
+import datetime
+import decimal
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+from unittest import mock
+
+import pytz
+
+import scorched.connection
+import scorched.schema
+import scorched.tests.schema
+
+
+class TestSchemaCache(unittest.TestCase):
+    def setUp(self):
+        self.fetched = []
+
+    def fetch(self):
+        schema = {"uniqueKey": "id", "version": len(self.fetched)}
+        self.fetched.append(schema)
+        return schema
+
+    def test_fetch_once(self):
+        cache = scorched.schema.SchemaCache()
+        self.assertEqual(cache.get("http://a/", self.fetch)["version"], 0)
+        self.assertEqual(cache.get("http://a/", self.fetch)["version"], 0)
+        self.assertEqual(cache.get("http://b/", self.fetch)["version"], 1)
+        self.assertEqual(len(self.fetched), 2)
+        cache.invalidate("http://a/")
+        self.assertEqual(cache.get("http://a/", self.fetch)["version"], 2)
+
+    def test_stale_blocking(self):
+        cache = scorched.schema.SchemaCache(ttl=10, background=False)
+        cache.get("http://a/", self.fetch)
+        cache._entries["http://a/"]["checked_at"] -= 11
+        self.assertEqual(cache.get("http://a/", self.fetch)["version"], 1)
+
+    def test_stale_background(self):
+        cache = scorched.schema.SchemaCache(ttl=10)
+        cache.get("http://a/", self.fetch)
+        cache._entries["http://a/"]["checked_at"] -= 11
+        # the stale schema is returned right away
+        self.assertEqual(cache.get("http://a/", self.fetch)["version"], 0)
+        for _ in range(100):
+            if not cache._refreshing:
+                break
+            time.sleep(0.01)
+        self.assertEqual(cache.get("http://a/", self.fetch)["version"], 1)
+
+    def test_failed_revalidation_keeps_schema(self):
+        cache = scorched.schema.SchemaCache(ttl=10, background=False)
+        cache.get("http://a/", self.fetch)
+        cache._entries["http://a/"]["checked_at"] -= 11
+        failing = mock.Mock(side_effect=EnvironmentError)
+        self.assertEqual(cache.get("http://a/", failing)["version"], 0)
+        # not retried before the ttl passed again
+        self.assertEqual(cache.get("http://a/", failing)["version"], 0)
+        self.assertEqual(failing.call_count, 1)
+
+    def test_slow_core_does_not_block_others(self):
+        cache = scorched.schema.SchemaCache()
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_fetch():
+            started.set()
+            release.wait(5)
+            return self.fetch()
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(cache.get("http://slow/", slow_fetch))
+            )
+            for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        started.wait(5)
+        try:
+            # answered while the slow core's fetch is still running
+            self.assertEqual(cache.get("http://b/", self.fetch)["version"], 0)
+            cache.invalidate("http://b/")
+        finally:
+            release.set()
+            for thread in threads:
+                thread.join()
+        # callers of the same core share its fetch
+        self.assertEqual(len(self.fetched), 2)
+        self.assertEqual(results[0], results[1])
+
+    def test_persistence(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        scorched.schema.SchemaCache(path=path).get("http://a/", self.fetch)
+        # another process starting up reads it from disk
+        cache = scorched.schema.SchemaCache(path=path)
+        self.assertEqual(cache.get("http://a/", self.fetch)["version"], 0)
+        self.assertEqual(len(self.fetched), 1)
+        cache.invalidate()
+        self.assertEqual(os.listdir(path), [])
+
+
+class TestInterfaceSchema(unittest.TestCase):
+    url = "http://localhost:2222/mysolr"
+
+    def test_offline_schema(self):
+        with mock.patch("scorched.connection.SolrInterface.init_schema") as init_schema:
+            si = scorched.connection.SolrInterface(
+                self.url, schema=scorched.tests.schema.schema
+            )
+            self.assertIn("last_modified", si._datefields)
+        self.assertFalse(init_schema.called)
+
+    def test_lazy_schema(self):
+        with mock.patch("scorched.connection.SolrInterface.init_schema") as init_schema:
+            init_schema.return_value = scorched.tests.schema.schema
+            si = scorched.connection.SolrInterface(self.url, lazy_schema=True)
+            self.assertFalse(init_schema.called)
+            self.assertIn("last_modified", si._datefields)
+            self.assertEqual(si.schema["uniqueKey"], "id")
+        self.assertEqual(init_schema.call_count, 1)
+
+    def test_shared_cache(self):
+        cache = scorched.schema.SchemaCache()
+        with mock.patch("scorched.connection.SolrInterface.init_schema") as init_schema:
+            init_schema.return_value = scorched.tests.schema.schema
+            for _ in range(3):
+                si = scorched.connection.SolrInterface(self.url, schema_cache=cache)
+            self.assertEqual(si.schema["uniqueKey"], "id")
+            scorched.connection.SolrInterface(
+                "http://localhost:2222/other", schema_cache=cache
+            )
+        self.assertEqual(init_schema.call_count, 2)
+
+    def test_revalidated_schema_updates_datefields(self):
+        cache = scorched.schema.SchemaCache(background=False)
+        schema = dict(scorched.tests.schema.schema, fields=[], dynamicFields=[])
+        cache.put(self.url + "/", schema)
+        si = scorched.connection.SolrInterface(self.url, schema_cache=cache)
+        self.assertNotIn("last_modified", si._datefields)
+        cache.put(self.url + "/", scorched.tests.schema.schema)
+        self.assertIn("last_modified", si._datefields)
+
+
+class TestFieldConverters(unittest.TestCase):
+    schema = {
+        "fieldTypes": [
+            {"name": "pdate", "class": "solr.DatePointField"},
+            {"name": "tdate", "class": "solr.TrieDateField"},
+            {"name": "plong", "class": "solr.LongPointField"},
+            {"name": "pdouble", "class": "solr.DoublePointField"},
+            {"name": "boolean", "class": "solr.BoolField"},
+            {"name": "uuid", "class": "solr.UUIDField"},
+            {"name": "string", "class": "solr.StrField"},
+            # a range, not a date, despite its name
+            {"name": "date", "class": "solr.DateRangeField"},
+        ],
+        "fields": [
+            {"name": "id", "type": "uuid"},
+            {"name": "created", "type": "pdate"},
+            {"name": "count_l", "type": "string"},
+            {"name": "period", "type": "date"},
+        ],
+        "dynamicFields": [
+            {"name": "*_l", "type": "plong"},
+            {"name": "*_d", "type": "pdouble"},
+            {"name": "*_b", "type": "boolean"},
+            {"name": "*_tdt", "type": "tdate"},
+            {"name": "*_s", "type": "string"},
+            {"name": "x_*", "type": "boolean"},
+            {"name": "*_dt", "type": "pdates"},  # undeclared, known by name
+        ],
+    }
+
+    def test_kinds(self):
+        converters = scorched.schema.FieldConverters(self.schema)
+        self.assertEqual(converters.kind("id"), "uuid")
+        self.assertEqual(converters.kind("created"), "date")
+        self.assertEqual(converters.kind("a_tdt"), "date")
+        self.assertEqual(converters.kind("a_l"), "int")
+        self.assertEqual(converters.kind("a_d"), "float")
+        self.assertEqual(converters.kind("a_b"), "bool")
+        self.assertIsNone(converters.kind("a_s"))
+        self.assertIsNone(converters.kind("period"))
+        self.assertIsNone(converters.kind("unknown"))
+        # explicit fields win over dynamic ones
+        self.assertIsNone(converters.kind("count_l"))
+        # longer patterns win
+        self.assertEqual(converters.kind("x_a_tdt"), "date")
+        self.assertIn("created", converters.datefields)
+        self.assertIn("a_tdt", converters.datefields)
+        self.assertNotIn("period", converters.datefields)
+
+    def test_pdates_by_name(self):
+        schema = dict(self.schema, dynamicFields=[{"name": "*_dt", "type": "pdate"}])
+        del schema["fieldTypes"]
+        converters = scorched.schema.FieldConverters(schema)
+        self.assertEqual(converters.kind("a_dt"), "date")
+        self.assertIsNone(converters.kind("id"))
+
+    def test_to_solr(self):
+        converters = scorched.schema.FieldConverters(self.schema)
+        key = uuid.UUID("6ba7b810-9dad-11d1-80b4-00c04fd430c8")
+        doc = {
+            "id": key,
+            "created": datetime.datetime(2014, 2, 18, 12, 12, 10),
+            "a_l": Index(3),
+            "a_d": [decimal.Decimal("1.5"), 2],
+            "a_b": {"set": 0},
+            "a_tdt": {"add": [datetime.datetime(2014, 2, 18)], "removeregex": "2013.*"},
+            "a_s": key,
+        }
+        self.assertEqual(
+            converters.prepare_update(doc),
+            {
+                "id": str(key),
+                "created": "2014-02-18T12:12:10Z",
+                "a_l": 3,
+                "a_d": [1.5, 2],
+                "a_b": {"set": False},
+                "a_tdt": {
+                    "add": ["2014-02-18T00:00:00Z"],
+                    "removeregex": "2013.*",
+                },
+                "a_s": key,
+            },
+        )
+        self.assertIsInstance(doc["id"], uuid.UUID)
+
+    def test_prepare_result(self):
+        converters = scorched.schema.FieldConverters(self.schema)
+        doc = {
+            "id": "6ba7b810-9dad-11d1-80b4-00c04fd430c8",
+            "created": "2014-02-18T12:12:10Z",
+            "a_tdt": ["2014-02-18T12:12:10Z", None],
+            "a_l": 3,
+            "period": "[2014 TO 2015]",
+        }
+        converters.prepare_result(doc)
+        created = datetime.datetime(2014, 2, 18, 12, 12, 10, tzinfo=pytz.utc)
+        self.assertEqual(doc["id"], uuid.UUID("6ba7b810-9dad-11d1-80b4-00c04fd430c8"))
+        self.assertEqual(doc["created"], created)
+        self.assertEqual(doc["a_tdt"], [created, None])
+        self.assertEqual(doc["period"], "[2014 TO 2015]")
+        # typed values, e.g. from javabin, are kept
+        self.assertEqual(
+            converters.prepare_result({"created": created}), {"created": created}
+        )
+
+    def test_interface(self):
+        si = scorched.connection.SolrInterface(
+            "http://localhost:2222/mysolr", schema=scorched.tests.schema.schema
+        )
+        self.assertEqual(
+            si._prepare_docs([{"inStock": 1, "popularity": Index(2), "x": None}]),
+            [{"inStock": True, "popularity": 2}],
+        )
+        # tdate was only recognized by its class
+        self.assertIn("a_tdt", si._datefields)
+
+
+class Index(object):
+    """An integer json can't encode, like numpy's"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def __index__(self):
+        return self.value
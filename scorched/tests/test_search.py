@@ -8,6 +8,7 @@ from scorched.search import (SolrSearch, MltSolrSearch, PaginateOptions,
                              RequestHandlerOption, DebugOptions,
                              params_from_dict, FacetRangeOptions,
                              TermVectorOptions, StatOptions,
+                             StreamExpressionBuilder, LuceneQuery,
                              is_iter)
 from scorched.strings import WildcardString
 import pytest
@@ -645,3 +646,37 @@ def test_is_iter():
     assert is_iter([1, 2]) == True
     assert is_iter((1, 2)) == True
     assert is_iter(set([1, 2])) == True
+
+
+stream_expression_data = (
+    (lambda E: E.search("books", q="*:*", fl="id,price", sort="id asc"),
+     'search(books, fl="id,price", q="*:*", sort="id asc")'),
+    (lambda E: E.rollup(E.search("books", q="*:*", fl=["cat", "price"],
+                                 sort="cat asc"),
+                        E.sum("price"), E.count("*"), over="cat"),
+     'rollup(search(books, fl="cat,price", q="*:*", sort="cat asc"), '
+     'sum(price), count(*), over="cat")'),
+    (lambda E: E.top(E.search("books", q="*:*"), n=3, sort="price desc"),
+     'top(search(books, q="*:*"), n=3, sort="price desc")'),
+    (lambda E: E.innerJoin(E.search("people", q="*:*"),
+                           E.search("pets", q="*:*"), on="personId=id"),
+     'innerJoin(search(people, q="*:*"), search(pets, q="*:*"), '
+     'on="personId=id")'),
+    (lambda E: E.having(E.search("books", q="*:*"), E.eq("inStock", True)),
+     'having(search(books, q="*:*"), eq(inStock, true))'),
+    (lambda E: E.search("books", q='title:"a b"',
+                        fq=datetime.datetime(2020, 1, 2)),
+     'search(books, fq="2020-01-02T00:00:00Z", q="title:\\"a b\\"")'),
+)
+
+
+@pytest.mark.parametrize("build, expected", stream_expression_data)
+def test_stream_expression(build, expected):
+    assert str(build(StreamExpressionBuilder())) == expected
+
+
+def test_stream_expression_lucene_query():
+    q = LuceneQuery()
+    q.add(["hello world"], {})
+    expr = StreamExpressionBuilder().search("books", q=q)
+    assert str(expr) == 'search(books, q="hello\\ world")'
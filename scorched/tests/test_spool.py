@@ -0,0 +1,221 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import warnings
+from unittest import mock
+
+import requests
+
+import scorched.connection
+import scorched.exc
+import scorched.spool
+import scorched.tests.schema
+
+OK = '{"responseHeader": {"status": 0, "QTime": 1}}'
+
+
+class TestWriteSpool(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+    def segments(self):
+        return sorted(n for n in os.listdir(self.path) if n.endswith(".spool"))
+
+    def test_replay_in_order(self):
+        spool = scorched.spool.WriteSpool(self.path, segment_bytes=100)
+        self.assertFalse(spool.pending())
+        for i in range(10):
+            spool.append('[{"id": "%d"}]' % i, {"commitWithin": i})
+        self.assertTrue(spool.pending())
+        self.assertTrue(len(self.segments()) > 1)
+        sent = []
+        spool.replay(lambda body, params: sent.append((body, params)))
+        self.assertEqual(
+            sent, [(b'[{"id": "%d"}]' % i, {"commitWithin": i}) for i in range(10)]
+        )
+        self.assertFalse(spool.pending())
+        self.assertEqual(spool.replayed, 10)
+        # only the segment written to is left
+        self.assertEqual(len(self.segments()), 1)
+        spool.close()
+
+    def test_survives_restart(self):
+        spool = scorched.spool.WriteSpool(self.path)
+        for i in range(3):
+            spool.append(b"%d" % i, {})
+        sent = []
+
+        def send(body, params):
+            sent.append(body)
+            if len(sent) == 2:
+                spool._stopped.set()
+
+        spool.replay(send)
+        spool.close()
+        self.assertEqual(sent, [b"0", b"1"])
+        spool = scorched.spool.WriteSpool(self.path)
+        self.assertTrue(spool.pending())
+        spool.append(b"3", {})
+        sent = []
+        spool.replay(lambda body, params: sent.append(body))
+        self.assertEqual(sent, [b"2", b"3"])
+        spool.close()
+
+    def test_max_bytes(self):
+        spool = scorched.spool.WriteSpool(self.path, max_bytes=50)
+        spool.append(b"x" * 20, {})
+        self.assertRaises(scorched.exc.SpoolFullError, spool.append, b"x" * 20, {})
+        spool.replay(lambda body, params: None)
+        spool.close()
+
+    def test_damaged_segment(self):
+        spool = scorched.spool.WriteSpool(self.path)
+        spool.append(b"1", {})
+        spool.close()
+        with open(os.path.join(self.path, self.segments()[0]), "ab") as f:
+            f.write(b"\x00\x00\x00\x09torn")
+        spool = scorched.spool.WriteSpool(self.path)
+        spool.append(b"2", {})
+        sent = []
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            spool.replay(lambda body, params: sent.append(body))
+        self.assertEqual(sent, [b"1", b"2"])
+        self.assertEqual(len(caught), 1)
+        spool.close()
+
+    def test_retry_and_reject(self):
+        rejected = []
+        spool = scorched.spool.WriteSpool(
+            self.path,
+            retry_interval=0.001,
+            on_rejected=lambda body, params, e: rejected.append(body),
+        )
+        spool.append(b"bad", {})
+        spool.append(b"good", {})
+        attempts = []
+
+        def send(body, params):
+            attempts.append(body)
+            if len(attempts) == 1:
+                raise requests.exceptions.ConnectionError()
+            if body == b"bad":
+                raise scorched.exc.SolrError(mock.Mock(status_code=400))
+
+        spool.replay(send)
+        self.assertEqual(attempts, [b"bad", b"bad", b"good"])
+        self.assertEqual(rejected, [b"bad"])
+        self.assertFalse(spool.pending())
+        spool.close()
+
+    def test_server_errors_stay_queued(self):
+        rejected = []
+        spool = scorched.spool.WriteSpool(
+            self.path,
+            retry_interval=0.001,
+            on_rejected=lambda body, params, e: rejected.append(body),
+        )
+        spool.append(b"1", {})
+        spool.append(b"2", {})
+        answers = [502, 504, 500, 429]
+        attempts = []
+
+        def send(body, params):
+            attempts.append(body)
+            if answers:
+                raise scorched.exc.SolrError(mock.Mock(status_code=answers.pop(0)))
+
+        spool.replay(send)
+        self.assertEqual(attempts, [b"1"] * 5 + [b"2"])
+        self.assertEqual(rejected, [])
+        self.assertEqual(spool.replayed, 2)
+        spool.close()
+
+    def test_unavailable(self):
+        unavailable = scorched.spool.unavailable
+        self.assertTrue(unavailable(requests.exceptions.ConnectTimeout()))
+        self.assertTrue(unavailable(scorched.exc.CircuitOpenError()))
+        for code in (429, 502, 503, 504):
+            self.assertTrue(
+                unavailable(scorched.exc.SolrError(mock.Mock(status_code=code)))
+            )
+        self.assertFalse(
+            unavailable(scorched.exc.SolrError(mock.Mock(status_code=400)))
+        )
+        self.assertFalse(unavailable(requests.exceptions.ReadTimeout()))
+        rejected = scorched.spool.rejected
+        self.assertTrue(rejected(scorched.exc.SolrError(mock.Mock(status_code=400))))
+        for code in (429, 500, 502):
+            self.assertFalse(
+                rejected(scorched.exc.SolrError(mock.Mock(status_code=code)))
+            )
+
+
+class TestSpooledConnection(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+    def test_spool_while_down(self):
+        spool = scorched.spool.WriteSpool(self.path, retry_interval=0.01)
+        with mock.patch("scorched.connection.SolrInterface.init_schema") as init_schema:
+            init_schema.return_value = scorched.tests.schema.schema
+            si = scorched.connection.SolrInterface(
+                "http://localhost:8983/solr", spool=spool
+            )
+        up = threading.Event()
+        sent = []
+
+        def request(method, url, data=None, **kwargs):
+            if not up.is_set():
+                raise requests.exceptions.ConnectionError()
+            sent.append(json.loads(data))
+            return mock.Mock(status_code=200, text=OK)
+
+        with mock.patch.object(requests.Session, "request", side_effect=request):
+            ret = si.add({"id": "1"})
+            self.assertTrue(ret[0].spooled)
+            ret = si.delete_by_ids(["1"])
+            self.assertTrue(ret.spooled)
+            up.set()
+            spool._replayer.join()
+            self.assertEqual(sent, [[{"id": "1"}], {"delete": ["1"]}])
+            ret = si.add({"id": "2"})
+            self.assertFalse(ret[0].spooled)
+        spool.close()
+
+    def test_spool_bad_gateway(self):
+        spool = scorched.spool.WriteSpool(self.path)
+        with mock.patch("scorched.connection.SolrInterface.init_schema") as init_schema:
+            init_schema.return_value = scorched.tests.schema.schema
+            si = scorched.connection.SolrInterface(
+                "http://localhost:8983/solr", spool=spool
+            )
+        with mock.patch.object(
+            requests.Session,
+            "request",
+            return_value=mock.Mock(status_code=502, content=b"Bad Gateway"),
+        ):
+            self.assertTrue(si.add({"id": "1"})[0].spooled)
+        spool.close()
+        self.assertTrue(spool.pending())
+
+    def test_errors_not_spooled(self):
+        spool = scorched.spool.WriteSpool(self.path)
+        with mock.patch("scorched.connection.SolrInterface.init_schema") as init_schema:
+            init_schema.return_value = scorched.tests.schema.schema
+            si = scorched.connection.SolrInterface(
+                "http://localhost:8983/solr", spool=spool
+            )
+        with mock.patch.object(
+            requests.Session,
+            "request",
+            return_value=mock.Mock(status_code=400, content=b"bad doc"),
+        ):
+            self.assertRaises(scorched.exc.SolrError, si.add, {"id": "1"})
+        self.assertFalse(spool.pending())
+        spool.close()
@@ -0,0 +1,302 @@
+import datetime
+import json
+import os.path
+import unittest
+from unittest import mock
+
+import requests
+
+import scorched.connection
+import scorched.response
+import scorched.tests.schema
+from scorched.streaming import ITEM, VALUE, JSONStreamParser, iter_text
+
+
+def chunked(text, size):
+    chunks = []
+    while text:
+        chunks.append(text[:size])
+        text = text[size:]
+    return chunks
+
+
+class TestJSONStreamParser(unittest.TestCase):
+    def test_events(self):
+        text = json.dumps(
+            {
+                "responseHeader": {"status": 0},
+                "response": {"numFound": 2, "docs": [{"id": "1"}, {"id": "2"}]},
+                "nextCursorMark": "AoE",
+            }
+        )
+        events = list(JSONStreamParser([text], [("response", "docs")]))
+        self.assertEqual(
+            events,
+            [
+                (VALUE, ("responseHeader",), {"status": 0}),
+                (VALUE, ("response", "numFound"), 2),
+                (ITEM, ("response", "docs"), {"id": "1"}),
+                (ITEM, ("response", "docs"), {"id": "2"}),
+                (VALUE, ("nextCursorMark",), "AoE"),
+            ],
+        )
+
+    def test_every_chunk_size(self):
+        doc = {
+            "response": {
+                "numFound": 12345,
+                "docs": [
+                    {"id": 'a"b', "n": 1234567, "f": -1.5e10, "t": True},
+                    {"list": [1, 2, {"x": None}], "s": "é中"},
+                ],
+                "empty": [],
+            },
+            "tail": 123456789,
+        }
+        text = json.dumps(doc, indent=2)
+        expected = list(JSONStreamParser([text], [("response", "docs")]))
+        for size in range(1, 20):
+            events = list(JSONStreamParser(chunked(text, size), [("response", "docs")]))
+            self.assertEqual(events, expected)
+        # a number at the end of a chunk must not be cut off
+        self.assertEqual(expected[-1], (VALUE, ("tail",), 123456789))
+
+    def test_split_numbers(self):
+        text = (
+            '{"response": {"numFound": 1234, "start": 10, "maxScore": 1.5,'
+            ' "docs": [{"id": "1"}]}, "a": -2.25e-3, "b": 1.5E10, "c": [1.0, 2]}'
+        )
+        expected = list(JSONStreamParser([text], [("response", "docs")]))
+        for offset in range(1, len(text)):
+            chunks = [text[:offset], text[offset:]]
+            events = list(JSONStreamParser(chunks, [("response", "docs")]))
+            self.assertEqual(events, expected, offset)
+
+    def test_empty_and_missing(self):
+        events = list(JSONStreamParser(['{"response": {"docs": []}}'], [("a", "b")]))
+        self.assertEqual(events, [(VALUE, ("response",), {"docs": []})])
+        self.assertEqual(list(JSONStreamParser(["{ }"], [("a",)])), [])
+        # a streamed path not holding an array is decoded as a value
+        events = list(JSONStreamParser(['{"a": null}'], [("a",)]))
+        self.assertEqual(events, [(VALUE, ("a",), None)])
+
+    def test_invalid(self):
+        for text in ["[1, 2]", '{"a": [1, 2}', '{"a": {"b": [1}', '{"a": 1']:
+            parser = JSONStreamParser(chunked(text, 3), [("a",), ("a", "b")])
+            self.assertRaises(ValueError, list, parser)
+
+    def test_iter_text(self):
+        data = "é中\U0001f600".encode("utf-8")
+        chunks = [bytes([b]) for b in data]
+        self.assertEqual("".join(iter_text(chunks)), "é中\U0001f600")
+
+
+class TestSolrStreamingResponse(unittest.TestCase):
+    def setUp(self):
+        file_path = os.path.join(
+            os.path.dirname(__file__), "dumps", "request_w_facets.json"
+        )
+        with open(file_path) as f:
+            self.data = f.read()
+
+    def test_same_as_solr_response(self):
+        expected = scorched.response.SolrResponse.from_json(self.data, "id")
+        res = scorched.response.SolrStreamingResponse(chunked(self.data, 7), "id")
+        self.assertEqual(res.status, 0)
+        self.assertEqual(res.numFound, 3)
+        self.assertEqual(res.start, 0)
+        self.assertEqual(str(res), "3 results found, starting at #0")
+        # trailing sections can be read before the documents
+        self.assertEqual(
+            res.facet_counts.facet_fields, expected.facet_counts.facet_fields
+        )
+        self.assertEqual(list(res), expected.result.docs)
+        self.assertEqual(list(res), [])
+        self.assertIsNone(res.next_cursor_mark)
+        self.assertRaises(AttributeError, getattr, res, "nonexistent")
+
+    def test_dates_and_constructor(self):
+        text = json.dumps(
+            {
+                "responseHeader": {"status": 0},
+                "response": {
+                    "numFound": 1,
+                    "start": 0,
+                    "docs": [{"id": "1", "created": "2020-01-02T03:04:05Z"}],
+                },
+                "nextCursorMark": "AoE",
+            }
+        )
+        res = scorched.response.SolrStreamingResponse(
+            [text], "id", datefields=("created",), constructor=dict
+        )
+        docs = list(res)
+        self.assertEqual(docs[0]["created"].year, 2020)
+        self.assertEqual(res.next_cursor_mark, "AoE")
+
+    def test_error(self):
+        text = '{"responseHeader": {"status": 1}, "response": {"docs": []}}'
+        self.assertRaises(
+            ValueError, scorched.response.SolrStreamingResponse, [text], "id"
+        )
+
+
+class TestSearchStream(unittest.TestCase):
+    def _make_one(self):
+        with mock.patch("scorched.connection.SolrInterface.init_schema") as init_schema:
+            init_schema.return_value = scorched.tests.schema.schema
+            return scorched.connection.SolrInterface("http://localhost:2222/mysolr")
+
+    def _response(self, doc):
+        response = mock.Mock(status_code=200)
+        data = json.dumps(doc).encode("utf-8")
+        response.iter_content.return_value = chunked(data, 5)
+        return response
+
+    def test_search_stream(self):
+        si = self._make_one()
+        doc = {
+            "responseHeader": {"status": 0},
+            "response": {
+                "numFound": 2,
+                "start": 0,
+                "docs": [
+                    {"id": "1", "last_modified": "2020-01-02T03:04:05Z"},
+                    {"id": "2"},
+                ],
+            },
+        }
+        response = self._response(doc)
+        with mock.patch.object(
+            requests.Session, "request", return_value=response
+        ) as request:
+            res = si.query(id="*").execute(stream=True)
+            docs = list(res)
+        self.assertTrue(request.call_args[1]["stream"])
+        self.assertEqual(res.numFound, 2)
+        self.assertEqual([d["id"] for d in docs], ["1", "2"])
+        self.assertEqual(
+            docs[0]["last_modified"],
+            datetime.datetime(
+                2020, 1, 2, 3, 4, 5, tzinfo=docs[0]["last_modified"].tzinfo
+            ),
+        )
+        self.assertTrue(response.close.called)
+
+    def test_streamed_cursor(self):
+        si = self._make_one()
+        pages = [
+            {
+                "responseHeader": {"status": 0},
+                "response": {"numFound": 3, "start": 0, "docs": docs},
+                "nextCursorMark": mark,
+            }
+            for docs, mark in [
+                ([{"id": "1"}, {"id": "2"}], "a"),
+                ([{"id": "3"}], "b"),
+                ([], "b"),
+            ]
+        ]
+        with mock.patch.object(
+            requests.Session,
+            "request",
+            side_effect=[self._response(page) for page in pages],
+        ) as request:
+            ids = [d["id"] for d in si.query(id="*").cursor(rows=2, stream=True)]
+        self.assertEqual(ids, ["1", "2", "3"])
+        self.assertEqual(request.call_count, 3)
+        self.assertIn("cursorMark=a", request.call_args_list[1][0][1])
+
+    def test_error_status(self):
+        si = self._make_one()
+        response = mock.Mock(status_code=500)
+        with mock.patch.object(requests.Session, "request", return_value=response):
+            self.assertRaises(
+                scorched.exc.SolrError, si.query(id="*").execute, stream=True
+            )
+
+    def test_export(self):
+        si = self._make_one()
+        doc = {
+            "responseHeader": {"status": 0},
+            "response": {
+                "numFound": 2,
+                "docs": [
+                    {"id": "1", "last_modified": "2020-01-02T03:04:05Z"},
+                    {"id": "2", "last_modified": "2021-01-02T03:04:05Z"},
+                ],
+            },
+        }
+        response = self._response(doc)
+        with mock.patch.object(
+            requests.Session, "request", return_value=response
+        ) as request:
+            docs = (
+                si.query(id="*")
+                .paginate(rows=10)
+                .export(["id", "last_modified"], ["-last_modified", "id"])
+            )
+            self.assertFalse(request.called)
+            docs = list(docs)
+        url = request.call_args[0][1]
+        self.assertTrue(url.startswith("http://localhost:2222/mysolr/export?"))
+        self.assertIn("sort=last_modified+desc%2C+id+asc", url)
+        self.assertIn("fl=", url)
+        self.assertNotIn("rows=", url)
+        self.assertEqual([d["last_modified"].year for d in docs], [2020, 2021])
+        self.assertTrue(response.close.called)
+
+    def test_export_error(self):
+        si = self._make_one()
+        doc = {
+            "responseHeader": {"status": 0},
+            "response": {
+                "numFound": 2,
+                "docs": [{"id": "1"}, {"EXCEPTION": "id must have DocValues"}],
+            },
+        }
+        with mock.patch.object(
+            requests.Session, "request", return_value=self._response(doc)
+        ):
+            docs = si.query(id="*").export("id", "id", constructor=dict)
+            self.assertEqual(next(docs), {"id": "1"})
+            self.assertRaises(scorched.exc.SolrError, next, docs)
+
+    def test_stream_expression(self):
+        si = self._make_one()
+        tuples = [
+            {"cat": "book", "sum(price)": 12.5},
+            {"cat": "dvd", "sum(price)": 3.0},
+            {"EOF": True, "RESPONSE_TIME": 5},
+        ]
+        response = self._response({"result-set": {"docs": tuples}})
+        expr = si.E.rollup(
+            si.E.search("books", q="*:*", fl="cat,price", sort="cat asc"),
+            si.E.sum("price"),
+            over="cat",
+        )
+        with mock.patch.object(
+            requests.Session, "request", return_value=response
+        ) as request:
+            result = si.stream(expr)
+            self.assertFalse(request.called)
+            result = list(result)
+        self.assertEqual(result, tuples[:2])
+        method, url = request.call_args[0]
+        self.assertEqual((method, url), ("POST", "http://localhost:2222/mysolr/stream"))
+        self.assertEqual(
+            request.call_args[1]["data"], scorched.compat.urlencode({"expr": str(expr)})
+        )
+        self.assertTrue(response.close.called)
+
+    def test_stream_errors(self):
+        si = self._make_one()
+        for tuples in [
+            [{"a": 1}, {"EXCEPTION": "boom", "EOF": True}],
+            [{"a": 1}],
+        ]:
+            response = self._response({"result-set": {"docs": tuples}})
+            with mock.patch.object(requests.Session, "request", return_value=response):
+                result = si.stream("search(books)")
+                self.assertEqual(next(result), {"a": 1})
+                self.assertRaises(scorched.exc.SolrError, next, result)
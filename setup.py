@@ -45,7 +45,10 @@ setup(
         "pytz",
     ],
     extras_require={
-        "test": ["pytest<7.0.0", "coverage", "pytest-docker"],
+        "async": ["httpx"],
+        "numpy": ["numpy"],
+        "orjson": ["orjson"],
+        "test": ["pytest<7.0.0", "coverage", "pytest-docker", "httpx"],
     },
     test_suite="scorched.tests",
 )